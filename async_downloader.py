@@ -0,0 +1,210 @@
+# async_downloader.py
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from exchanges import retryable_errors
+from extracting import timeframe_to_ms
+from instrumentation import count
+
+# -----------------------------------------------
+# Concurrent, Range-Sharded OHLCV History Downloader
+# -----------------------------------------------
+
+"""
+fetch_kucoin_candles_paginated() fetches one symbol page by page with a fixed sleep.
+This downloader:
+
+1. Splits the requested [since, until) range of every symbol into shards.
+2. Fetches all shards of all symbols concurrently (asyncio), each shard paging forward
+   on its own, with at most `max_concurrency` requests in flight.
+3. Spaces requests with a shared token bucket (`requests_per_second`, bursts up to
+   `burst`) instead of sleeping a fixed time after every call.
+4. Stitches each symbol's shards back together, drops duplicate timestamps and sorts.
+
+The result has the same columns as fetch_kucoin_candles_paginated() so it drops straight
+into the rest of the pipeline. Pass any ccxt async exchange (or fake_exchange.FakeExchange
+for offline tests); by default a ccxt.async_support KuCoin instance is created and closed.
+"""
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class TokenBucket:
+    """
+    Async token-bucket rate limiter shared by all requests.
+
+    Parameters:
+    - rate: tokens added per second (= sustained requests per second)
+    - capacity: max tokens stored (= allowed burst), defaults to `rate`
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+def split_range(since_ms, until_ms, timeframe, shards):
+    """
+    Splits [since_ms, until_ms) into up to `shards` contiguous ranges aligned to candle opens.
+    """
+    step = timeframe_to_ms(timeframe)
+    start = -(-since_ms // step) * step
+    total = max(0, -(-(until_ms - start) // step))
+    if total == 0:
+        return []
+
+    shards = max(1, min(shards, total))
+    per_shard = -(-total // shards)
+    ranges = []
+    for first in range(0, total, per_shard):
+        shard_start = start + first * step
+        shard_end = min(until_ms, start + (first + per_shard) * step)
+        ranges.append((shard_start, shard_end))
+    return ranges
+
+
+async def _fetch_page(exchange, symbol, timeframe, since, limit, bucket, semaphore, retries, retry_wait):
+    # Only network / rate-limit errors are retried; a bad symbol or auth error raises right away
+    retry_on = retryable_errors()
+    for attempt in range(retries + 1):
+        await bucket.acquire()
+        try:
+            async with semaphore:
+                count('api_calls', api='fetch_ohlcv', exchange=getattr(exchange, 'id', 'unknown'))
+                return await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            wait = retry_wait * (2 ** attempt)
+            print(f"⚠️ {symbol} page at {since} failed ({e}), retrying in {wait:.1f}s")
+            await asyncio.sleep(wait)
+
+
+async def fetch_shard(exchange, symbol, timeframe, start_ms, end_ms, bucket, semaphore, batch_size=1000, retries=3,
+                      retry_wait=0.5):
+    """
+    Pages forward through [start_ms, end_ms) for one symbol. Returns raw OHLCV lists.
+    """
+    step = timeframe_to_ms(timeframe)
+    candles = []
+    since = start_ms
+    overlap = 0  # candles before `since` the venue puts at the start of a page
+
+    while since < end_ms:
+        limit = min(batch_size, -(-(end_ms - since) // step) + overlap)
+        page = await _fetch_page(exchange, symbol, timeframe, since, limit, bucket, semaphore, retries, retry_wait)
+
+        stale = sum(1 for c in page if c[0] < since)
+        fresh = [c for c in page if since <= c[0] < end_ms]
+        if not fresh:
+            if stale > overlap and limit < batch_size:
+                # The whole page was before `since` (the venue rounds `since` down): ask again for more
+                overlap = stale
+                continue
+            # No candles in this page (e.g. before listing / exchange downtime): skip ahead
+            since += max(1, limit - overlap) * step
+            continue
+
+        overlap = max(overlap, stale)
+        candles += fresh
+        since = fresh[-1][0] + step
+
+    return candles
+
+
+def candles_to_dataframe(candles, symbol, timeframe, exchange_name='KuCoin'):
+    """
+    Raw OHLCV lists -> DataFrame in the fetch_kucoin_candles_paginated() format
+    (sorted, duplicate timestamps dropped).
+    """
+    df = pd.DataFrame(candles, columns=OHLCV_COLUMNS)
+    df.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
+    df.sort_values('timestamp', inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    df['symbol'] = symbol
+    df['exchange'] = exchange_name
+    df['interval'] = timeframe
+    return df
+
+
+async def download_history(symbols, timeframe='1m', since=None, until=None, exchange=None,
+                           shards_per_symbol=8, max_concurrency=8, requests_per_second=10,
+                           burst=None, batch_size=1000, retries=3, retry_wait=0.5, exchange_name='KuCoin'):
+    """
+    Downloads [since, until) of `timeframe` candles for every symbol concurrently.
+
+    Parameters:
+    - symbols: list of market symbols, e.g. ['ETH/USDT', 'BTC/USDT']
+    - since / until: datetimes or ms timestamps (default: last 35 days up to now)
+    - exchange: ccxt async exchange instance (default: ccxt.async_support.kucoin())
+    - shards_per_symbol: how many ranges each symbol's history is split into
+    - max_concurrency: max requests in flight at once
+    - requests_per_second / burst: token-bucket rate limit shared by all requests
+    - batch_size: candles per request
+    - retries / retry_wait: retries of a page after a network / rate-limit error, first
+      wait in seconds (doubles)
+
+    Returns a dict symbol -> DataFrame.
+    """
+    if until is None:
+        until = datetime.now(timezone.utc)
+    if since is None:
+        since = until - timedelta(days=35) if isinstance(until, datetime) else until - 35 * 86_400_000
+    since_ms = int(since.timestamp() * 1000) if isinstance(since, datetime) else int(since)
+    until_ms = int(until.timestamp() * 1000) if isinstance(until, datetime) else int(until)
+
+    own_exchange = exchange is None
+    if own_exchange:
+        import ccxt.async_support as ccxt_async
+        exchange = ccxt_async.kucoin()
+
+    bucket = TokenBucket(requests_per_second, burst)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    try:
+        jobs = []
+        for symbol in symbols:
+            for shard_start, shard_end in split_range(since_ms, until_ms, timeframe, shards_per_symbol):
+                jobs.append((symbol, fetch_shard(
+                    exchange, symbol, timeframe, shard_start, shard_end,
+                    bucket, semaphore, batch_size=batch_size, retries=retries, retry_wait=retry_wait
+                )))
+
+        results = await asyncio.gather(*(job for _, job in jobs))
+    finally:
+        if own_exchange:
+            await exchange.close()
+
+    by_symbol = {symbol: [] for symbol in symbols}
+    for (symbol, _), candles in zip(jobs, results):
+        by_symbol[symbol] += candles
+
+    return {
+        symbol: candles_to_dataframe(candles, symbol, timeframe, exchange_name)
+        for symbol, candles in by_symbol.items()
+    }
+
+
+def download_history_sync(symbols, **kwargs):
+    """
+    Blocking wrapper around download_history() for scripts (runs its own event loop).
+    """
+    return asyncio.run(download_history(symbols, **kwargs))
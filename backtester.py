@@ -153,19 +153,33 @@ def run_backtest_v2(df, signal_function, score_threshold=4, tp_k=1.95, sl_k=1.5,
     return pd.DataFrame(trades)
 =-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=-=--=-=-=-=-=-=-=-=-=-=--=--=-=-=-=-=-=-=-=-=-==-=-=-==-=-=-=-=-=-=-=-=-=-=-
 """
+import numpy as np
 import pandas as pd
 
-def run_backtest_v2(df, signal_function, score_threshold=2, tp_k_base=1.95, sl_k_base=1.5, max_duration=3, cooldown_after_loss=3):
-    trades = []
-    window = 21  # Buffer for rolling indicators
-    last_exit_index = -cooldown_after_loss  # Initialize cooldown tracker
+from instrumentation import count, instrumented
 
-    #Only allow high-performing signal combinations
-    ALLOWED_COMBOS = {
+#Only allow high-performing signal combinations
+ALLOWED_COMBOS = {
     "rsi_bounce+strong_candle"
-    }
+}
 
 
+def run_backtest_v2(df, signal_function, score_threshold=2, tp_k_base=1.95, sl_k_base=1.5, max_duration=3, cooldown_after_loss=3, allowed_combos=None):
+    """
+    allowed_combos: combo names (filter order doesn't matter) or lists of filter names,
+    default ALLOWED_COMBOS. They are normalized to signal_combo_name form, sorted names
+    joined by '+', and an unknown filter name raises ValueError, same as in
+    run_backtest_v2_fast().
+    """
+    from signal_generator import canonical_combo_name
+
+    trades = []
+    window = 21  # Buffer for rolling indicators
+    last_exit_index = -cooldown_after_loss  # Initialize cooldown tracker
+
+    if allowed_combos is None:
+        allowed_combos = ALLOWED_COMBOS
+    allowed_combos = {canonical_combo_name(combo) for combo in allowed_combos}
 
     for i in range(window, len(df) - max_duration):
         # Cooldown logic: Skip if we're within cooldown window after a loss
@@ -177,7 +191,7 @@ def run_backtest_v2(df, signal_function, score_threshold=2, tp_k_base=1.95, sl_k
         signal_combo = signal.get('signal_combo_name', 'unknown')
 
         # Only continue if combo is in the allowed list and signal is strong enough
-        if signal['match_score'] >= score_threshold and signal_combo in ALLOWED_COMBOS:
+        if signal['match_score'] >= score_threshold and signal_combo in allowed_combos:
             # Entry filters: trend confirmation and volatility filter
             rsi = df.iloc[i]['rsi']
             ema_9 = df.iloc[i]['ema_9']
@@ -276,3 +290,266 @@ def run_backtest_v2(df, signal_function, score_threshold=2, tp_k_base=1.95, sl_k
             })
 
     return pd.DataFrame(trades)
+
+
+
+# -----------------------------------------------
+# Array Engine for run_backtest_v2 (precomputed signals + NumPy arrays)
+# -----------------------------------------------
+
+"""
+run_backtest_v2() re-runs the signal function on a fresh 22-row copy for every candle and
+walks forward with df.iloc[i + j], which is where almost all of its time goes.
+
+The array engine splits the work in two:
+1. Signals for every candle come precomputed (signal_generator.generate_signals), and the
+   entry filters (score, allowed combo, trend, candle body, volatility) are applied as
+   column operations to get the list of candidate entry candles.
+2. A tight loop over only those candidates resolves cooldown, trailing SL, TP/SL hits,
+   MFE/MAE and timeout using plain NumPy array lookups.
+
+run_backtest_v2_fast() returns the same backtest_trades_v2 frame as run_backtest_v2().
+"""
+
+
+def _filters_mask(signals):
+    from signal_generator import combo_names_to_masks
+
+    if 'filters_mask' in signals.columns:
+        return signals['filters_mask'].to_numpy(dtype=np.int64)
+    # Signals from an older run / another signal function: rebuild the mask from the names
+    return combo_names_to_masks(signals['signal_combo_name'])
+
+
+def get_backtest_arrays(df, signals):
+    """
+    Collects the NumPy arrays the array engine needs.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame (fact_prices)
+    - signals: output of generate_signals(df), one row per candle of df
+    """
+    def _col(frame, name):
+        return pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+
+    return {
+        'open': _col(df, 'open'),
+        'high': _col(df, 'high'),
+        'low': _col(df, 'low'),
+        'close': _col(df, 'close'),
+        'atr': _col(df, 'atr'),
+        'rsi': _col(df, 'rsi'),
+        'ema_9': _col(df, 'ema_9'),
+        'ema_20': _col(df, 'ema_20'),
+        'match_score': signals['match_score'].to_numpy(dtype=np.int64),
+        'filters_mask': _filters_mask(signals),
+    }
+
+
+def find_entry_candidates(arrays, score_threshold=2, max_duration=3, allowed_combos=None, window=21, entry_filter=None):
+    """
+    Returns the indices of candles that pass every entry filter of run_backtest_v2
+    (ignoring cooldown, which depends on earlier trades).
+
+    entry_filter: optional bool array (one value per candle) that must also be True,
+    e.g. multi_timeframe.higher_timeframe_trend() as trend confirmation.
+    allowed_combos: as in run_backtest_v2() (any filter order, ValueError on unknown names).
+    """
+    from signal_generator import N_COMBOS, combo_to_mask
+
+    if allowed_combos is None:
+        allowed_combos = ALLOWED_COMBOS
+
+    n = len(arrays['close'])
+    in_range = np.zeros(n, dtype=bool)
+    in_range[window:max(window, n - max_duration)] = True
+
+    # Allowed combos as a 512-entry lookup table indexed by filters_mask
+    allowed_masks = np.zeros(N_COMBOS, dtype=bool)
+    allowed_masks[[combo_to_mask(combo) for combo in allowed_combos]] = True
+    masks = arrays['filters_mask']
+    combo_ok = (masks >= 0) & allowed_masks[np.clip(masks, 0, N_COMBOS - 1)]
+    strong_enough = arrays['match_score'] >= score_threshold
+
+    # Same skip rule as run_backtest_v2 (NaN comparisons are False there too)
+    atr = arrays['atr']
+    candle_body = np.abs(arrays['close'] - arrays['open'])
+    skip = (arrays['ema_9'] <= arrays['ema_20']) | (candle_body < 0.1 * atr) | (atr < 0.2)
+
+    entry_ok = in_range & combo_ok & strong_enough & ~skip
+    if entry_filter is not None:
+        entry_ok &= np.asarray(entry_filter, dtype=bool)
+    return np.flatnonzero(entry_ok)
+
+
+def resolve_trade(arrays, i, tp_k_base=1.95, sl_k_base=1.5, max_duration=3):
+    """
+    Simulates one trade entered at the close of candle i with the exit rules of
+    run_backtest_v2 (dynamic TP/SL, trailing SL, timeout) and returns its details.
+    """
+    high = arrays['high']
+    low = arrays['low']
+    close_arr = arrays['close']
+    atr_arr = arrays['atr']
+
+    # Dynamically adjust TP/SL if signal is very strong
+    if arrays['match_score'][i] >= 5:
+        tp_k, sl_k = 2.2, 1.2
+    else:
+        tp_k, sl_k = tp_k_base, sl_k_base
+
+    entry_price = close_arr[i]
+    atr = atr_arr[i]
+    tp_price = entry_price + tp_k * atr
+    sl_price = entry_price - sl_k * atr
+    trailing_sl = sl_price
+    exit_price = None
+    exit_reason = "timeout"
+    mfe = float('-inf')
+    mae = float('inf')
+
+    for j in range(1, max_duration + 1):
+        k = i + j
+        # Trailing SL adapts to volatility mid-trade
+        trailing_sl = max(trailing_sl, close_arr[k] - sl_k * atr_arr[k])
+
+        # Track max favorable and adverse excursions
+        mfe = max(mfe, (high[k] - entry_price) / atr)
+        mae = min(mae, (low[k] - entry_price) / atr)
+
+        if high[k] >= tp_price:
+            exit_price = tp_price
+            exit_reason = "tp_hit"
+            duration = j
+            break
+        elif low[k] <= trailing_sl:
+            exit_price = trailing_sl
+            exit_reason = "sl_hit"
+            duration = j
+            break
+    else:
+        # If no exit condition hit, close at timeout
+        exit_price = close_arr[i + max_duration]
+        duration = max_duration
+
+    return {
+        'index': i,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'exit_reason': exit_reason,
+        'duration': duration,
+        'pnl': ((exit_price - entry_price) / entry_price) * 100,
+        'tp_price': tp_price,
+        'sl_price': sl_price,
+        'mfe': mfe,
+        'mae': mae,
+    }
+
+
+def simulate_trades_v2(arrays, candidates, tp_k_base=1.95, sl_k_base=1.5, max_duration=3, cooldown_after_loss=3):
+    """
+    Resolves every candidate entry with the exit rules of run_backtest_v2.
+
+    Parameters:
+    - arrays: dict from get_backtest_arrays()
+    - candidates: sorted entry indices from find_entry_candidates()
+
+    Returns a list of dicts (one per trade) with entry index, exit details and MFE/MAE.
+    """
+    results = []
+    last_exit_index = -cooldown_after_loss  # Initialize cooldown tracker
+
+    for i in candidates:
+        # Cooldown logic: Skip if we're within cooldown window after a loss
+        if i <= last_exit_index + cooldown_after_loss:
+            continue
+
+        trade = resolve_trade(arrays, i, tp_k_base, sl_k_base, max_duration)
+
+        # Set cooldown trigger if trade was a loss
+        if not trade['pnl'] > 0:
+            last_exit_index = i + trade['duration']
+
+        results.append(trade)
+
+    return results
+
+
+@instrumented('backtest', input_rows=lambda df, *args, **kwargs: len(df))
+def run_backtest_v2_fast(df, signals=None, score_threshold=2, tp_k_base=1.95, sl_k_base=1.5, max_duration=3, cooldown_after_loss=3, allowed_combos=None, entry_filter=None):
+    """
+    Array-engine version of run_backtest_v2(), returns the identical backtest_trades_v2 frame.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - signals: precomputed generate_signals(df) output (computed here if not given)
+    - entry_filter: optional extra bool entry condition per candle (see find_entry_candidates)
+    - the rest: same as run_backtest_v2()
+    """
+    from signal_generator import combo_names, filter_flags
+
+    if signals is None:
+        from signal_generator import generate_signals
+        signals = generate_signals(df)
+
+    arrays = get_backtest_arrays(df, signals)
+    candidates = find_entry_candidates(
+        arrays,
+        score_threshold=score_threshold,
+        max_duration=max_duration,
+        allowed_combos=allowed_combos,
+        entry_filter=entry_filter
+    )
+    results = simulate_trades_v2(
+        arrays,
+        candidates,
+        tp_k_base=tp_k_base,
+        sl_k_base=sl_k_base,
+        max_duration=max_duration,
+        cooldown_after_loss=cooldown_after_loss
+    )
+
+    timestamps = df['timestamp'].to_numpy(dtype=object)
+    symbols = df['symbol'].to_numpy(dtype=object)
+    filter_columns = {
+        name: filter_flags(signals, name)
+        for name in ['rsi_bounce', 'macd_cross_up', 'recent_high_break', 'range_breakout', 'strong_candle', 'volume_spike']
+    }
+
+    trades = []
+    for r in results:
+        i = r['index']
+        duration = r['duration']
+        pnl = r['pnl']
+        was_profitable = pnl > 0
+        trade_type = "Scalp" if duration <= 3 else "Swing" if duration <= 15 else "Position"
+        logic_debug_note = f"Score: {arrays['match_score'][i]} | TP: {r['tp_price']:.2f} | SL: {r['sl_price']:.2f} | RSI: {arrays['rsi'][i]:.2f} | Dur: {duration}"
+
+        trades.append({
+            'timestamp': timestamps[i],
+            'symbol': symbols[i],
+            'entry_price': r['entry_price'],
+            'exit_price': r['exit_price'],
+            'exit_reason': r['exit_reason'],
+            'duration_candles': duration,
+            'pnl_pct': round(pnl, 4),
+            'was_profitable': was_profitable,
+            'trade_type': trade_type,
+            'tp_price': r['tp_price'],
+            'sl_price': r['sl_price'],
+            'atr_on_exit': arrays['atr'][i + duration],
+            'mfe_atr': round(r['mfe'], 4),
+            'mae_atr': round(r['mae'], 4),
+            'match_score': arrays['match_score'][i],
+            'rsi_bounce': filter_columns['rsi_bounce'][i],
+            'macd_cross_up': filter_columns['macd_cross_up'][i],
+            'recent_high_break': filter_columns['recent_high_break'][i],
+            'range_breakout': filter_columns['range_breakout'][i],
+            'strong_candle': filter_columns['strong_candle'][i],
+            'volume_spike': filter_columns['volume_spike'][i],
+            'signal_combo_name': combo_names(arrays['filters_mask'][i]),
+            'logic_debug_note': logic_debug_note
+        })
+
+    count('backtest_trades', len(trades))
+    return pd.DataFrame(trades)
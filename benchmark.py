@@ -0,0 +1,252 @@
+# benchmark.py
+import argparse
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import transformation
+from backtester import run_backtest_v2, run_backtest_v2_fast
+from signal_generator import generate_signal_row, generate_signals
+from upload_to_bigquery import split_into_chunks
+
+# -----------------------------------------------
+# Benchmarks for the Hot Paths (indicators, signals, backtests, upload serialization)
+# -----------------------------------------------
+
+"""
+python benchmark.py                                   # bundled month of ETH/USDT
+python benchmark.py --sizes month 1000000 10000000    # + synthetic 1M / 10M row 1m series
+python benchmark.py --save-baseline                   # store results as the new baseline
+python benchmark.py --baseline benchmark_baseline.json --tolerance 0.25
+
+For every benchmark and dataset it records wall time (best of --repeat runs), peak
+traced memory (a separate tracemalloc run, so tracing doesn't slow the timed run) and
+rows/sec into a JSON results file. With a baseline file it flags every benchmark that got
+slower than baseline * (1 + tolerance) and exits with code 1.
+
+The per-row loops (generate_signal_row, run_backtest_v2) take ~1ms per candle, so they
+only run on the first --row-loop-limit candles; their rows/sec is what to compare.
+"""
+
+DEFAULT_RESULTS = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+
+def make_synthetic_candles(n_rows, seed=42, start_price=1800.0, symbol='ETH/USDT'):
+    """
+    Random-walk 1m OHLCV candles in the ethusdt_1m_month.csv format.
+    """
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.0008, n_rows)
+    close = start_price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([start_price], close[:-1]))
+    wick = np.abs(rng.normal(0, 0.0005, (2, n_rows))) * close
+    high = np.maximum(open_, close) + wick[0]
+    low = np.minimum(open_, close) - wick[1]
+    volume = rng.lognormal(3, 1, n_rows)
+
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2020-01-01', periods=n_rows, freq='min'),
+        'open': open_.round(2),
+        'high': high.round(2),
+        'low': low.round(2),
+        'close': close.round(2),
+        'volume': volume,
+        'symbol': symbol,
+        'exchange': 'KuCoin',
+        'interval': '1m',
+    })
+
+
+def load_dataset(name, csv_path):
+    if name == "month":
+        df = pd.read_csv(csv_path)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        return df
+    return make_synthetic_candles(int(name))
+
+
+def _row_loop_signals(df):
+    return pd.DataFrame([generate_signal_row(df.iloc[i - 20:i + 1].reset_index(drop=True)) for i in range(20, len(df))])
+
+
+def _serialize_for_upload(df):
+    # What load_table_from_dataframe does per chunk: DataFrame -> Parquet bytes
+    total = 0
+    for chunk in split_into_chunks(df):
+        buffer = io.BytesIO()
+        chunk.to_parquet(buffer, index=False)
+        total += buffer.tell()
+    return total
+
+
+def build_benchmarks(row_loop_limit):
+    """
+    List of (name, setup(raw, enriched, signals) -> args, function, rows(raw)).
+    """
+    raw_copy = lambda raw, enriched, signals: (raw.copy(),)
+    enriched_only = lambda raw, enriched, signals: (enriched,)
+    all_rows = lambda raw: len(raw)
+    limited_rows = lambda raw: min(len(raw), row_loop_limit)
+
+    return [
+        ('add_ema9_ema20', raw_copy, transformation.add_ema9_ema20, all_rows),
+        ('add_macd', raw_copy, transformation.add_macd, all_rows),
+        ('add_rsi', raw_copy, transformation.add_rsi, all_rows),
+        ('add_bollinger_bands', raw_copy, transformation.add_bollinger_bands, all_rows),
+        ('add_atr', raw_copy, transformation.add_atr, all_rows),
+        ('add_all_indicators', raw_copy, transformation.add_all_indicators, all_rows),
+        ('generate_signal_row_loop', lambda raw, enriched, signals: (enriched.iloc[:row_loop_limit],), _row_loop_signals, limited_rows),
+        ('generate_signals', enriched_only, generate_signals, all_rows),
+        ('run_backtest_v2', lambda raw, enriched, signals: (enriched.iloc[:row_loop_limit], generate_signal_row), run_backtest_v2, limited_rows),
+        ('run_backtest_v2_fast', lambda raw, enriched, signals: (enriched, signals), lambda df, s: run_backtest_v2_fast(df, signals=s), all_rows),
+        ('upload_serialization', enriched_only, _serialize_for_upload, all_rows),
+    ]
+
+
+def measure(func, args, repeat=1, track_memory=True):
+    """
+    Best wall time of `repeat` runs, plus peak traced memory of one extra traced run (MB).
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+
+    peak_mb = None
+    if track_memory:
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1024 / 1024, 2)
+
+    return best, peak_mb
+
+
+def run_benchmarks(sizes, csv_path='ethusdt_1m_month.csv', repeat=1, row_loop_limit=2000, only=None, track_memory=True):
+    """
+    Runs every benchmark on every dataset size. Returns a list of result dicts.
+    """
+    results = []
+    for size in sizes:
+        raw = load_dataset(size, csv_path)
+        enriched = transformation.add_all_indicators(raw.copy())
+        signals = generate_signals(enriched)
+        dataset = "month" if size == "month" else f"synthetic_{int(size)}"
+
+        for name, setup, func, rows_of in build_benchmarks(row_loop_limit):
+            if only and name not in only:
+                continue
+            args = setup(raw, enriched, signals)
+            seconds, peak_mb = measure(func, args, repeat=repeat, track_memory=track_memory)
+            rows = rows_of(raw)
+            result = {
+                'benchmark': name,
+                'dataset': dataset,
+                'rows': rows,
+                'seconds': round(seconds, 6),
+                'peak_mb': peak_mb,
+                'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None,
+            }
+            results.append(result)
+            print(f"{dataset:>18} | {name:<26} | {seconds:10.4f}s | {str(peak_mb):>9} MB | {result['rows_per_sec']:>14} rows/s")
+
+    return results
+
+
+def compare_to_baseline(results, baseline_results, tolerance=0.25):
+    """
+    Returns a DataFrame of benchmarks present in both runs with their slowdown ratio
+    and a `regression` flag (seconds > baseline * (1 + tolerance)).
+    """
+    current = pd.DataFrame(results)
+    baseline = pd.DataFrame(baseline_results)
+    if current.empty or baseline.empty:
+        return pd.DataFrame()
+
+    merged = current.merge(
+        baseline[['benchmark', 'dataset', 'seconds', 'peak_mb']],
+        on=['benchmark', 'dataset'],
+        suffixes=('', '_baseline')
+    )
+    merged['slowdown'] = (merged['seconds'] / merged['seconds_baseline']).round(3)
+    merged['regression'] = merged['seconds'] > merged['seconds_baseline'] * (1 + tolerance)
+    return merged[['benchmark', 'dataset', 'seconds_baseline', 'seconds', 'slowdown', 'peak_mb_baseline', 'peak_mb', 'regression']]
+
+
+def _metadata():
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark indicators, signals, backtests and upload serialization")
+    parser.add_argument('--sizes', nargs='+', default=['month'], help="'month' (bundled CSV) and/or synthetic row counts")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv')
+    parser.add_argument('--repeat', type=int, default=1, help="timed runs per benchmark (best is kept)")
+    parser.add_argument('--row-loop-limit', type=int, default=2000, help="candles for the per-row loop benchmarks")
+    parser.add_argument('--only', nargs='+', default=None, help="benchmark names to run")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc peak-memory run")
+    parser.add_argument('--out', default=DEFAULT_RESULTS)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.sizes,
+        csv_path=args.csv,
+        repeat=args.repeat,
+        row_loop_limit=args.row_loop_limit,
+        only=args.only,
+        track_memory=not args.no_memory
+    )
+    report = {'meta': _metadata(), 'results': results}
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Saved {len(results)} results to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✅ Saved baseline to {args.baseline}")
+        return 0
+
+    try:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        print(f"No baseline at {args.baseline} (run with --save-baseline to create one)")
+        return 0
+
+    comparison = compare_to_baseline(results, baseline['results'], args.tolerance)
+    if comparison.empty:
+        print("Nothing to compare with the baseline")
+        return 0
+    print(comparison.to_string(index=False))
+
+    regressions = comparison[comparison['regression']]
+    if len(regressions):
+        print(f"❌ {len(regressions)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    print("✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# checkpoint.py
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------
+# Checkpoints for Warm Restarts of the Live Path
+# -----------------------------------------------
+
+"""
+A live process (paper_trader.py) holds everything it needs in a few small objects:
+indicator state (streaming_indicators), signal windows, open positions, the cooldown
+counter and the last processed candle. Their to_state() output is saved here as one
+compact JSON file, so a restart restores it in milliseconds and only replays the candles
+that arrived since, instead of recomputing the whole history.
+
+- JSON keeps floats exact (repr round trip), NaN / inf included, so a restored engine
+  continues with bit-identical values.
+- pandas Timestamps are stored as {"__timestamp__": "<ISO 8601>"} and come back as
+  Timestamps; NumPy scalars are saved as plain numbers.
+- The file is written to <path>.tmp first and moved into place, so a crash mid-write
+  leaves the previous checkpoint intact.
+
+    checkpointer = Checkpointer('paper_trader.ckpt.json', every_candles=60)
+    checkpointer.maybe_save(lambda: trader.to_state())   # once per candle
+    state = read_checkpoint('paper_trader.ckpt.json')    # on startup (None if missing)
+"""
+
+CHECKPOINT_VERSION = 1
+
+
+def _encode(value):
+    if isinstance(value, pd.Timestamp):
+        return {'__timestamp__': value.isoformat()}
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (set, tuple, np.ndarray)):
+        return list(value)
+    raise TypeError(f"Can't checkpoint a {type(value).__name__}")
+
+
+def _decode(obj):
+    if len(obj) == 1 and '__timestamp__' in obj:
+        return pd.Timestamp(obj['__timestamp__'])
+    return obj
+
+
+def write_checkpoint(state, path):
+    """
+    Saves a to_state() dict to path (atomically). Returns the file size in bytes.
+    """
+    payload = {'version': CHECKPOINT_VERSION, 'saved_at': time.time(), 'state': state}
+    text = json.dumps(payload, default=_encode, separators=(',', ':'))
+
+    # Write to a temp file first so a crash never leaves a half-written checkpoint behind
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+    return len(text)
+
+
+def read_checkpoint(path):
+    """
+    The state saved by write_checkpoint(), or None if there is no checkpoint at path.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        payload = json.load(f, object_hook=_decode)
+    if payload.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} has version {payload.get('version')}, expected {CHECKPOINT_VERSION}")
+    return payload['state']
+
+
+class Checkpointer:
+    """
+    Saves a checkpoint every `every_candles` candles and/or `every_seconds` seconds.
+
+    Parameters:
+    - path: checkpoint file
+    - every_candles: candles between checkpoints (None = no candle-based checkpoints)
+    - every_seconds: wall-clock seconds between checkpoints (None = no time-based ones)
+    """
+
+    def __init__(self, path, every_candles=60, every_seconds=None):
+        self.path = path
+        self.every_candles = every_candles
+        self.every_seconds = every_seconds
+        self.candles = 0
+        self.saves = 0
+        self.last_bytes = 0
+        self.last_save_ms = 0.0
+        self.last_saved = time.monotonic()
+
+    def due(self):
+        if self.every_candles and self.candles >= self.every_candles:
+            return True
+        return bool(self.every_seconds) and time.monotonic() - self.last_saved >= self.every_seconds
+
+    def maybe_save(self, get_state):
+        """
+        Counts one processed candle and saves get_state() if a checkpoint is due.
+        get_state is only called when saving. Returns True if a checkpoint was written.
+        """
+        self.candles += 1
+        if not self.due():
+            return False
+        self.save(get_state())
+        return True
+
+    def save(self, state):
+        start = time.perf_counter()
+        self.last_bytes = write_checkpoint(state, self.path)
+        self.last_save_ms = (time.perf_counter() - start) * 1000
+        self.last_saved = time.monotonic()
+        self.candles = 0
+        self.saves += 1
+
+    def stats(self):
+        return {
+            'path': self.path,
+            'saves': self.saves,
+            'last_bytes': self.last_bytes,
+            'last_save_ms': round(self.last_save_ms, 3),
+        }
@@ -0,0 +1,186 @@
+# cli.py
+import argparse
+import sys
+
+# -----------------------------------------------
+# Command Line Entry Point
+# -----------------------------------------------
+
+"""
+python cli.py fetch      --symbol ETH/USDT --out ethusdt_1m_month.csv   (--exchange kucoin|binance|fake, --incremental sync)
+python cli.py transform  --csv ethusdt_1m_month.csv --out prices.parquet
+python cli.py signals    --csv ethusdt_1m_month.csv --out signals.csv
+python cli.py backtest   --csv ethusdt_1m_month.csv --tp 1.95 --sl 1.5
+python cli.py upload     --csv ethusdt_1m_month.csv --table backtest_trades_v2
+python cli.py --metrics-json metrics.json --metrics-prom metrics.prom backtest   (timings + counters)
+
+Only argparse is imported up front. Every subcommand imports what it needs when it runs:
+ccxt only for `fetch`, google.cloud only for `upload` (and not at all with --local-dir),
+so a local backtest starts without touching the network or the cloud libraries.
+"""
+
+
+def _load_prices(args):
+    from data_cache import load_enriched_prices
+    return load_enriched_prices(args.csv, use_cache=not args.no_cache)
+
+
+def _save(df, path):
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    print(f"✅ Saved {len(df)} rows to {path}")
+
+
+def cmd_fetch(args):
+    if args.incremental:
+        from data_sync import sync_candles
+        from exchanges import get_connector
+        summary = sync_candles(args.symbol, args.timeframe, csv_path=args.out,
+                               fetch_fn=get_connector(args.exchange).fetch_candles)
+        print(f"✅ Synced {args.symbol}: {summary}")
+        return
+
+    from extracting import fetch_kucoin_candles_paginated
+    df = fetch_kucoin_candles_paginated(symbol=args.symbol, timeframe=args.timeframe, total_limit=args.total_limit,
+                                        venue=args.exchange)
+    _save(df, args.out)
+
+
+def cmd_transform(args):
+    df = _load_prices(args)
+    if args.compact:
+        from data_cache import compact_prices
+        df = compact_prices(df)
+    print(f"Fetched candles: {len(df)}")
+    if args.out:
+        _save(df, args.out)
+
+
+def cmd_signals(args):
+    from signal_generator import generate_signals
+
+    df = _load_prices(args)
+    df_signals = generate_signals(df, compact=args.compact).iloc[20:].reset_index(drop=True)
+    print(df_signals['match_score'].value_counts().sort_index().to_string())
+    if args.out:
+        _save(df_signals, args.out)
+
+
+def _run_backtest(args):
+    from backtester import run_backtest_v2_fast
+
+    df = _load_prices(args)
+    return run_backtest_v2_fast(
+        df,
+        score_threshold=args.score,
+        tp_k_base=args.tp,
+        sl_k_base=args.sl,
+        max_duration=args.max_duration,
+        cooldown_after_loss=args.cooldown
+    )
+
+
+def cmd_backtest(args):
+    trades = _run_backtest(args)
+    print(f"✅ Rows in trades_df_v2: {len(trades)}")
+    if len(trades):
+        print(f"Total PnL: {trades['pnl_pct'].sum():.4f}% | Win rate: {trades['was_profitable'].mean():.2%}")
+    if args.out:
+        _save(trades, args.out)
+
+
+def cmd_upload(args):
+    from upload_to_bigquery import set_client, upload_dataframe_to_bigquery
+
+    if args.local_dir:
+        from local_bigquery import LocalBigQueryClient
+        set_client(LocalBigQueryClient(args.local_dir))
+
+    if args.table == "fact_prices":
+        df = _load_prices(args)
+    elif args.table == "fact_signals":
+        from signal_generator import generate_signals
+        df = generate_signals(_load_prices(args)).iloc[20:].reset_index(drop=True)
+    else:
+        df = _run_backtest(args)
+
+    upload_dataframe_to_bigquery(df, args.table, write_mode=args.write_mode)
+
+
+def _add_data_args(parser):
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV")
+    parser.add_argument('--no-cache', action='store_true', help="ignore the .cache/ columnar cache")
+
+
+def _add_backtest_args(parser):
+    parser.add_argument('--score', type=int, default=2, help="score_threshold")
+    parser.add_argument('--tp', type=float, default=1.95, help="tp_k_base")
+    parser.add_argument('--sl', type=float, default=1.5, help="sl_k_base")
+    parser.add_argument('--max-duration', type=int, default=3)
+    parser.add_argument('--cooldown', type=int, default=3, help="cooldown_after_loss")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Tradingbot pipeline steps")
+    parser.add_argument('--metrics-json', default=None, help="save stage timings and counters as JSON")
+    parser.add_argument('--metrics-prom', default=None, help="save stage timings and counters as Prometheus text")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('fetch', help="download candles (KuCoin by default)")
+    p.add_argument('--exchange', default='kucoin', help="ccxt exchange id, or 'fake' for offline runs")
+    p.add_argument('--symbol', default='ETH/USDT')
+    p.add_argument('--timeframe', default='1m')
+    p.add_argument('--total-limit', type=int, default=50000)
+    p.add_argument('--out', default='ethusdt_1m_month.csv')
+    p.add_argument('--incremental', action='store_true', help="only fetch candles newer than the last one in --out")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser('transform', help="candles + indicators (fact_prices)")
+    _add_data_args(p)
+    p.add_argument('--out', default=None, help=".csv or .parquet")
+    p.add_argument('--compact', action='store_true', help="categorical strings + float32 columns")
+    p.set_defaults(func=cmd_transform)
+
+    p = sub.add_parser('signals', help="fact_signals for every candle")
+    _add_data_args(p)
+    p.add_argument('--out', default=None, help=".csv or .parquet")
+    p.add_argument('--compact', action='store_true', help="filters packed into filters_mask, no lists/strings")
+    p.set_defaults(func=cmd_signals)
+
+    p = sub.add_parser('backtest', help="run_backtest_v2 (array engine)")
+    _add_data_args(p)
+    _add_backtest_args(p)
+    p.add_argument('--out', default=None, help=".csv or .parquet")
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('upload', help="upload a table to BigQuery")
+    _add_data_args(p)
+    _add_backtest_args(p)
+    p.add_argument('--table', choices=['fact_prices', 'fact_signals', 'backtest_trades_v2'], default='backtest_trades_v2')
+    p.add_argument('--write-mode', choices=['WRITE_APPEND', 'WRITE_TRUNCATE'], default='WRITE_APPEND')
+    p.add_argument('--local-dir', default=None, help="write to the local BigQuery stand-in in this folder")
+    p.set_defaults(func=cmd_upload)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not (args.metrics_json or args.metrics_prom):
+        args.func(args)
+        return
+
+    import instrumentation
+    instrumentation.enable()
+    with instrumentation.timed(f"cli.{args.command}"):
+        args.func(args)
+    if args.metrics_json:
+        instrumentation.write_json(args.metrics_json)
+    if args.metrics_prom:
+        instrumentation.write_prometheus(args.metrics_prom)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,128 @@
+# combo_analytics.py
+import numpy as np
+import pandas as pd
+
+from signal_generator import N_COMBOS, combo_names, combo_names_to_masks
+
+# -----------------------------------------------
+# Filter Combination Analytics (grouped by filters_mask)
+# -----------------------------------------------
+
+"""
+Per-combination statistics for choosing ALLOWED_COMBOS, computed on the int filters_mask
+instead of lists / combo name strings. Every statistic is one np.bincount over the mask
+(there are only 512 possible combos), so a few million signals take well under a second.
+
+    trades = run_backtest_v2_fast(df, allowed_combos=all_combos)
+    trade_combo_stats(trades)                 # what the backtest actually traded
+    signal_combo_stats(df, generate_signals(df), horizon=3)   # every signal, fixed horizon
+
+combo names are only attached to the final (small) table.
+"""
+
+
+def mask_stats(masks, pnl, mfe=None, mae=None, min_count=1):
+    """
+    Groups outcomes by filters_mask.
+
+    Parameters:
+    - masks: int array of filters_mask values (negative = unknown, ignored)
+    - pnl: PnL in % per row
+    - mfe / mae: optional max favorable / adverse excursion per row (ATR units)
+    - min_count: drop combos seen fewer times than this
+
+    Returns a DataFrame (one row per combo, most frequent first) with filters_mask,
+    signal_combo_name, count, win_rate, mean_pnl_pct, total_pnl_pct and mean_mfe_atr / mean_mae_atr.
+    """
+    masks = np.asarray(masks, dtype=np.int64)
+    pnl = np.asarray(pnl, dtype=np.float64)
+    valid = (masks >= 0) & ~np.isnan(pnl)
+    extras = {'mean_mfe_atr': mfe, 'mean_mae_atr': mae}
+    for values in extras.values():
+        if values is not None:
+            valid &= ~np.isnan(np.asarray(values, dtype=np.float64))
+
+    masks = masks[valid]
+    pnl = pnl[valid]
+
+    counts = np.bincount(masks, minlength=N_COMBOS)
+    wins = np.bincount(masks, weights=pnl > 0, minlength=N_COMBOS)
+    pnl_sum = np.bincount(masks, weights=pnl, minlength=N_COMBOS)
+
+    seen = np.flatnonzero(counts >= max(min_count, 1))
+    n = counts[seen]
+    stats = pd.DataFrame({
+        'filters_mask': seen,
+        'signal_combo_name': combo_names(seen),
+        'count': n,
+        'win_rate': (wins[seen] / n).round(4),
+        'mean_pnl_pct': (pnl_sum[seen] / n).round(4),
+        'total_pnl_pct': pnl_sum[seen].round(4),
+    })
+    for column, values in extras.items():
+        if values is not None:
+            values = np.asarray(values, dtype=np.float64)[valid]
+            stats[column] = (np.bincount(masks, weights=values, minlength=N_COMBOS)[seen] / n).round(4)
+
+    return stats.sort_values(['count', 'filters_mask'], ascending=[False, True], kind='mergesort').reset_index(drop=True)
+
+
+def trade_combo_stats(trades, min_count=1):
+    """
+    Combo statistics of a backtest_trades_v2 frame (run_backtest_v2 / run_backtest_v2_fast).
+    Uses its filters_mask column if there is one, otherwise the signal_combo_name.
+    """
+    if 'filters_mask' in trades.columns:
+        masks = trades['filters_mask'].to_numpy(dtype=np.int64)
+    else:
+        masks = combo_names_to_masks(trades['signal_combo_name'])
+
+    return mask_stats(
+        masks,
+        trades['pnl_pct'].to_numpy(dtype=np.float64),
+        mfe=trades['mfe_atr'].to_numpy(dtype=np.float64) if 'mfe_atr' in trades.columns else None,
+        mae=trades['mae_atr'].to_numpy(dtype=np.float64) if 'mae_atr' in trades.columns else None,
+        min_count=min_count
+    )
+
+
+def signal_combo_stats(df, signals, horizon=3, min_score=1, min_count=1):
+    """
+    Combo statistics of every signal candle, as if entered at its close and exited at the
+    close `horizon` candles later (no TP/SL), so combos can be compared before backtesting.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - signals: generate_signals(df) (one row per candle of df)
+    - horizon: holding period in candles
+    - min_score: only candles with at least this match_score
+    - min_count: drop combos seen fewer times than this
+
+    MFE / MAE are the highest high / lowest low of the next `horizon` candles relative to
+    the entry, in ATR units of the entry candle.
+    """
+    close = pd.to_numeric(df['close'], errors='coerce').to_numpy(dtype=np.float64)
+    high = pd.to_numeric(df['high'], errors='coerce').to_numpy(dtype=np.float64)
+    low = pd.to_numeric(df['low'], errors='coerce').to_numpy(dtype=np.float64)
+    atr = pd.to_numeric(df['atr'], errors='coerce').to_numpy(dtype=np.float64)
+    n = len(close)
+
+    if 'filters_mask' in signals.columns:
+        masks = signals['filters_mask'].to_numpy(dtype=np.int64)
+    else:
+        masks = combo_names_to_masks(signals['signal_combo_name'])
+
+    entries = np.flatnonzero(signals['match_score'].to_numpy() >= min_score)
+    entries = entries[entries < n - horizon]
+
+    # Highest high / lowest low over candles i+1 .. i+horizon (reverse rolling window)
+    future_high = pd.Series(high[::-1]).rolling(horizon, min_periods=horizon).max().to_numpy()[::-1]
+    future_low = pd.Series(low[::-1]).rolling(horizon, min_periods=horizon).min().to_numpy()[::-1]
+
+    entry_price = close[entries]
+    entry_atr = np.where(atr[entries] > 0, atr[entries], np.nan)
+    pnl = (close[entries + horizon] - entry_price) / entry_price * 100
+    mfe = (future_high[entries + 1] - entry_price) / entry_atr
+    mae = (future_low[entries + 1] - entry_price) / entry_atr
+
+    return mask_stats(masks[entries], pnl, mfe=mfe, mae=mae, min_count=min_count)
@@ -0,0 +1,255 @@
+# combo_search.py
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester import find_entry_candidates, get_backtest_arrays, simulate_trades_v2
+from signal_generator import FILTER_NAMES, N_COMBOS, combo_names
+from sweep import (
+    add_grid_arguments,
+    expand_grid,
+    get_worker_arrays,
+    grid_from_args,
+    shared_array_pool,
+    summarize_pnl,
+)
+
+# -----------------------------------------------
+# Exhaustive Filter-Subset Search (replaces hand-picked ALLOWED_COMBOS)
+# -----------------------------------------------
+
+"""
+Evaluates every one of the 512 subsets of the nine generate_signal_row() filters as the
+allowed-combo rule of run_backtest_v2, for every score threshold / TP / SL / duration /
+cooldown of a grid, on a train window, and reports each configuration's out-of-sample
+stats on the test window that follows it.
+
+Two ways a subset S can select entries (by filters_mask):
+- exact:     the candle's combo is exactly S                    (mask == S)
+- at_least:  the candle triggered at least the filters of S      (mask & S == S)
+
+Pruning: occurrences of every subset among the entry candidates of the train window are
+counted for all 512 subsets at once - one np.bincount of the masks, plus for at_least a
+superset-sum pass over the 9 bits. Subsets with fewer than min_occurrences never reach the
+backtest engine (with at_least, once S is too rare so is every superset of S).
+
+The surviving subsets run across a process pool (arrays memory-mapped via
+sweep.shared_array_pool), one task per subset with the whole parameter grid. Entry
+candidates without the combo rule are computed once per (score_threshold, max_duration)
+in each worker, so a subset only costs a mask lookup plus its trades.
+
+Ranking uses the train stats only; the test columns show how each choice held up.
+"""
+
+MODES = ('exact', 'at_least')
+
+# Every combo allowed: entry candidates before the combo rule is applied
+_ALL_COMBOS = list(combo_names(np.arange(N_COMBOS)))
+
+# Entry candidates of the worker process, by (score_threshold, max_duration)
+_WORKER_CANDIDATES = {}
+
+
+def superset_sums(counts):
+    """
+    For every mask S: the sum of counts[m] over all masks m that contain S (m & S == S).
+    """
+    sums = np.array(counts, copy=True)
+    for bit in range(len(FILTER_NAMES)):
+        # [high bits, this bit, low bits]: add every "bit set" count to its "bit clear" twin
+        view = sums.reshape(-1, 2, 1 << bit)
+        view[:, 0, :] += view[:, 1, :]
+    return sums
+
+
+def subset_occurrences(masks, mode='exact'):
+    """
+    Occurrences of each of the 512 subsets among the given filters_mask values.
+    """
+    counts = np.bincount(np.asarray(masks, dtype=np.int64), minlength=N_COMBOS)
+    return counts if mode == 'exact' else superset_sums(counts)
+
+
+def subset_allowed_masks(subset, mode='exact'):
+    """
+    512-entry bool lookup table: which filters_mask values subset `subset` lets through.
+    """
+    masks = np.arange(N_COMBOS)
+    return masks == subset if mode == 'exact' else (masks & subset) == subset
+
+
+def _base_candidates(arrays, params, cache):
+    key = (params['score_threshold'], params['max_duration'])
+    if key not in cache:
+        cache[key] = find_entry_candidates(arrays, params['score_threshold'], params['max_duration'], _ALL_COMBOS)
+    return cache[key]
+
+
+def evaluate_subset(arrays, subset, mode, configs, split, cache=None):
+    """
+    Train / test summary rows of one filter subset for every configuration.
+
+    Parameters:
+    - subset: filters_mask of the subset
+    - configs: parameter dicts (sweep.expand_grid without allowed_combos)
+    - split: first test candle; train trades must exit before it
+    - cache: dict reused between calls for the combo-free entry candidates
+    """
+    cache = {} if cache is None else cache
+    allowed = subset_allowed_masks(subset, mode)
+
+    rows = []
+    for params in configs:
+        base = _base_candidates(arrays, params, cache)
+        candidates = base[allowed[arrays['filters_mask'][base]]]
+        windows = {
+            'train': candidates[candidates < split - params['max_duration']],
+            'test': candidates[candidates >= split],
+        }
+
+        row = {'filters_mask': subset}
+        row.update(params)
+        for name, entries in windows.items():
+            trades = simulate_trades_v2(
+                arrays,
+                entries,
+                tp_k_base=params['tp_k_base'],
+                sl_k_base=params['sl_k_base'],
+                max_duration=params['max_duration'],
+                cooldown_after_loss=params['cooldown_after_loss']
+            )
+            row.update({f"{name}_{k}": v for k, v in summarize_pnl([t['pnl'] for t in trades]).items()})
+        rows.append(row)
+    return rows
+
+
+def _run_subset_task(task):
+    return evaluate_subset(get_worker_arrays(), *task, cache=_WORKER_CANDIDATES)
+
+
+def search_filter_subsets(df, param_grid=None, mode='exact', signals=None, test_fraction=0.3,
+                          min_occurrences=20, processes=None, rank_by='total_pnl_pct'):
+    """
+    Ranked table of every filter subset x parameter configuration.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - param_grid: score_threshold / tp_k_base / sl_k_base / max_duration / cooldown_after_loss
+      grid (sweep.py format; allowed_combos is what is being searched, so it is ignored)
+    - mode: 'exact' or 'at_least'
+    - signals: precomputed generate_signals(df) output (computed here if not given)
+    - test_fraction: last part of the candles held out as the test window
+    - min_occurrences: prune subsets with fewer train entry candidates than this
+    - processes: worker processes (default = CPU cores, 1 = no pool)
+    - rank_by: train_<rank_by> decides the ranking (highest first)
+
+    Returns a DataFrame: rank, filters_mask, filters, mode, occurrences, the parameters,
+    train_* and test_* summaries (trades, total/avg PnL, win rate, max drawdown).
+    """
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {MODES}, got '{mode}'")
+    if signals is None:
+        from signal_generator import generate_signals
+        signals = generate_signals(df)
+
+    configs = expand_grid(param_grid or {})
+    for params in configs:
+        params.pop('allowed_combos', None)
+
+    arrays = get_backtest_arrays(df, signals)
+    split = int(len(df) * (1 - test_fraction))
+
+    # Prune on train occurrences (per score threshold / duration, before cooldown)
+    cache = {}
+    tasks = []
+    occurrences = {}
+    for params in configs:
+        key = (params['score_threshold'], params['max_duration'])
+        if key in occurrences:
+            continue
+        base = _base_candidates(arrays, params, cache)
+        train = base[base < split - params['max_duration']]
+        occurrences[key] = subset_occurrences(arrays['filters_mask'][train], mode)
+
+    for subset in range(N_COMBOS):
+        kept = [
+            params for params in configs
+            if occurrences[(params['score_threshold'], params['max_duration'])][subset] >= min_occurrences
+        ]
+        if kept:
+            tasks.append((subset, mode, kept, split))
+    print(f"✅ {len(tasks)} of {N_COMBOS} filter subsets ({mode}) have >= {min_occurrences} train occurrences")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(tasks)))
+
+    if not tasks:
+        rows = []
+    elif processes == 1:
+        rows = [row for task in tasks for row in evaluate_subset(arrays, *task, cache=cache)]
+    else:
+        with shared_array_pool(arrays, processes) as pool:
+            chunksize = max(1, len(tasks) // (processes * 4))
+            rows = [row for result in pool.imap(_run_subset_task, tasks, chunksize=chunksize) for row in result]
+
+    table = pd.DataFrame(rows)
+    if table.empty:
+        return table
+
+    filters = combo_names(table['filters_mask'].to_numpy())
+    if mode == 'at_least':
+        filters = np.where(table['filters_mask'].to_numpy() == 0, 'any', filters)
+    table.insert(1, 'filters', filters)
+    table.insert(2, 'mode', mode)
+    table.insert(3, 'occurrences', [
+        occurrences[(score, duration)][subset]
+        for subset, score, duration in zip(table['filters_mask'], table['score_threshold'], table['max_duration'])
+    ])
+    table = table.sort_values([f"train_{rank_by}", 'train_win_rate'], ascending=False, kind='mergesort').reset_index(drop=True)
+    table.insert(0, 'rank', table.index + 1)
+    return table
+
+
+# -----------------------------------------------
+# Command line: python combo_search.py --mode at_least --score 2 3 --min-occurrences 30
+# -----------------------------------------------
+
+def main(argv=None):
+    from data_cache import load_enriched_prices
+
+    parser = argparse.ArgumentParser(description="Search every filter subset as the allowed-combo rule of run_backtest_v2")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    parser.add_argument('--mode', choices=MODES, default='exact')
+    add_grid_arguments(parser)
+    parser.add_argument('--min-occurrences', type=int, default=20)
+    parser.add_argument('--test-fraction', type=float, default=0.3)
+    parser.add_argument('--rank-by', default='total_pnl_pct')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20, help="rows to print")
+    parser.add_argument('--out', default=None, help="optional path to save the full table as CSV")
+    args = parser.parse_args(argv)
+    if args.combos:
+        parser.error("--combos is what this tool searches over; leave it out")
+
+    table = search_filter_subsets(
+        load_enriched_prices(args.csv),
+        grid_from_args(args),
+        mode=args.mode,
+        test_fraction=args.test_fraction,
+        min_occurrences=args.min_occurrences,
+        processes=args.processes,
+        rank_by=args.rank_by
+    )
+    print(table.head(args.top).to_string(index=False))
+    print(f"✅ Evaluated {len(table)} subset configurations")
+
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"✅ Saved search table to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+# data_cache.py
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, instrumented
+from transformation import add_all_indicators
+
+# -----------------------------------------------
+# Columnar On-Disk Cache for Candles and fact_prices
+# -----------------------------------------------
+
+"""
+main.py used to re-parse the candles CSV (pd.read_csv + pd.to_datetime) and recompute
+every indicator on every run. This module stores both steps in a columnar binary file:
+
+- raw candles:     <cache_dir>/candles_<name>_<key>.parquet
+- fact_prices:     <cache_dir>/prices_<name>_<key>.parquet
+
+The key is a hash of the source file CONTENTS plus (for fact_prices) the indicator
+parameters, the source code of the indicator modules (INDICATOR_SOURCES) and
+CACHE_VERSION, so a changed CSV, different settings or edited indicator code never reuse
+stale data. To avoid re-hashing big files on every start, the hash is remembered per
+(path, size, modified time) in <cache_dir>/file_hashes.json.
+
+Cache files and file_hashes.json are written to a temp file and moved into place, so a
+crash mid-write never leaves a corrupt file that the next run would read.
+
+Parquet needs pyarrow; without it the cache falls back to pandas pickle files.
+"""
+
+# Bump when the cache file layout changes (indicator code changes are picked up from
+# INDICATOR_SOURCES automatically)
+CACHE_VERSION = 1
+
+# Modules whose source is part of the fact_prices cache key
+INDICATOR_SOURCES = ['transformation.py', 'indicator_graph.py']
+
+DEFAULT_CACHE_DIR = ".cache"
+
+DEFAULT_INDICATOR_PARAMS = {
+    'rsi_period': 14,
+    'bb_period': 20,
+    'bb_multiplier': 2,
+    'atr_period': 14,
+}
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = "parquet"
+except ImportError:
+    CACHE_FORMAT = "pkl"
+
+
+def _replace_atomically(path, write):
+    # write(tmp_path) then rename: readers see the old file or the new one, never half of one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_hash_index(index_path):
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except ValueError:
+        # Unreadable index (e.g. from an older, non-atomic write): start over
+        return {}
+
+
+def file_hash(path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    SHA-256 of a file's contents, remembered per (path, size, mtime) so unchanged files
+    are only hashed once.
+    """
+    stat = os.stat(path)
+    index_path = os.path.join(cache_dir, "file_hashes.json")
+    index_key = os.path.abspath(path)
+
+    index = _read_hash_index(index_path)
+    known = index.get(index_key)
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known['sha256']
+
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    index[index_key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+    _replace_atomically(index_path, write)
+
+    return digest
+
+
+_indicator_code_hash = None
+
+
+def indicator_code_hash():
+    """
+    SHA-256 of the INDICATOR_SOURCES files (computed once per process).
+    """
+    global _indicator_code_hash
+    if _indicator_code_hash is None:
+        sha = hashlib.sha256()
+        folder = os.path.dirname(os.path.abspath(__file__))
+        for name in INDICATOR_SOURCES:
+            with open(os.path.join(folder, name), 'rb') as f:
+                sha.update(f.read())
+        _indicator_code_hash = sha.hexdigest()
+    return _indicator_code_hash
+
+
+def _cache_path(cache_dir, kind, source_path, key):
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(cache_dir, f"{kind}_{name}_{key[:16]}.{CACHE_FORMAT}")
+
+
+def _read_cache(path):
+    if CACHE_FORMAT == "parquet":
+        return pd.read_parquet(path)
+    return pd.read_pickle(path)
+
+
+def _write_cache(df, path):
+    if CACHE_FORMAT == "parquet":
+        _replace_atomically(path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    else:
+        _replace_atomically(path, df.to_pickle)
+
+
+def read_candles_csv(csv_path):
+    """
+    Loads a candles CSV (format of ethusdt_1m_month.csv) with parsed timestamps.
+    """
+    df = pd.read_csv(csv_path)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df
+
+
+@instrumented('load_candles', rows=len)
+def load_candles(csv_path, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    """
+    Raw OHLCV candles from csv_path, served from the columnar cache when the CSV hasn't changed.
+    """
+    if not use_cache:
+        return read_candles_csv(csv_path)
+
+    path = _cache_path(cache_dir, "candles", csv_path, file_hash(csv_path, cache_dir))
+    if os.path.exists(path):
+        count('cache_hits', kind='candles')
+        return _read_cache(path)
+
+    count('cache_misses', kind='candles')
+    df = read_candles_csv(csv_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_cache(df, path)
+    return df
+
+
+@instrumented('load_enriched_prices', rows=len)
+def load_enriched_prices(csv_path, indicator_params=None, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, compact=False):
+    """
+    fact_prices (candles + every indicator from add_all_indicators) for csv_path,
+    served from the columnar cache when the CSV and indicator parameters haven't changed.
+
+    Parameters:
+    - csv_path: candles CSV
+    - indicator_params: overrides for DEFAULT_INDICATOR_PARAMS (rsi_period, bb_period, ...)
+    - cache_dir: folder for cache files
+    - use_cache: False forces a fresh parse + recompute (nothing is read or written)
+    - compact: return compact_prices() of the result (the cache itself stays full precision)
+    """
+    if compact:
+        return compact_prices(load_enriched_prices(csv_path, indicator_params, cache_dir, use_cache))
+
+    params = dict(DEFAULT_INDICATOR_PARAMS)
+    params.update(indicator_params or {})
+
+    if not use_cache:
+        return add_all_indicators(read_candles_csv(csv_path), **params)
+
+    key_source = json.dumps({
+        'file': file_hash(csv_path, cache_dir),
+        'params': params,
+        'code': indicator_code_hash(),
+        'version': CACHE_VERSION,
+    }, sort_keys=True)
+    key = hashlib.sha256(key_source.encode()).hexdigest()
+
+    path = _cache_path(cache_dir, "prices", csv_path, key)
+    if os.path.exists(path):
+        count('cache_hits', kind='prices')
+        return _read_cache(path)
+
+    count('cache_misses', kind='prices')
+    df = add_all_indicators(load_candles(csv_path, cache_dir), **params)
+    _write_cache(df, path)
+    return df
+
+
+# -----------------------------------------------
+# Compact fact_prices (categoricals + float32)
+# -----------------------------------------------
+
+"""
+Every candle row repeats the symbol / exchange / interval strings and stores prices and
+indicators as float64. compact_prices() turns the repeated strings into categoricals
+(one small int per row) and float columns into float32 where that keeps their precision,
+roughly halving the row size. float32 keeps ~7 significant digits, so OHLC prices stay
+float64 when float32 can't hold them to the tick (e.g. 2 decimals above ~100k).
+
+Indicators and signals should still be computed on full-precision data: comparisons like
+close > bb_upper can flip on float32 rounding. Compact frames are for holding and
+analysing many symbols / long histories at once.
+"""
+
+CATEGORY_COLUMNS = ['symbol', 'exchange', 'interval']
+PRICE_COLUMNS = ['open', 'high', 'low', 'close']
+
+
+def _fits_float32(full, small, decimals, max_rel_error):
+    wide = small.astype(np.float64)
+    if decimals is not None:
+        return np.array_equal(np.round(wide, decimals), np.round(full, decimals), equal_nan=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error = np.abs(wide - full) / np.abs(full)
+    error = error[~np.isnan(error)]
+    return not len(error) or error.max() <= max_rel_error
+
+
+def compact_prices(df, price_decimals=2, max_rel_error=1e-6):
+    """
+    Memory-lean copy of a candles / fact_prices frame.
+
+    Parameters:
+    - df: candles or fact_prices DataFrame
+    - price_decimals: tick precision of open/high/low/close; they only become float32 if
+      every value still rounds to the same price (None = use max_rel_error instead)
+    - max_rel_error: other float columns become float32 only if no value moves by more
+      than this fraction (columns that don't fit stay float64)
+    """
+    compact = {}
+    for column in df.columns:
+        values = df[column]
+        if column in CATEGORY_COLUMNS:
+            compact[column] = values.astype('category')
+            continue
+        if values.dtype == object and column != 'timestamp':
+            # Indicator columns can be object dtype (pd.NA) when the frame was short
+            values = pd.to_numeric(values, errors='coerce')
+        if values.dtype == np.float64:
+            full = values.to_numpy()
+            with np.errstate(over='ignore'):
+                small = full.astype(np.float32)
+            decimals = price_decimals if column in PRICE_COLUMNS else None
+            if _fits_float32(full, small, decimals, max_rel_error):
+                values = pd.Series(small, index=df.index, name=column)
+        compact[column] = values
+    return pd.DataFrame(compact, index=df.index)
+
+
+def concat_compact(frames):
+    """
+    pd.concat for compact frames of several symbols, keeping categorical columns categorical
+    (plain pd.concat falls back to object when the categories differ).
+    """
+    frames = [f for f in frames if len(f)]
+    if not frames:
+        return pd.DataFrame()
+    union = {}
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            union[column] = pd.api.types.union_categoricals([f[column] for f in frames]).categories
+    aligned = [
+        f.assign(**{c: f[c].cat.set_categories(categories) for c, categories in union.items()})
+        for f in frames
+    ]
+    return pd.concat(aligned, ignore_index=True)
+
+
+def memory_mb(df):
+    """
+    Real in-memory size of a DataFrame in MB (including Python objects in object columns).
+    """
+    return round(df.memory_usage(index=True, deep=True).sum() / 1024 / 1024, 2)
@@ -0,0 +1,184 @@
+# data_sync.py
+import os
+import time
+
+import pandas as pd
+
+from extracting import fetch_kucoin_candles_paginated, timeframe_to_ms
+
+# -----------------------------------------------
+# Incremental Candle Sync (resume from the last stored candle)
+# -----------------------------------------------
+
+"""
+Instead of re-downloading 35 days and overwriting the CSV on every refresh, sync_candles():
+
+1. Reads the LAST stored timestamp of the symbol/interval CSV (only the file's tail is read).
+2. Fetches only candles newer than that with fetch_kucoin_candles_paginated(since=...).
+3. Drops the still-open current candle, so a partial candle is never stored.
+4. Detects missing candles between the last stored one and the newest fetched one and
+   re-fetches exactly those ranges (back-fill). Minutes the exchange still doesn't have
+   (e.g. no trades / exchange downtime) are reported, not invented.
+5. Appends the new rows to the CSV (mode='a') - the existing file is never rewritten.
+
+Store layout: one CSV per symbol and interval, same columns as ethusdt_1m_month.csv.
+find_gaps() can also be used to audit an existing store.
+"""
+
+DEFAULT_DATA_DIR = "data"
+
+
+def store_path(symbol, timeframe='1m', data_dir=DEFAULT_DATA_DIR):
+    """
+    'ETH/USDT', '1m' -> data/ETH-USDT_1m.csv
+    """
+    return os.path.join(data_dir, f"{symbol.replace('/', '-')}_{timeframe}.csv")
+
+
+def _last_complete_row(csv_path, tail_bytes=4096):
+    # (timestamp of the last complete row, byte offset where that row ends)
+    with open(csv_path, 'rb') as f:
+        header = f.readline()
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        start = max(len(header), size - tail_bytes)
+        f.seek(start)
+        tail = f.read()
+
+    columns = header.decode().strip().split(',')
+    # A row is complete when it ends with a newline and has every field: an append that
+    # was interrupted leaves a truncated last line, which is skipped (and cut off by sync)
+    lines = tail.split(b'\n')
+    line_end = size
+    first = 1 if start > len(header) else 0  # lines[0] may start mid-row
+    for i in range(len(lines) - 1, first - 1, -1):
+        line = lines[i]
+        fields = line.decode().rstrip('\r').split(',')
+        if i < len(lines) - 1 and line.strip() and len(fields) == len(columns):
+            return pd.Timestamp(fields[columns.index('timestamp')]), line_end + 1
+        line_end -= len(line) + 1
+
+    if first:
+        # Nothing complete in the tail: look at the whole file
+        return _last_complete_row(csv_path, size)
+    return None, len(header)
+
+
+def read_last_timestamp(csv_path, tail_bytes=4096):
+    """
+    Timestamp of the last complete row of a candles CSV, reading only the end of the file.
+    A truncated last line (no trailing newline or missing fields) is ignored.
+    Returns None if the file is missing or has no complete data rows.
+    """
+    if not os.path.exists(csv_path):
+        return None
+    return _last_complete_row(csv_path, tail_bytes)[0]
+
+
+def find_gaps(timestamps, timeframe='1m'):
+    """
+    Finds missing candles in a sorted series of timestamps.
+
+    Returns a DataFrame with one row per gap: gap_start, gap_end (first and last missing
+    candle) and missing (number of candles).
+    """
+    ts = pd.Series(pd.to_datetime(timestamps)).sort_values().reset_index(drop=True)
+    step = pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+    diffs = ts.diff()
+    gap_rows = diffs[diffs > step].index
+
+    return pd.DataFrame({
+        'gap_start': ts[gap_rows - 1].to_numpy() + step,
+        'gap_end': ts[gap_rows].to_numpy() - step,
+        'missing': ((diffs[gap_rows] // step) - 1).to_numpy(dtype='int64'),
+    })
+
+
+def _to_ms(ts):
+    return int(pd.Timestamp(ts).value // 1_000_000)
+
+
+def sync_candles(symbol='ETH/USDT', timeframe='1m', csv_path=None, fetch_fn=fetch_kucoin_candles_paginated,
+                 initial_days=35, backfill=True, batch_size=1000):
+    """
+    Brings the stored CSV of one symbol/interval up to date and appends the new candles.
+
+    Parameters:
+    - csv_path: store file (default: store_path(symbol, timeframe))
+    - fetch_fn: function with the fetch_kucoin_candles_paginated() signature
+    - initial_days: history to download when the store doesn't exist yet
+    - backfill: re-fetch missing candles found in the new range before appending
+
+    Returns a dict with new_rows, api_requests (fetch_fn calls), gaps_filled, gaps_remaining.
+    """
+    if csv_path is None:
+        csv_path = store_path(symbol, timeframe)
+
+    step_ms = timeframe_to_ms(timeframe)
+    now_ms = int(time.time() * 1000)
+    # Only keep candles that have fully closed
+    until_ms = now_ms // step_ms * step_ms
+
+    last_ts = None
+    if os.path.exists(csv_path):
+        last_ts, complete_bytes = _last_complete_row(csv_path)
+        if complete_bytes < os.path.getsize(csv_path):
+            # Cut off the half-written row of an interrupted append before appending again
+            with open(csv_path, 'r+b') as f:
+                f.truncate(complete_bytes)
+    if last_ts is None:
+        since_ms = until_ms - initial_days * 86_400_000
+    else:
+        since_ms = _to_ms(last_ts) + step_ms
+
+    summary = {'symbol': symbol, 'new_rows': 0, 'api_requests': 0, 'gaps_filled': 0, 'gaps_remaining': 0}
+    if since_ms >= until_ms:
+        return summary
+
+    def fetch(start_ms, end_ms):
+        summary['api_requests'] += 1
+        expected = -(-(end_ms - start_ms) // step_ms)
+        return fetch_fn(symbol=symbol, timeframe=timeframe, total_limit=expected,
+                        batch_size=batch_size, since=start_ms, until=end_ms)
+
+    new = fetch(since_ms, until_ms)
+    new = new[new['timestamp'] < pd.Timestamp(until_ms, unit='ms')]
+
+    if backfill and len(new):
+        # Include the last stored candle so a gap right after it is detected too
+        check = new['timestamp'] if last_ts is None else pd.concat([pd.Series([last_ts]), new['timestamp']])
+        gaps = find_gaps(check, timeframe)
+        filled = [new]
+        for gap in gaps.itertuples(index=False):
+            patch = fetch(_to_ms(gap.gap_start), _to_ms(gap.gap_end) + step_ms)
+            if len(patch):
+                summary['gaps_filled'] += 1
+                filled.append(patch)
+        new = pd.concat(filled, ignore_index=True)
+        new = new.drop_duplicates(subset=['timestamp'], keep='last').sort_values('timestamp').reset_index(drop=True)
+
+        check = new['timestamp'] if last_ts is None else pd.concat([pd.Series([last_ts]), new['timestamp']])
+        summary['gaps_remaining'] = len(find_gaps(check, timeframe))
+
+    if len(new):
+        os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+        write_header = not os.path.exists(csv_path)
+        if not write_header:
+            # Keep the stored column order
+            columns = pd.read_csv(csv_path, nrows=0).columns.tolist()
+            new = new[columns]
+        new.to_csv(csv_path, mode='a', header=write_header, index=False)
+
+    summary['new_rows'] = len(new)
+    return summary
+
+
+def sync_all(symbols, timeframe='1m', data_dir=DEFAULT_DATA_DIR, **kwargs):
+    """
+    sync_candles() for several symbols. Returns one summary row per symbol.
+    """
+    rows = []
+    for symbol in symbols:
+        rows.append(sync_candles(symbol, timeframe, csv_path=store_path(symbol, timeframe, data_dir), **kwargs))
+        print(f"✅ {symbol} {timeframe}: +{rows[-1]['new_rows']} candles")
+    return pd.DataFrame(rows)
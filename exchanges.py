@@ -0,0 +1,257 @@
+# exchanges.py
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from extracting import timeframe_to_ms
+from instrumentation import count
+
+# -----------------------------------------------
+# Exchange Connectors (one long-lived session per venue)
+# -----------------------------------------------
+
+"""
+fetch_kucoin_candles_paginated() used to build a new ccxt.kucoin() on every call: a new
+HTTP session (no connection reuse), markets loaded again, KuCoin only.
+
+A Connector wraps ONE exchange instance per venue for the life of the process:
+
+- get_connector('kucoin') / get_connector('binance') / ... returns the same Connector for
+  the same venue + config, so the ccxt instance and its HTTP session (keep-alive
+  connections) are reused by every fetch
+- markets are loaded once, on the first request, and symbols are checked against them
+- fetch_ohlcv() / fetch_candles() are the same for every venue; fetch_candles() returns
+  the fetch_kucoin_candles_paginated() DataFrame format (and signature, so it can be a
+  data_sync fetch_fn)
+- ccxt's own rate limiter (enableRateLimit) spaces requests instead of a fixed sleep;
+  network / rate-limit errors are retried with exponential backoff
+
+get_connector('fake', latency=0.05, rate_limit_every=20) gives the same interface over
+fake_exchange.SyncFakeExchange: deterministic candles, no network, for tests and for
+benchmarking ingestion (see the command line below).
+
+ccxt is only imported when a real venue is first used.
+"""
+
+DEFAULT_VENUE = 'kucoin'
+
+_connectors = {}
+_connectors_lock = threading.Lock()
+
+
+def retryable_errors():
+    """
+    Exception classes worth retrying: ccxt.NetworkError (includes rate limits and timeouts).
+    Without ccxt: connection errors, timeouts and the fake exchange's rate-limit error, so
+    programming errors and permanent errors still raise right away.
+    """
+    try:
+        import ccxt
+        return (ccxt.NetworkError,)  # includes RateLimitExceeded / DDoSProtection / timeouts
+    except ImportError:
+        from fake_exchange import FakeRateLimitExceeded
+        return (ConnectionError, TimeoutError, FakeRateLimitExceeded)
+
+
+def create_exchange(venue, **config):
+    """
+    New exchange instance for `venue`: a ccxt exchange id ('kucoin', 'binance', 'okx', ...)
+    or 'fake' (fake_exchange.SyncFakeExchange, config = its parameters).
+    """
+    if venue == 'fake':
+        from fake_exchange import SyncFakeExchange
+        return SyncFakeExchange(**config)
+
+    import ccxt  # imported here so this module can be imported without ccxt installed
+    if not hasattr(ccxt, venue):
+        raise ValueError(f"Unknown exchange '{venue}' (not in ccxt.exchanges)")
+    return getattr(ccxt, venue)({'enableRateLimit': True, **config})
+
+
+class Connector:
+    """
+    Long-lived OHLCV access to one venue.
+
+    Parameters:
+    - venue: ccxt exchange id or 'fake'
+    - exchange: optional ready-made exchange instance (default: create_exchange(venue, **config))
+    - retries / retry_wait: retries of a failed request, first wait in seconds (doubles)
+    - config: passed to create_exchange()
+    """
+
+    def __init__(self, venue=DEFAULT_VENUE, exchange=None, retries=3, retry_wait=0.5, **config):
+        self.venue = venue
+        self.config = config
+        self.retries = retries
+        self.retry_wait = retry_wait
+        self._exchange = exchange
+        self._markets = None
+        self._lock = threading.RLock()
+        self._retry_on = None
+
+    @property
+    def exchange(self):
+        if self._exchange is None:
+            with self._lock:
+                if self._exchange is None:
+                    self._exchange = create_exchange(self.venue, **self.config)
+        return self._exchange
+
+    @property
+    def exchange_name(self):
+        """
+        Value of the `exchange` column, e.g. 'KuCoin'.
+        """
+        return getattr(self.exchange, 'name', None) or self.venue
+
+    @property
+    def markets(self):
+        """
+        Markets of the venue, loaded on first use and kept.
+        """
+        if self._markets is None:
+            with self._lock:
+                if self._markets is None:
+                    count('api_calls', api='load_markets', exchange=self.venue)
+                    self._markets = self._call(self.exchange.load_markets, 'load_markets')
+        return self._markets
+
+    def _call(self, method, label, *args, **kwargs):
+        if self._retry_on is None:
+            self._retry_on = retryable_errors()
+        for attempt in range(self.retries + 1):
+            try:
+                return method(*args, **kwargs)
+            except self._retry_on as e:
+                if attempt == self.retries:
+                    raise
+                wait = self.retry_wait * (2 ** attempt)
+                count('api_retries', api=label, exchange=self.venue)
+                print(f"⚠️ {self.venue} {label} failed ({e}), retrying in {wait:.1f}s")
+                time.sleep(wait)
+
+    def check_symbol(self, symbol):
+        if symbol not in self.markets:
+            raise ValueError(f"{self.venue} has no market '{symbol}'")
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        """
+        Raw [timestamp, open, high, low, close, volume] lists, same as ccxt fetch_ohlcv().
+        """
+        self.check_symbol(symbol)
+        count('api_calls', api='fetch_ohlcv', exchange=self.venue)
+        return self._call(self.exchange.fetch_ohlcv, 'fetch_ohlcv', symbol, timeframe=timeframe, since=since, limit=limit)
+
+    def fetch_candles(self, symbol='ETH/USDT', timeframe='1m', total_limit=50000, batch_size=1000, since=None, until=None):
+        """
+        Fetches up to total_limit candles page by page.
+
+        Parameters:
+        - since: start as datetime or ms timestamp (default: 35 days ago)
+        - until: optional end (exclusive) as datetime or ms timestamp
+
+        Returns a DataFrame with timestamp, OHLCV, symbol, exchange, interval.
+        """
+        if since is None:
+            since_dt = datetime.now(timezone.utc) - timedelta(days=35)
+            since = int(since_dt.timestamp() * 1000)
+        elif isinstance(since, datetime):
+            since = int(since.timestamp() * 1000)
+        if isinstance(until, datetime):
+            until = int(until.timestamp() * 1000)
+
+        step = timeframe_to_ms(timeframe)
+        all_candles = []
+        while len(all_candles) < total_limit:
+            limit = min(batch_size, total_limit - len(all_candles))
+            candles = self.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
+
+            if until is not None:
+                candles = [c for c in candles if c[0] < until]
+
+            if not candles:
+                break
+
+            # Avoid duplicates
+            if all_candles and candles[-1][0] <= all_candles[-1][0]:
+                break
+
+            all_candles += candles
+            since = candles[-1][0] + step
+
+        df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df['symbol'] = symbol
+        df['exchange'] = self.exchange_name
+        df['interval'] = timeframe
+        return df
+
+    def close(self):
+        if self._exchange is not None and hasattr(self._exchange, 'close'):
+            self._exchange.close()
+        self._exchange = None
+        self._markets = None
+
+
+def get_connector(venue=DEFAULT_VENUE, **config):
+    """
+    The process-wide Connector for venue + config (created on first use).
+    """
+    key = (venue, json.dumps(config, sort_keys=True, default=str))
+    with _connectors_lock:
+        connector = _connectors.get(key)
+        if connector is None:
+            connector = _connectors[key] = Connector(venue, **config)
+    return connector
+
+
+def close_connectors():
+    """
+    Closes and forgets every cached connector.
+    """
+    with _connectors_lock:
+        for connector in _connectors.values():
+            connector.close()
+        _connectors.clear()
+
+
+# -----------------------------------------------
+# Command line: python exchanges.py --venue fake --latency 0.02 --rate-limit-every 25
+# -----------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch candles through a connector (ingestion benchmark)")
+    parser.add_argument('--venue', default='fake', help="ccxt exchange id, or 'fake' for the offline fake exchange")
+    parser.add_argument('--symbol', default='ETH/USDT')
+    parser.add_argument('--timeframe', default='1m')
+    parser.add_argument('--total-limit', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.0, help="fake venue: seconds per request")
+    parser.add_argument('--rate-limit-every', type=int, default=None, help="fake venue: every Nth request is rate limited")
+    parser.add_argument('--out', default=None, help="optional CSV path")
+    args = parser.parse_args(argv)
+
+    config = {}
+    if args.venue == 'fake':
+        since = int((datetime.now(timezone.utc) - timedelta(days=35)).timestamp() * 1000)
+        config = {'start_ms': since, 'latency': args.latency, 'rate_limit_every': args.rate_limit_every}
+    connector = get_connector(args.venue, retry_wait=0.0 if args.venue == 'fake' else 0.5, **config)
+
+    start = time.perf_counter()
+    df = connector.fetch_candles(args.symbol, args.timeframe, total_limit=args.total_limit, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(df)} candles from {connector.exchange_name} in {elapsed:.2f}s "
+          f"({len(df) / elapsed if elapsed > 0 else 0:.0f} candles/s)")
+
+    if args.out:
+        df.to_csv(args.out, index=False)
+        print(f"✅ Saved {len(df)} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
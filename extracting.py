@@ -1,7 +1,4 @@
 # extracting.py
-import ccxt
-import pandas as pd
-from datetime import datetime, timedelta
 """
 def fetch_kucoin_candles(symbol='ETH/USDT', timeframe='1m', limit=3000):
     kucoin = ccxt.kucoin()
@@ -90,40 +87,40 @@ print(df.tail())
  Use Pagination with since Parameter
 """
 
-import time
-
-def fetch_kucoin_candles_paginated(symbol='ETH/USDT', timeframe='1m', total_limit=50000, batch_size=1000):
-    kucoin = ccxt.kucoin()
-    all_candles = []
-
-    # Go back enough to ensure 3000+ candles are available
-    start_minutes_ago = total_limit + 60  # add buffer
-    since_dt = datetime.utcnow() - timedelta(days=35)
-    since = int(since_dt.timestamp() * 1000)
-
-    while len(all_candles) < total_limit:
-        limit = min(batch_size, total_limit - len(all_candles))
-        candles = kucoin.fetch_ohlcv(symbol, timeframe=timeframe, since=since, limit=limit)
-
-        if not candles:
-            break
-
-        # Avoid duplicates
-        if all_candles and candles[-1][0] <= all_candles[-1][0]:
-            break
-
-        all_candles += candles
-        since = candles[-1][0] + 60_000  # 1 minute in ms
-        time.sleep(0.4)
-
-    df = pd.DataFrame(all_candles, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-    df.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-    df['symbol'] = symbol
-    df['exchange'] = 'KuCoin'
-    df['interval'] = timeframe
-    return df
-
-df = fetch_kucoin_candles_paginated()
-df.to_csv('ethusdt_1m_month.csv', index=False)
-print(f"✅ Fetched and saved {len(df)} rows to ethusdt_1m_month.csv")
+TIMEFRAME_MS = {
+    's': 1_000,
+    'm': 60_000,
+    'h': 3_600_000,
+    'd': 86_400_000,
+    'w': 604_800_000,
+}
+
+
+def timeframe_to_ms(timeframe):
+    """
+    '1m' -> 60000, '4h' -> 14400000
+    """
+    return int(timeframe[:-1]) * TIMEFRAME_MS[timeframe[-1]]
+
+
+def fetch_kucoin_candles_paginated(symbol='ETH/USDT', timeframe='1m', total_limit=50000, batch_size=1000, since=None, until=None, venue='kucoin'):
+    """
+    Fetches up to total_limit candles page by page.
+
+    Parameters:
+    - since: start as datetime or ms timestamp (default: 35 days ago)
+    - until: optional end (exclusive) as datetime or ms timestamp
+    - venue: ccxt exchange id (or 'fake'); the process-wide connector of that venue is
+      reused, so the HTTP session and loaded markets carry over between calls
+    """
+    from exchanges import get_connector  # imported here: exchanges.py imports timeframe_to_ms from this module
+
+    return get_connector(venue).fetch_candles(
+        symbol=symbol, timeframe=timeframe, total_limit=total_limit,
+        batch_size=batch_size, since=since, until=until
+    )
+
+if __name__ == "__main__":
+    df = fetch_kucoin_candles_paginated()
+    df.to_csv('ethusdt_1m_month.csv', index=False)
+    print(f"✅ Fetched and saved {len(df)} rows to ethusdt_1m_month.csv")
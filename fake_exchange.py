@@ -0,0 +1,152 @@
+# fake_exchange.py
+import asyncio
+import math
+import time
+import zlib
+
+from extracting import timeframe_to_ms
+
+# -----------------------------------------------
+# Local Fake Exchange (serves deterministic OHLCV pages)
+# -----------------------------------------------
+
+"""
+Stand-in for a ccxt exchange so the downloaders and connectors can be tested and
+benchmarked without network access. It answers fetch_ohlcv() the same way KuCoin does: up
+to `limit` candles starting at `since`, oldest first, timestamps in milliseconds.
+
+- FakeExchange: async (ccxt.async_support style), for async_downloader.py
+- SyncFakeExchange: blocking (plain ccxt style), for exchanges.py connectors
+
+Candles are a pure function of (symbol, timestamp), so the same minute always returns
+the same candle no matter which page or shard asked for it. Latency per request and
+rate-limit errors are configurable; errors are FakeRateLimitExceeded, a subclass of
+ccxt.RateLimitExceeded when ccxt is installed, so retry code sees what it would see live.
+"""
+
+try:
+    from ccxt import RateLimitExceeded as _RateLimitBase
+except ImportError:  # ccxt is optional for offline tests
+    _RateLimitBase = Exception
+
+
+class FakeRateLimitExceeded(_RateLimitBase):
+    pass
+
+
+def fake_candle(symbol, timestamp_ms, base_price=1800.0):
+    """
+    Deterministic [timestamp, open, high, low, close, volume] for one candle.
+    """
+    noise = zlib.crc32(f"{symbol}|{timestamp_ms}".encode()) / 0xFFFFFFFF  # 0..1
+    minutes = timestamp_ms / 60_000
+    mid = base_price * (1 + 0.02 * math.sin(minutes / 240) + 0.005 * math.sin(minutes / 17))
+    open_ = mid * (1 + (noise - 0.5) * 0.001)
+    close = mid * (1 - (noise - 0.5) * 0.001)
+    high = max(open_, close) * (1 + noise * 0.0005)
+    low = min(open_, close) * (1 - (1 - noise) * 0.0005)
+    volume = 5 + 50 * noise
+    return [timestamp_ms, round(open_, 2), round(high, 2), round(low, 2), round(close, 2), round(volume, 6)]
+
+
+class FakeExchange:
+    """
+    Minimal async ccxt-like exchange.
+
+    Parameters:
+    - start_ms / end_ms: first and last candle the exchange has (ms); end defaults to "no end"
+    - latency: seconds to sleep per request (simulates the network round trip)
+    - max_limit: biggest page the exchange serves (KuCoin: 1500)
+    - symbols: markets returned by load_markets()
+    - rate_limit_every: every Nth request fails with FakeRateLimitExceeded (None = never)
+    - max_requests_per_second: requests beyond this within one second fail (None = no limit)
+    """
+
+    def __init__(self, id='fake', start_ms=0, end_ms=None, latency=0.0, max_limit=1500, base_price=1800.0,
+                 symbols=('ETH/USDT', 'BTC/USDT'), rate_limit_every=None, max_requests_per_second=None):
+        self.id = id
+        self.name = id.capitalize()
+        self.start_ms = start_ms
+        self.end_ms = end_ms
+        self.latency = latency
+        self.max_limit = max_limit
+        self.base_price = base_price
+        self.symbols = list(symbols)
+        self.markets = None
+        self.rate_limit_every = rate_limit_every
+        self.max_requests_per_second = max_requests_per_second
+        self.calls = 0
+        self.rate_limited = 0
+        self.markets_loaded = 0
+        self._window_start = 0.0
+        self._window_calls = 0
+
+    def _check_rate_limit(self):
+        self.calls += 1
+        limited = bool(self.rate_limit_every) and self.calls % self.rate_limit_every == 0
+        if self.max_requests_per_second:
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_calls = 0
+            self._window_calls += 1
+            limited = limited or self._window_calls > self.max_requests_per_second
+        if limited:
+            self.rate_limited += 1
+            raise FakeRateLimitExceeded(f"{self.id} 429 Too Many Requests (call {self.calls})")
+
+    def _markets(self):
+        self.markets_loaded += 1
+        self.markets = {symbol: {'symbol': symbol, 'active': True} for symbol in self.symbols}
+        return self.markets
+
+    def _page(self, symbol, timeframe, since, limit):
+        step = timeframe_to_ms(timeframe)
+        limit = min(limit or self.max_limit, self.max_limit)
+        since = self.start_ms if since is None else max(since, self.start_ms)
+        first = -(-since // step) * step  # first candle open at or after `since`
+
+        candles = []
+        ts = first
+        while len(candles) < limit and (self.end_ms is None or ts <= self.end_ms):
+            candles.append(fake_candle(symbol, ts, self.base_price))
+            ts += step
+        return candles
+
+    async def load_markets(self, reload=False):
+        if self.markets is None or reload:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            self._markets()
+        return self.markets
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._check_rate_limit()
+        return self._page(symbol, timeframe, since, limit)
+
+    async def close(self):
+        pass
+
+
+class SyncFakeExchange(FakeExchange):
+    """
+    Blocking variant of FakeExchange (same parameters), like a plain ccxt exchange.
+    """
+
+    def load_markets(self, reload=False):
+        if self.markets is None or reload:
+            if self.latency:
+                time.sleep(self.latency)
+            self._markets()
+        return self.markets
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        if self.latency:
+            time.sleep(self.latency)
+        self._check_rate_limit()
+        return self._page(symbol, timeframe, since, limit)
+
+    def close(self):
+        pass
@@ -0,0 +1,243 @@
+# forward_paths.py
+import argparse
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtester import find_entry_candidates, get_backtest_arrays
+
+# -----------------------------------------------
+# Forward-Path Matrix and Broadcast TP / SL / Duration Grid
+# -----------------------------------------------
+
+"""
+resolve_trade() walks the next max_duration candles of ONE entry for ONE tp_k / sl_k pair,
+so mapping the TP/SL surface means re-running the backtest per grid point.
+
+forward_windows() exposes, for every candle i, the next `horizon` highs / lows / closes /
+ATRs as rows of a (n - horizon, horizon) strided view of the original arrays (no copy).
+evaluate_exit_grid() takes the rows of the entry candidates and resolves the exits of a
+whole tp_k x sl_k x max_duration grid at once:
+
+- TP:       first candle with high >= entry + tp_k * atr, per tp_k           (tp, m, horizon)
+- SL:       trailing SL = running max (np.maximum.accumulate) of
+            close - sl_k * atr, floored at entry - sl_k * atr; first candle
+            with low <= trailing SL, per sl_k                                (sl, m, horizon)
+- combined: TP and SL only depend on their own multiplier, so the first hits broadcast
+            to (tp, sl, m); a duration d exits at the earlier hit if it is within d
+            candles, otherwise at the close of candle d                       (tp, sl, d, m)
+
+Exit rules are those of resolve_trade(), with identical prices and PnL per trade:
+the trailing SL includes the current candle's close before the low is checked, and when
+TP and SL are hit on the same candle TP wins. score_override=True keeps run_backtest_v2's
+2.2 / 1.2 multipliers for match_score >= 5 entries.
+
+What the grid does NOT model: the loss cooldown (it depends on each grid point's own exit
+sequence). The grid ignores it entirely and trades every candidate, overlapping trades
+included. That is not the same as cooldown_after_loss=0: run_backtest_v2 still skips every
+entry up to a losing trade's exit then (553 trades vs the grid's 593 on the bundled month at
+tp 1.95 / sl 1.5 / 3 candles). So no grid point reproduces a run_backtest_v2 run exactly.
+All grid points use the same candidates: the entries with a full max(durations) forward
+path. Use sweep.py to confirm a few chosen points with the exact engine.
+"""
+
+FORWARD_COLUMNS = ['high', 'low', 'close', 'atr']
+
+
+def forward_windows(arrays, horizon):
+    """
+    {column: (n - horizon, horizon) view}, row i = values of candles i+1 .. i+horizon.
+    Rows exist for every candle that has `horizon` candles after it.
+    """
+    return {
+        name: sliding_window_view(arrays[name][1:], horizon)
+        for name in FORWARD_COLUMNS
+    }
+
+
+def _first_true(mask):
+    # Index of the first True along the last axis, or mask.shape[-1] when there is none
+    first = mask.argmax(axis=-1)
+    first[~mask.any(axis=-1)] = mask.shape[-1]
+    return first
+
+
+def _chunk_size(n_cells_per_entry, max_cells=4_000_000):
+    return max(1, max_cells // max(1, n_cells_per_entry))
+
+
+def resolve_exit_grid(arrays, windows, entries, tp_ks, sl_ks, durations, score_override=True):
+    """
+    PnL (%) and exit reason codes of every entry for every grid point.
+
+    Parameters:
+    - arrays: dict from get_backtest_arrays()
+    - windows: forward_windows(arrays, max(durations))
+    - entries: entry indices (each needs a full forward window)
+    - tp_ks / sl_ks / durations: 1-D grids
+
+    Returns (pnl, reason), both shaped (len(tp_ks), len(sl_ks), len(durations), len(entries));
+    reason is 0 = tp_hit, 1 = sl_hit, 2 = timeout.
+    """
+    entry_price = arrays['close'][entries]
+    atr = arrays['atr'][entries]
+    high = windows['high'][entries]
+    low = windows['low'][entries]
+    close = windows['close'][entries]
+    forward_atr = windows['atr'][entries]
+
+    # Dynamically adjust TP/SL if signal is very strong (same as run_backtest_v2)
+    strong = arrays['match_score'][entries] >= 5 if score_override else np.zeros(len(entries), dtype=bool)
+    tp_k = np.where(strong, 2.2, tp_ks[:, np.newaxis])                     # (tp, m)
+    sl_k = np.where(strong, 1.2, sl_ks[:, np.newaxis])                     # (sl, m)
+
+    tp_price = entry_price + tp_k * atr                                    # (tp, m)
+    first_tp = _first_true(high >= tp_price[:, :, np.newaxis])             # (tp, m)
+
+    sl_price = entry_price - sl_k * atr                                    # (sl, m)
+    trailing_sl = close - sl_k[:, :, np.newaxis] * forward_atr             # (sl, m, horizon)
+    np.maximum.accumulate(trailing_sl, axis=2, out=trailing_sl)
+    np.maximum(trailing_sl, sl_price[:, :, np.newaxis], out=trailing_sl)
+    first_sl = _first_true(low <= trailing_sl)                             # (sl, m)
+    horizon = trailing_sl.shape[2]
+    sl_exit = np.take_along_axis(trailing_sl, np.minimum(first_sl, horizon - 1)[:, :, np.newaxis], axis=2)[:, :, 0]
+    del trailing_sl
+
+    # (tp, sl, m): which exit comes first (TP wins ties) and on which forward candle
+    first_tp = first_tp[:, np.newaxis, :]
+    first_sl = first_sl[np.newaxis, :, :]
+    first_exit = np.minimum(first_tp, first_sl)
+    tp_first = first_tp <= first_sl
+    hit_price = np.where(tp_first, tp_price[:, np.newaxis, :], sl_exit[np.newaxis, :, :])
+
+    # (tp, sl, duration, m): exit hit within the duration, otherwise timeout at its close
+    durations = np.asarray(durations)
+    within = first_exit[:, :, np.newaxis, :] < durations[:, np.newaxis]
+    timeout_price = close[:, durations - 1].T                              # (duration, m)
+    exit_price = np.where(within, hit_price[:, :, np.newaxis, :], timeout_price)
+
+    pnl = ((exit_price - entry_price) / entry_price) * 100
+    reason = np.where(within, np.where(tp_first, 0, 1)[:, :, np.newaxis, :], 2).astype(np.int8)
+    return pnl, reason
+
+
+def evaluate_exit_grid(arrays, candidates, tp_ks, sl_ks, durations, score_override=True, chunk_size=None):
+    """
+    Summary of every tp_k x sl_k x duration grid point over the same entries.
+
+    Entries are processed in chunks (about 4M grid cells each); the running equity is
+    carried between chunks, so totals and drawdowns are the same as in one pass.
+
+    Returns a DataFrame with one row per grid point: tp_k_base, sl_k_base, max_duration,
+    trades, total_pnl_pct, avg_pnl_pct, win_rate, max_drawdown_pct, tp_hits, sl_hits,
+    timeouts (same metrics as sweep.summarize_pnl).
+    """
+    tp_ks = np.asarray(tp_ks, dtype=np.float64)
+    sl_ks = np.asarray(sl_ks, dtype=np.float64)
+    durations = np.asarray(durations, dtype=np.int64)
+    horizon = int(durations.max())
+    if durations.min() < 1:
+        raise ValueError("durations must be >= 1 candle")
+
+    windows = forward_windows(arrays, horizon)
+    candidates = np.asarray(candidates, dtype=np.int64)
+    candidates = candidates[candidates < len(windows['close'])]
+
+    shape = (len(tp_ks), len(sl_ks), len(durations))
+    equity = np.zeros(shape)
+    peak = np.zeros(shape)
+    max_drawdown = np.zeros(shape)
+    wins = np.zeros(shape, dtype=np.int64)
+    reasons = np.zeros(shape + (3,), dtype=np.int64)
+
+    chunk_size = chunk_size or _chunk_size(int(np.prod(shape)) + (len(tp_ks) + len(sl_ks)) * horizon)
+    for start in range(0, len(candidates), chunk_size):
+        entries = candidates[start:start + chunk_size]
+        pnl, reason = resolve_exit_grid(arrays, windows, entries, tp_ks, sl_ks, durations, score_override)
+
+        # Equity continues from the previous chunk (same additions as one np.cumsum)
+        curve = np.cumsum(np.concatenate([equity[..., np.newaxis], pnl], axis=-1), axis=-1)[..., 1:]
+        running_peak = np.maximum(np.maximum.accumulate(curve, axis=-1), peak[..., np.newaxis])
+        np.maximum(max_drawdown, (running_peak - curve).max(axis=-1), out=max_drawdown)
+        peak = running_peak[..., -1].copy()
+        equity = curve[..., -1].copy()
+        del curve, running_peak
+
+        wins += (pnl > 0).sum(axis=-1)
+        for code in range(3):
+            reasons[..., code] += (reason == code).sum(axis=-1)
+
+    n_trades = len(candidates)
+    tp_grid, sl_grid, duration_grid = np.meshgrid(tp_ks, sl_ks, durations, indexing='ij')
+    return pd.DataFrame({
+        'tp_k_base': tp_grid.ravel(),
+        'sl_k_base': sl_grid.ravel(),
+        'max_duration': duration_grid.ravel(),
+        'trades': n_trades,
+        'total_pnl_pct': equity.ravel().round(4),
+        'avg_pnl_pct': (equity.ravel() / n_trades).round(4) if n_trades else 0.0,
+        'win_rate': (wins.ravel() / n_trades).round(4) if n_trades else 0.0,
+        'max_drawdown_pct': max_drawdown.ravel().round(4),
+        'tp_hits': reasons[..., 0].ravel(),
+        'sl_hits': reasons[..., 1].ravel(),
+        'timeouts': reasons[..., 2].ravel(),
+    })
+
+
+def exit_surface(df, tp_ks, sl_ks, durations, signals=None, score_threshold=2, allowed_combos=None,
+                 entry_filter=None, score_override=True):
+    """
+    TP/SL/duration surface of the run_backtest_v2 entries of df (loss cooldown ignored, see above).
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - tp_ks / sl_ks / durations: grids of tp_k_base, sl_k_base and max_duration
+    - signals: precomputed generate_signals(df) output (computed here if not given)
+    - score_threshold / allowed_combos / entry_filter: entry rules, as in run_backtest_v2_fast
+
+    Returns evaluate_exit_grid() output sorted by total_pnl_pct.
+    """
+    if signals is None:
+        from signal_generator import generate_signals
+        signals = generate_signals(df)
+
+    arrays = get_backtest_arrays(df, signals)
+    candidates = find_entry_candidates(arrays, score_threshold, int(max(durations)), allowed_combos, entry_filter=entry_filter)
+    surface = evaluate_exit_grid(arrays, candidates, tp_ks, sl_ks, durations, score_override)
+    return surface.sort_values(['total_pnl_pct', 'win_rate'], ascending=False, kind='mergesort').reset_index(drop=True)
+
+
+# -----------------------------------------------
+# Command line: python forward_paths.py --tp-range 0.5 4 36 --sl-range 0.5 3 26 --durations 1 2 3 5 10
+# -----------------------------------------------
+
+def main(argv=None):
+    from data_cache import load_enriched_prices
+
+    parser = argparse.ArgumentParser(description="TP / SL / duration surface of run_backtest_v2 entries")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    parser.add_argument('--tp-range', type=float, nargs=3, default=[0.5, 4.0, 36], metavar=('START', 'STOP', 'N'))
+    parser.add_argument('--sl-range', type=float, nargs=3, default=[0.5, 3.0, 26], metavar=('START', 'STOP', 'N'))
+    parser.add_argument('--durations', type=int, nargs='+', default=[1, 2, 3, 5, 10, 15])
+    parser.add_argument('--score', type=int, default=2, help="score_threshold")
+    parser.add_argument('--no-score-override', action='store_true', help="use the grid TP/SL for match_score >= 5 too")
+    parser.add_argument('--top', type=int, default=20, help="rows to print")
+    parser.add_argument('--out', default=None, help="optional path to save the full surface as CSV")
+    args = parser.parse_args(argv)
+
+    tp_ks = np.linspace(args.tp_range[0], args.tp_range[1], int(args.tp_range[2])).round(4)
+    sl_ks = np.linspace(args.sl_range[0], args.sl_range[1], int(args.sl_range[2])).round(4)
+
+    surface = exit_surface(load_enriched_prices(args.csv), tp_ks, sl_ks, args.durations,
+                           score_threshold=args.score, score_override=not args.no_score_override)
+    print(surface.head(args.top).to_string(index=False))
+    print(f"✅ Evaluated {len(surface)} TP/SL/duration combinations over {surface['trades'].iloc[0]} entries")
+
+    if args.out:
+        surface.to_csv(args.out, index=False)
+        print(f"✅ Saved surface to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+# indicator_graph.py
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import is_enabled, record
+
+# -----------------------------------------------
+# Indicator Dependency Graph (every intermediate computed once)
+# -----------------------------------------------
+
+"""
+Each add_* function in transformation.py computes its own intermediates: add_macd its own
+EMAs, add_bollinger_bands a rolling mean AND a rolling std pass, add_atr its own previous
+close, and generate_signals() more rolling max / min / mean / std passes on top.
+
+Here every intermediate is a Node: (operation, input nodes, parameters). Nodes are plain
+tuples, so two indicators asking for the same thing, e.g. shift(column('close'), 1) for
+ATR and for the engulfing pattern, get the SAME node. IndicatorGraph collects the
+requested outputs, orders their nodes (inputs before the nodes that use them, each node
+once) and drops every intermediate as soon as its last user has run.
+
+The operations are the exact pandas calls of transformation.py, so compute_indicators()
+returns the same columns as the add_* functions, bit for bit.
+
+    graph = IndicatorGraph()
+    graph.add('ema_50', ewm_mean(column('close'), 50))
+    graph.add('sma_50', rolling_mean(column('close'), 50))
+    values = graph.run(df)            # {'ema_50': Series, 'sma_50': Series}
+    graph.last_run                    # {'nodes_computed': ..., 'nodes_requested': ...}
+"""
+
+Node = namedtuple('Node', ['op', 'inputs', 'params'])
+
+
+# --- Node constructors ---
+
+def column(name):
+    return Node('column', (), (name,))
+
+
+def ewm_mean(source, span):
+    return Node('ewm_mean', (source,), (span,))
+
+
+def rolling_mean(source, window):
+    return Node('rolling_mean', (source,), (window,))
+
+
+def rolling_std(source, window):
+    return Node('rolling_std', (source,), (window,))
+
+
+def rolling_max(source, window):
+    return Node('rolling_max', (source,), (window,))
+
+
+def rolling_min(source, window):
+    return Node('rolling_min', (source,), (window,))
+
+
+def shift(source, periods=1):
+    return Node('shift', (source,), (periods,))
+
+
+def diff(source):
+    return Node('diff', (source,), ())
+
+
+def add(a, b):
+    return Node('add', (a, b), ())
+
+
+def sub(a, b):
+    return Node('sub', (a, b), ())
+
+
+def scale(source, factor):
+    return Node('scale', (source,), (factor,))
+
+
+def absolute(source):
+    return Node('abs', (source,), ())
+
+
+def row_max(*sources):
+    return Node('row_max', tuple(sources), ())
+
+
+def gains(source):
+    return Node('gains', (source,), ())
+
+
+def losses(source):
+    return Node('losses', (source,), ())
+
+
+def ffill(source):
+    return Node('ffill', (source,), ())
+
+
+def rsi_from_averages(avg_gain, avg_loss):
+    return Node('rsi', (avg_gain, avg_loss), ())
+
+
+def _rsi(avg_gain, avg_loss):
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def _row_max(*series):
+    # Same as pd.concat(series, axis=1).max(axis=1): NaN only where every input is NaN
+    result = series[0].to_numpy()
+    for s in series[1:]:
+        result = np.fmax(result, s.to_numpy())
+    return pd.Series(result, index=series[0].index)
+
+
+# op -> function(*input Series, *params), same pandas calls as transformation.py
+OPERATIONS = {
+    'ewm_mean': lambda s, span: s.ewm(span=span, adjust=False).mean(),
+    'rolling_mean': lambda s, window: s.rolling(window=window, min_periods=window).mean(),
+    'rolling_std': lambda s, window: s.rolling(window=window, min_periods=window).std(),
+    'rolling_max': lambda s, window: s.rolling(window).max(),
+    'rolling_min': lambda s, window: s.rolling(window).min(),
+    'shift': lambda s, periods: s.shift(periods),
+    'diff': lambda s: s.diff(),
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'scale': lambda s, factor: factor * s,
+    'abs': lambda s: s.abs(),
+    'row_max': _row_max,
+    'gains': lambda delta: delta.where(delta > 0, 0),
+    'losses': lambda delta: -delta.where(delta < 0, 0),
+    'ffill': lambda s: s.ffill(),
+    'rsi': _rsi,
+}
+
+
+class IndicatorGraph:
+    """
+    Set of named outputs (each a Node) that are computed together, sharing every
+    common intermediate.
+    """
+
+    def __init__(self):
+        self.outputs = {}  # name -> (node, min_rows)
+        self.last_run = {}
+
+    def add(self, name, node, min_rows=0):
+        """
+        Requests output `name`. With fewer than min_rows candles the output is a pd.NA
+        column instead (same as the add_* functions for too-short frames).
+        """
+        self.outputs[name] = (node, min_rows)
+        return self
+
+    def plan(self, nodes):
+        """
+        Unique nodes needed for `nodes`, every node after all of its inputs.
+        """
+        order = []
+        seen = set()
+        for root in nodes:
+            stack = [(root, False)]
+            while stack:
+                node, inputs_done = stack.pop()
+                if inputs_done:
+                    order.append(node)
+                    continue
+                if node in seen:
+                    continue
+                seen.add(node)
+                stack.append((node, True))
+                for source in reversed(node.inputs):
+                    if source not in seen:
+                        stack.append((source, False))
+        return order
+
+    def run(self, df):
+        """
+        Computes every output on df. Returns {name: Series or pd.NA}.
+        """
+        active = {name: node for name, (node, min_rows) in self.outputs.items() if len(df) >= min_rows}
+        order = self.plan(active.values())
+
+        # How many planned nodes still need each node (freed when it drops to 0)
+        users = {}
+        for node in order:
+            for source in node.inputs:
+                users[source] = users.get(source, 0) + 1
+        keep = set(active.values())
+
+        # With instrumentation on, each node's time goes to the first output that needs it
+        stages = _stage_names(active) if is_enabled() else None
+        spent = {}
+
+        values = {}
+        for node in order:
+            if stages is not None:
+                start = time.perf_counter()
+            if node.op == 'column':
+                values[node] = pd.to_numeric(df[node.params[0]], errors='coerce')
+            else:
+                values[node] = OPERATIONS[node.op](*(values[s] for s in node.inputs), *node.params)
+            if stages is not None:
+                spent[stages[node]] = spent.get(stages[node], 0.0) + time.perf_counter() - start
+            for source in node.inputs:
+                users[source] -= 1
+                if users[source] == 0 and source not in keep:
+                    del values[source]
+
+        for stage, seconds in spent.items():
+            record(stage, seconds, len(df))
+
+        self.last_run = {
+            'nodes_computed': sum(1 for node in order if node.op != 'column'),
+            'nodes_requested': sum(_tree_size(node) for node in active.values()),
+        }
+        return {
+            name: values[active[name]] if name in active else pd.NA
+            for name in self.outputs
+        }
+
+
+def _stage_names(active):
+    # node -> 'indicators.<first output using it>'
+    stages = {}
+    for name, root in active.items():
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            if node not in stages:
+                stages[node] = f"indicators.{name}"
+                stack.extend(node.inputs)
+    return stages
+
+
+def _tree_size(node):
+    # Operations the output would cost on its own (no sharing), for last_run
+    own = 0 if node.op == 'column' else 1
+    return own + sum(_tree_size(source) for source in node.inputs)
+
+
+# -----------------------------------------------
+# fact_prices Indicators and Signal Features as Graph Outputs
+# -----------------------------------------------
+
+def indicator_outputs(rsi_period=14, bb_period=20, bb_multiplier=2, atr_period=14):
+    """
+    [(column name, node, min_rows)] of add_all_indicators(), in its column order.
+    """
+    close = column('close')
+    high = column('high')
+    low = column('low')
+
+    ema_12 = ewm_mean(close, 12)
+    ema_26 = ewm_mean(close, 26)
+    macd = sub(ema_12, ema_26)
+    macd_signal = ewm_mean(macd, 9)
+
+    delta = diff(close)
+    avg_gain = ffill(rolling_mean(gains(delta), rsi_period))
+    avg_loss = ffill(rolling_mean(losses(delta), rsi_period))
+
+    bb_middle = rolling_mean(close, bb_period)
+    bb_width = scale(rolling_std(close, bb_period), bb_multiplier)
+
+    prev_close = shift(close, 1)
+    true_range = row_max(sub(high, low), absolute(sub(high, prev_close)), absolute(sub(low, prev_close)))
+
+    return [
+        ('ema_9', ewm_mean(close, 9), 9),
+        ('ema_20', ewm_mean(close, 20), 20),
+        ('macd', macd, 26),
+        ('macd_signal', macd_signal, 26),
+        ('macd_histogram', sub(macd, macd_signal), 26),
+        ('rsi', rsi_from_averages(avg_gain, avg_loss), rsi_period),
+        ('bb_middle', bb_middle, bb_period),
+        ('bb_upper', add(bb_middle, bb_width), bb_period),
+        ('bb_lower', sub(bb_middle, bb_width), bb_period),
+        ('atr', rolling_mean(true_range, atr_period), atr_period),
+    ]
+
+
+def signal_feature_outputs(bb_middle=None):
+    """
+    [(name, node)] of the rolling / shifted series generate_signals() needs.
+
+    Parameters:
+    - bb_middle: node of the middle band (default: the bb_middle column of the frame)
+    """
+    close = column('close')
+    if bb_middle is None:
+        bb_middle = column('bb_middle')
+
+    return [
+        ('close_max_20', rolling_max(close, 20)),
+        ('high_max_20', rolling_max(column('high'), 20)),
+        ('low_min_20', rolling_min(column('low'), 20)),
+        ('volume_mean_20', rolling_mean(column('volume'), 20)),
+        ('bb_middle_std_20', rolling_std(bb_middle, 20)),
+        ('prev_close', shift(close, 1)),
+        ('prev_open', shift(column('open'), 1)),
+    ]
+
+
+def compute_indicators(df, rsi_period=14, bb_period=20, bb_multiplier=2, atr_period=14, signal_features=False):
+    """
+    Adds the add_all_indicators() columns to df (in place, same values and order) with one
+    graph run.
+
+    Parameters:
+    - signal_features: also compute generate_signals()' rolling features in the same run
+      and return (df, features) - pass features to generate_signals(df, features=features)
+    """
+    outputs = indicator_outputs(rsi_period, bb_period, bb_multiplier, atr_period)
+
+    graph = IndicatorGraph()
+    for name, node, min_rows in outputs:
+        graph.add(name, node, min_rows)
+    if signal_features:
+        bb_middle = next(node for name, node, _ in outputs if name == 'bb_middle')
+        for name, node in signal_feature_outputs(bb_middle):
+            graph.add(name, node)
+
+    values = graph.run(df)
+    for name, _, _ in outputs:
+        df[name] = values[name]
+
+    if signal_features:
+        features = {name: values[name] for name, _ in signal_feature_outputs()}
+        return df, features
+    return df
+
+
+def compute_signal_features(df):
+    """
+    generate_signals()' rolling features for an already indicator-enriched frame.
+    """
+    graph = IndicatorGraph()
+    for name, node in signal_feature_outputs():
+        graph.add(name, node)
+    return graph.run(df)
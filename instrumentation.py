@@ -0,0 +1,246 @@
+# instrumentation.py
+import json
+import os
+import threading
+import time
+from functools import wraps
+
+# -----------------------------------------------
+# Pipeline Timings and Counters (JSON / Prometheus export)
+# -----------------------------------------------
+
+"""
+Where does a production run's time go? Pipeline code marks its stages and events:
+
+    with timed('signals') as stage:
+        signals = generate_signals(df)
+        stage.add_rows(len(signals))
+
+    count('cache_hits', kind='prices')
+    count('upload_bytes', n_bytes, table='backtest_trades_v2')
+
+Nothing is recorded until enable() is called (or TRADINGBOT_METRICS=1 is set). While
+disabled, timed() returns one shared no-op object and count() returns right away, so the
+calls can stay in hot code.
+
+Stage times are inclusive wall time: a stage running inside another (e.g. load_candles
+inside load_enriched_prices) is counted in both. Counters can carry labels, which become
+Prometheus labels in to_prometheus().
+
+    enable()
+    main()
+    write_json('metrics.json')
+    write_prometheus('metrics.prom')
+"""
+
+METRIC_PREFIX = "tradingbot"
+
+_enabled = os.environ.get("TRADINGBOT_METRICS", "").lower() in ("1", "true", "yes")
+_lock = threading.Lock()
+_stages = {}      # name -> {'calls', 'seconds', 'max_seconds', 'rows', 'errors'}
+_counters = {}    # (name, ((label, value), ...)) -> value
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    """
+    Clears everything recorded so far (enabled / disabled stays as it is).
+    """
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _record_stage(name, seconds, rows, failed):
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'rows': 0, 'errors': 0}
+        stage['calls'] += 1
+        stage['seconds'] += seconds
+        stage['max_seconds'] = max(stage['max_seconds'], seconds)
+        stage['rows'] += rows
+        stage['errors'] += failed
+
+
+def record(stage, seconds, rows=0):
+    """
+    Adds one run of `stage` measured elsewhere (e.g. time summed over a loop).
+    """
+    if _enabled:
+        _record_stage(stage, seconds, rows, False)
+
+
+class _StageTimer:
+    __slots__ = ('name', 'rows', 'start')
+
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+
+    def add_rows(self, rows):
+        self.rows += rows
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _record_stage(self.name, time.perf_counter() - self.start, self.rows, exc_type is not None)
+        return False
+
+
+class _NoOpTimer:
+    __slots__ = ()
+
+    def add_rows(self, rows):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NO_OP_TIMER = _NoOpTimer()
+
+
+def timed(stage, rows=0):
+    """
+    Context manager timing one run of `stage`. The returned object's add_rows(n) adds to
+    the stage's row count (rows can also be given up front).
+    """
+    if not _enabled:
+        return _NO_OP_TIMER
+    return _StageTimer(stage, rows)
+
+
+def instrumented(stage, rows=None, input_rows=None):
+    """
+    Decorator: times every call of the function as `stage`.
+    rows: optional function(result) -> row count, e.g. len
+    input_rows: optional function(*args, **kwargs) -> row count taken from the call's
+    arguments instead, for stages whose result is not one row per input row
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start_rows = input_rows(*args, **kwargs) if input_rows is not None else 0
+            with _StageTimer(stage, start_rows) as timer:
+                result = func(*args, **kwargs)
+                if rows is not None:
+                    timer.add_rows(rows(result))
+                return result
+        return wrapper
+    return decorator
+
+
+def count(name, value=1, **labels):
+    """
+    Adds value to counter `name` (e.g. 'api_calls', 'cache_hits', 'upload_bytes').
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+# -----------------------------------------------
+# Export
+# -----------------------------------------------
+
+def summary():
+    """
+    {'stages': {name: {calls, seconds, max_seconds, rows, errors, rows_per_sec}},
+     'counters': [{'name', 'labels', 'value'}]}
+    """
+    with _lock:
+        stages = {name: dict(values) for name, values in _stages.items()}
+        counters = [
+            {'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+
+    for values in stages.values():
+        values['seconds'] = round(values['seconds'], 6)
+        values['max_seconds'] = round(values['max_seconds'], 6)
+        values['rows_per_sec'] = round(values['rows'] / values['seconds'], 1) if values['rows'] and values['seconds'] > 0 else None
+    return {'stages': stages, 'counters': counters}
+
+
+def write_json(path):
+    with open(path, 'w') as f:
+        json.dump(summary(), f, indent=2)
+    print(f"✅ Saved metrics to {path}")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for key, value in sorted(labels.items())
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _metric_name(name):
+    cleaned = "".join(c if c.isalnum() or c == '_' else '_' for c in name)
+    return f"{METRIC_PREFIX}_{cleaned}"
+
+
+def to_prometheus():
+    """
+    Snapshot in the Prometheus text exposition format.
+    """
+    data = summary()
+    lines = []
+
+    stage_metrics = [
+        ('stage_seconds_total', 'seconds', 'counter', "Wall time spent in each pipeline stage"),
+        ('stage_calls_total', 'calls', 'counter', "Runs of each pipeline stage"),
+        ('stage_rows_total', 'rows', 'counter', "Rows processed by each pipeline stage"),
+        ('stage_errors_total', 'errors', 'counter', "Runs of each pipeline stage that raised"),
+        ('stage_max_seconds', 'max_seconds', 'gauge', "Slowest single run of each pipeline stage"),
+    ]
+    if data['stages']:
+        for metric, key, kind, help_text in stage_metrics:
+            name = _metric_name(metric)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for stage, values in sorted(data['stages'].items()):
+                lines.append(f"{name}{_label_text({'stage': stage})} {values[key]}")
+
+    by_name = {}
+    for counter in data['counters']:
+        by_name.setdefault(counter['name'], []).append(counter)
+    for counter_name, series in sorted(by_name.items()):
+        name = _metric_name(f"{counter_name}_total")
+        lines.append(f"# TYPE {name} counter")
+        for counter in series:
+            lines.append(f"{name}{_label_text(counter['labels'])} {counter['value']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path):
+    with open(path, 'w') as f:
+        f.write(to_prometheus())
+    print(f"✅ Saved Prometheus metrics to {path}")
@@ -0,0 +1,180 @@
+# local_bigquery.py
+import os
+import shutil
+import threading
+import uuid
+
+import pandas as pd
+
+# -----------------------------------------------
+# Local File-Backed Stand-In for the BigQuery Client
+# -----------------------------------------------
+
+"""
+Implements the part of google.cloud.bigquery.Client that upload_to_bigquery.py uses
+(load_table_from_dataframe -> job.result(), get_job, copy_table, delete_table), writing
+every load as a file under <root>/<project>.<dataset>/<table>/. Lets the loader be run
+and timed offline.
+
+Each load writes one part file (Parquet if pyarrow is installed, otherwise pickle), so
+concurrent chunk uploads never touch the same file. WRITE_TRUNCATE clears the table first.
+Like BigQuery, a second load with a job_id that already exists raises a 409 conflict
+(LocalJobConflict) instead of loading the rows again.
+
+    client = LocalBigQueryClient("local_bigquery")
+    upload_dataframe_to_bigquery(df, "fact_prices", client=client)
+    client.read_table("scalp-457602.crypto_data.fact_prices")
+"""
+
+try:
+    import pyarrow  # noqa: F401
+    PART_FORMAT = "parquet"
+except ImportError:
+    PART_FORMAT = "pkl"
+
+
+class LocalJobConflict(Exception):
+    """
+    A job with this job_id already exists (google.api_core.exceptions.Conflict, HTTP 409).
+    """
+    code = 409
+
+
+class LocalLoadJob:
+    """
+    Finished load job (same .result() / .output_rows / .state / .error_result API as a
+    BigQuery LoadJob). A job with an error_result failed on the "server" and loaded nothing.
+    """
+
+    def __init__(self, destination, output_rows, job_id=None, client=None, error_result=None):
+        self.destination = destination
+        self.output_rows = output_rows
+        self.job_id = job_id
+        self.state = 'DONE'
+        self.error_result = error_result
+        self._client = client
+
+    def result(self, timeout=None):
+        if self.error_result is not None:
+            # BigQuery raises a 5xx for backendError / internalError, which is retryable
+            raise ConnectionError(f"{self.error_result['reason']}: {self.error_result['message']} (job {self.job_id})")
+        if self._client is not None:
+            self._client._maybe_fail_result(self)
+        return self
+
+
+class LocalBigQueryClient:
+    """
+    File-backed stand-in for bigquery.Client.
+
+    Parameters:
+    - root: folder the tables are written to
+    - fail_first: make the first N load calls raise ConnectionError (to exercise retries)
+    - fail_result_first: make the first N job.result() calls raise TimeoutError AFTER the
+      rows were written (a load that committed but whose result the caller never saw)
+    - fail_jobs_first: make the first N load jobs fail on the server: nothing is written
+      and job.result() raises (state DONE, error_result backendError)
+    - fail_tables: table names whose loads always fail with ValueError (a permanent error)
+    """
+
+    def __init__(self, root="local_bigquery", fail_first=0, fail_result_first=0, fail_jobs_first=0, fail_tables=()):
+        self.root = root
+        self.fail_first = fail_first
+        self.fail_result_first = fail_result_first
+        self.fail_jobs_first = fail_jobs_first
+        self.failed_jobs = 0
+        self.fail_tables = set(fail_tables)
+        self.load_calls = 0
+        self.result_calls = 0
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def _maybe_fail_result(self, job):
+        with self._lock:
+            self.result_calls += 1
+            if self.result_calls <= self.fail_result_first:
+                raise TimeoutError(f"simulated result() timeout #{self.result_calls} (job {job.job_id})")
+
+    def _table_dir(self, destination):
+        project_dataset, table = str(destination).rsplit('.', 1)
+        return os.path.join(self.root, project_dataset, table)
+
+    def load_table_from_dataframe(self, dataframe, destination, job_config=None, job_id=None):
+        with self._lock:
+            self.load_calls += 1
+            if job_id is not None and job_id in self.jobs:
+                raise LocalJobConflict(f"Already Exists: Job {job_id}")
+            if self.load_calls <= self.fail_first:
+                raise ConnectionError(f"simulated failure #{self.load_calls}")
+            if str(destination).rsplit('.', 1)[-1] in self.fail_tables:
+                raise ValueError(f"simulated permanent failure loading {destination}")
+            if self.failed_jobs < self.fail_jobs_first:
+                self.failed_jobs += 1
+                job = LocalLoadJob(destination, 0, job_id, self, error_result={
+                    'reason': 'backendError', 'message': f"simulated job failure #{self.failed_jobs}"})
+                if job_id is not None:
+                    self.jobs[job_id] = job
+                return job
+
+            table_dir = self._table_dir(destination)
+            if getattr(job_config, 'write_disposition', None) == "WRITE_TRUNCATE" and os.path.exists(table_dir):
+                shutil.rmtree(table_dir)
+            os.makedirs(table_dir, exist_ok=True)
+
+        part = os.path.join(table_dir, f"part-{uuid.uuid4().hex}.{PART_FORMAT}")
+        if PART_FORMAT == "parquet":
+            dataframe.to_parquet(part, index=False)
+        else:
+            dataframe.to_pickle(part)
+        job = LocalLoadJob(destination, len(dataframe), job_id, self)
+        if job_id is not None:
+            with self._lock:
+                self.jobs[job_id] = job
+        return job
+
+    def get_job(self, job_id):
+        return self.jobs[job_id]
+
+    def copy_table(self, source, destination, job_config=None):
+        """
+        Replaces (WRITE_TRUNCATE) or extends destination with the parts of source. The new
+        table directory is built aside and swapped in, so readers never see half a copy.
+        """
+        source_dir = self._table_dir(source)
+        table_dir = self._table_dir(destination)
+        truncate = getattr(job_config, 'write_disposition', None) == "WRITE_TRUNCATE"
+
+        with self._lock:
+            tmp_dir = f"{table_dir}.copy-{uuid.uuid4().hex}"
+            if not truncate and os.path.exists(table_dir):
+                shutil.copytree(table_dir, tmp_dir)
+            os.makedirs(tmp_dir, exist_ok=True)
+            for part in os.listdir(source_dir) if os.path.exists(source_dir) else []:
+                shutil.copy2(os.path.join(source_dir, part), os.path.join(tmp_dir, part))
+
+            old_dir = f"{table_dir}.old-{uuid.uuid4().hex}"
+            if os.path.exists(table_dir):
+                os.replace(table_dir, old_dir)
+            os.replace(tmp_dir, table_dir)
+            shutil.rmtree(old_dir, ignore_errors=True)
+        return LocalLoadJob(destination, len(self.read_table(destination)))
+
+    def delete_table(self, table, not_found_ok=False):
+        table_dir = self._table_dir(table)
+        if not os.path.exists(table_dir):
+            if not_found_ok:
+                return
+            raise FileNotFoundError(f"Not found: Table {table}")
+        shutil.rmtree(table_dir)
+
+    def read_table(self, destination):
+        """
+        Reads every part of a table back into one DataFrame (row order between parts is not kept).
+        """
+        table_dir = self._table_dir(destination)
+        if not os.path.exists(table_dir):
+            return pd.DataFrame()
+        parts = sorted(os.listdir(table_dir))
+        reader = pd.read_parquet if PART_FORMAT == "parquet" else pd.read_pickle
+        frames = [reader(os.path.join(table_dir, p)) for p in parts]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
@@ -1,102 +1,95 @@
 # main.py
-import os
-from dotenv import load_dotenv
-import pandas as pd
-from google.cloud import bigquery
-from extracting import fetch_kucoin_candles_paginated  # <<< IMPORT your function properly
-from transformation import add_ema,add_ema9_ema20, add_macd, add_rsi
-from transformation import add_bollinger_bands
-from transformation import add_atr
-from upload_to_bigquery import upload_dataframe_to_bigquery
-#from backtester import run_backtest
-from backtester import run_backtest_v2
-from signal_generator import generate_signal_row
+# Full batch pipeline: candles -> indicators -> fact_signals -> backtest -> BigQuery.
+# Heavy imports (pandas, google.cloud, ccxt) happen inside the functions that need them,
+# so importing this file does nothing. To run single steps use: python cli.py --help
 
 
+def check_bigquery_connection():
+    from upload_to_bigquery import get_client
 
-# Load environment variables
-load_dotenv()
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+    # Connect to BigQuery (shared client, created once)
+    client = get_client()
+    if not hasattr(client, 'query'):
+        return  # local stand-in, nothing to test
 
-# Connect to BigQuery
-client = bigquery.Client()
+    # Test BigQuery connection
+    query_job = client.query("SELECT 'BigQuery is connected!' AS message")
+    results = query_job.result()
 
-# Test BigQuery connection
-query_job = client.query("SELECT 'BigQuery is connected!' AS message")
-results = query_job.result()
+    for row in results:
+        print(row["message"])
 
-for row in results:
-    print(row["message"])
 
-# >>>>>>>>>>
-# Now actually run your data fetching cleanly
-
-#df = fetch_kucoin_candles()
-#this is through api's , right now we are using local saved csv file extracted using the same api, its just that at real time it's harder to extract a month of data
-#df = fetch_kucoin_candles_paginated(symbol='ETH/USDT', timeframe='1m', total_limit=10000)
-df = pd.read_csv("ethusdt_1m_month.csv")
-df['timestamp'] = pd.to_datetime(df['timestamp'])
+def run_pipeline(csv_path="ethusdt_1m_month.csv", upload=True):
+    from data_cache import load_enriched_prices
+    from signal_generator import generate_signals
+    from backtester import run_backtest_v2_fast
 
+    if upload:
+        check_bigquery_connection()
 
+    # >>>>>>>>>>
+    # Now actually run your data fetching cleanly
 
-df=add_ema9_ema20(df)
-df=add_macd(df)
-df = add_rsi(df, period=14)
-df = add_bollinger_bands(df, period=20, multiplier=2)
-df = add_atr(df, period=14)
-print(f"Fetched candles: {len(df)}")  # Should show 3000+
+    #this is through api's , right now we are using local saved csv file extracted using the same api, its just that at real time it's harder to extract a month of data
+    #df = fetch_kucoin_candles_paginated(symbol='ETH/USDT', timeframe='1m', total_limit=10000)
 
+    # Candles + indicators come from the columnar cache (.cache/) unless the CSV or the
+    # indicator settings changed, in which case they are recomputed and cached again
+    df = load_enriched_prices(csv_path)
+    print(f"Fetched candles: {len(df)}")  # Should show 3000+
 
+    # Generate fact_signals
+    # generate_signals() computes every filter for the whole frame at once (same output as
+    # calling generate_signal_row on each 21-candle window). Skip the first 20 candles which
+    # don't have a full rolling window yet.
+    signals = generate_signals(df)
+    df_signals = signals.iloc[20:].reset_index(drop=True)
 
-import pandas as pd
-from tqdm import tqdm  # Add this to track progress
+    # Upload fact_signals / fact_prices
+    #upload_dataframe_to_bigquery(df_signals, table_name="fact_signals")
+    #upload_dataframe_to_bigquery(df, table_name="fact_prices")
+    # Later if you create df_dim_coins:
+    # upload_dataframe_to_bigquery(df_dim_coins, "dim_coins")
 
-# Generate fact_signals
-signal_rows = []
-for i in tqdm(range(20, len(df))):
-    window_df = df.iloc[i-20:i+1].reset_index(drop=True)
-    signal = generate_signal_row(window_df)
-    signal_rows.append(signal)
+    #trades_df_v2 = run_backtest_v2(df, signal_function=generate_signal_row)
+    # Array engine: same trades as run_backtest_v2 but reuses the precomputed signals
+    trades_df_v2 = run_backtest_v2_fast(df, signals=signals)
+    print(f"✅ Rows in trades_df_v2: {len(trades_df_v2)}")
+    print(f"✅ Columns: {trades_df_v2.columns.tolist()}")
 
-df_signals = pd.DataFrame(signal_rows)
+    if upload:
+        from upload_to_bigquery import upload_dataframe_to_bigquery
+        upload_dataframe_to_bigquery(trades_df_v2, "backtest_trades_v2")
+        print('uploaded to backtester v2')
 
+    # Print the DataFrame to verify
+    print(df.tail())
+    return df, df_signals, trades_df_v2
 
 
-# Upload fact_signals
-#upload_dataframe_to_bigquery(df_signals, table_name="fact_signals")
-#upload fact_signals but delete the previous data
-#upload_dataframe_to_bigquery(df_signals, table_name="fact_signals")
-#print('uploaded to fact_signals')
+def main(csv_path="ethusdt_1m_month.csv", upload=True, metrics_json=None, metrics_prom=None):
+    """
+    Runs the pipeline. With metrics_json / metrics_prom, stage timings and counters
+    (instrumentation.py) are recorded and saved as JSON / Prometheus text.
+    """
+    import instrumentation
 
+    if metrics_json or metrics_prom:
+        instrumentation.enable()
 
-# Upload fact_prices
-#upload_dataframe_to_bigquery(df, table_name="fact_prices")
-#print('uploaded to fact_prices')
-# Later if you create df_dim_coins:
-# upload_dataframe_to_bigquery(df_dim_coins, "dim_coins")
+    with instrumentation.timed('pipeline'):
+        result = run_pipeline(csv_path, upload)
 
-#backtest_results = run_backtest(df, generate_signal_row, score_threshold=4)
+    if metrics_json:
+        instrumentation.write_json(metrics_json)
+    if metrics_prom:
+        instrumentation.write_prometheus(metrics_prom)
+    return result
 
-#print(backtest_results.head())
-#print(df_signals['match_score'].value_counts())
 
-#print(f"Backtest trades generated: {len(backtest_results)}")
-#print(backtest_results.columns)
-
-
-# Upload to BigQuery
-#upload_dataframe_to_bigquery(backtest_results, table_name="backtest_trades")
-#print('uploaded to backtest')
-trades_df_v2 = run_backtest_v2(df, signal_function=generate_signal_row)
-print(f"✅ Rows in trades_df_v2: {len(trades_df_v2)}")
-print(f"✅ Columns: {trades_df_v2.columns.tolist()}")
-
-
-upload_dataframe_to_bigquery(trades_df_v2, "backtest_trades_v2")
-print('uploaded to backtester v2')
-
-# Print the DataFrame to verify
-print(df.tail())
+if __name__ == "__main__":
+    main()
 
 
 
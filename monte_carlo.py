@@ -0,0 +1,232 @@
+# monte_carlo.py
+import argparse
+import os
+from multiprocessing import get_all_start_methods, get_context
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------
+# Monte Carlo Robustness Analysis of Backtest Trades
+# -----------------------------------------------
+
+"""
+A backtest produces ONE sequence of trades. Re-sampling that sequence many times shows
+how much of the result is luck of the ordering / selection:
+
+- bootstrap: every simulation draws n trades with replacement (final return, drawdown
+  and losing streaks all vary)
+- shuffle:   every simulation is a random permutation of the same trades (the final
+  return is fixed, drawdown and streaks vary)
+
+Simulations are processed in batches as (batch, n_trades) matrices, all with NumPy:
+- equity:          cumsum along axis 1 (or cumprod with compound=True)
+- max drawdown:    running peak via np.maximum.accumulate, minus equity
+- losing streaks:  cumsum of the loss flags minus that cumsum frozen at the last win
+                   (np.maximum.accumulate again) = length of the current losing run
+
+Like sweep.summarize_pnl, equity is the sum of pnl_pct and drawdown is in percentage
+points unless compound=True (then both are % of compounded equity).
+"""
+
+METHODS = ('bootstrap', 'shuffle')
+
+
+def _batch_size(n_trades, max_cells=4_000_000):
+    # Keep every (batch, n_trades) temporary around 32 MB
+    return max(1, max_cells // max(1, n_trades))
+
+
+def _batch_metrics(paths, compound):
+    """
+    final return, max drawdown and longest losing streak of every row of paths (pnl %).
+    """
+    if compound:
+        equity = np.cumprod(1 + paths / 100, axis=1)
+        final = (equity[:, -1] - 1) * 100
+        floor = 1.0
+    else:
+        equity = np.cumsum(paths, axis=1)
+        final = equity[:, -1].copy()
+        floor = 0.0
+
+    # Running peak, including the starting equity (0, or 1 when compounding)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, floor, out=peak)
+    if compound:
+        np.divide(equity, peak, out=equity)
+        max_drawdown = (1 - equity.min(axis=1)) * 100
+    else:
+        np.subtract(peak, equity, out=peak)
+        max_drawdown = peak.max(axis=1)
+    del equity, peak
+
+    # Length of the current losing run = losses so far - losses so far at the last win
+    streak_dtype = np.int16 if paths.shape[1] < np.iinfo(np.int16).max else np.int32
+    losses = paths <= 0
+    loss_count = np.cumsum(losses, axis=1, dtype=streak_dtype)
+    at_last_win = loss_count * ~losses
+    np.maximum.accumulate(at_last_win, axis=1, out=at_last_win)
+    np.subtract(loss_count, at_last_win, out=loss_count)
+    max_streak = loss_count.max(axis=1)
+
+    return final, max_drawdown, max_streak
+
+
+def _simulate_batch(pnl, n_sims, method, seed_sequence, compound):
+    rng = np.random.default_rng(seed_sequence)
+    n_trades = len(pnl)
+    if method == 'bootstrap':
+        index_dtype = np.int16 if n_trades <= np.iinfo(np.int16).max else np.int32
+        paths = np.take(pnl, rng.integers(0, n_trades, size=(n_sims, n_trades), dtype=index_dtype))
+    else:
+        # Shuffle a C-ordered copy in place (permuted() of a broadcast view returns a
+        # column-major array, which makes every row-wise pass below several times slower)
+        paths = np.tile(pnl, (n_sims, 1))
+        rng.permuted(paths, axis=1, out=paths)
+    return _batch_metrics(paths, compound)
+
+
+def _simulate_batch_task(task):
+    return _simulate_batch(*task)
+
+
+def run_monte_carlo(pnl_pct, n_sims=10_000, method='bootstrap', seed=0, compound=False, batch_size=None, processes=1):
+    """
+    Monte Carlo simulations of a trade PnL series.
+
+    Parameters:
+    - pnl_pct: trade PnLs in % (e.g. run_backtest_v2_fast(df)['pnl_pct'])
+    - n_sims: number of simulated trade sequences
+    - method: 'bootstrap' (with replacement) or 'shuffle' (permutation)
+    - seed: random seed (same seed = same results)
+    - compound: compound the returns instead of summing them
+    - batch_size: simulations per batch (default: ~4M matrix cells per batch)
+    - processes: worker processes for the batches (None = CPU cores)
+
+    Every batch has its own random stream (spawned from seed), so results depend on seed
+    and batch_size but not on the number of processes.
+
+    Returns a DataFrame with one row per simulation: final_return_pct, max_drawdown_pct,
+    max_losing_streak.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}, got '{method}'")
+
+    pnl = np.asarray(pnl_pct, dtype=np.float64)
+    n_trades = len(pnl)
+    if n_trades == 0 or n_sims <= 0:
+        return pd.DataFrame({
+            'final_return_pct': np.zeros(max(n_sims, 0)),
+            'max_drawdown_pct': np.zeros(max(n_sims, 0)),
+            'max_losing_streak': np.zeros(max(n_sims, 0), dtype=np.int32),
+        })
+
+    batch_size = batch_size or _batch_size(n_trades)
+    starts = list(range(0, n_sims, batch_size))
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    tasks = [
+        (pnl, min(start + batch_size, n_sims) - start, method, batch_seed, compound)
+        for start, batch_seed in zip(starts, seeds)
+    ]
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(tasks)))
+    if processes == 1:
+        batches = [_simulate_batch(*task) for task in tasks]
+    else:
+        method_name = 'fork' if 'fork' in get_all_start_methods() else None
+        with get_context(method_name).Pool(processes) as pool:
+            batches = pool.map(_simulate_batch_task, tasks)
+
+    final = np.concatenate([b[0] for b in batches])
+    max_drawdown = np.concatenate([b[1] for b in batches])
+    max_streak = np.concatenate([b[2] for b in batches]).astype(np.int32)
+
+    return pd.DataFrame({
+        'final_return_pct': final,
+        'max_drawdown_pct': max_drawdown,
+        'max_losing_streak': max_streak,
+    })
+
+
+def realized_metrics(pnl_pct, compound=False):
+    """
+    The same three metrics for the actual trade order.
+    """
+    pnl = np.asarray(pnl_pct, dtype=np.float64)
+    if not len(pnl):
+        return {'final_return_pct': 0.0, 'max_drawdown_pct': 0.0, 'max_losing_streak': 0}
+    final, max_drawdown, max_streak = _batch_metrics(pnl[np.newaxis, :], compound)
+    return {
+        'final_return_pct': float(final[0]),
+        'max_drawdown_pct': float(max_drawdown[0]),
+        'max_losing_streak': int(max_streak[0]),
+    }
+
+
+def summarize_monte_carlo(simulations, realized=None, percentiles=(5, 25, 50, 75, 95)):
+    """
+    Percentile table of run_monte_carlo() output (one row per metric), with the mean,
+    the realized value and - for final return - the probability of ending below zero.
+    """
+    rows = []
+    for metric in ['final_return_pct', 'max_drawdown_pct', 'max_losing_streak']:
+        values = simulations[metric].to_numpy(dtype=np.float64)
+        row = {'metric': metric}
+        if realized is not None:
+            row['realized'] = realized[metric]
+        row['mean'] = round(float(values.mean()), 4)
+        for p, v in zip(percentiles, np.percentile(values, percentiles)):
+            row[f"p{p}"] = round(float(v), 4)
+        row['prob_below_zero'] = round(float((values < 0).mean()), 4) if metric == 'final_return_pct' else None
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def monte_carlo_summary_row(pnl_pct, n_sims=1000, seed=0):
+    """
+    A few bootstrap numbers for one sweep configuration (added to the sweep table).
+    """
+    simulations = run_monte_carlo(pnl_pct, n_sims=n_sims, method='bootstrap', seed=seed)
+    final = simulations['final_return_pct'].to_numpy()
+    return {
+        'mc_p5_total_pnl_pct': round(float(np.percentile(final, 5)), 4),
+        'mc_prob_loss': round(float((final < 0).mean()), 4),
+        'mc_p95_drawdown_pct': round(float(np.percentile(simulations['max_drawdown_pct'], 95)), 4),
+        'mc_p95_losing_streak': int(np.percentile(simulations['max_losing_streak'], 95)),
+    }
+
+
+# -----------------------------------------------
+# Command line: python monte_carlo.py --sims 100000 --method shuffle
+# -----------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo analysis of run_backtest_v2 trades")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    parser.add_argument('--trades', default=None, help="use the pnl_pct column of this trades CSV instead of backtesting")
+    parser.add_argument('--sims', type=int, default=10_000)
+    parser.add_argument('--method', choices=METHODS, default='bootstrap')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--compound', action='store_true')
+    parser.add_argument('--processes', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.trades:
+        pnl = pd.read_csv(args.trades)['pnl_pct']
+    else:
+        from backtester import run_backtest_v2_fast
+        from data_cache import load_enriched_prices
+        pnl = run_backtest_v2_fast(load_enriched_prices(args.csv))['pnl_pct']
+
+    simulations = run_monte_carlo(pnl, n_sims=args.sims, method=args.method, seed=args.seed,
+                                  compound=args.compound, processes=args.processes)
+    report = summarize_monte_carlo(simulations, realized_metrics(pnl, args.compound))
+    print(report.to_string(index=False))
+    print(f"✅ {args.sims} {args.method} simulations of {len(pnl)} trades")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+# multi_timeframe.py
+import pandas as pd
+
+from extracting import timeframe_to_ms
+from streaming_indicators import IndicatorEngine
+from transformation import add_all_indicators
+
+# -----------------------------------------------
+# Higher-Timeframe Bars from the 1m Candles (batch + incremental)
+# -----------------------------------------------
+
+"""
+5m / 15m / 1h / 4h bars are built from the 1m store instead of being downloaded:
+
+- resample_candles() / build_timeframes(): whole history at once (pandas groupby), with
+  add_all_indicators() applied on every timeframe.
+- BarAggregator / MultiTimeframeAggregator: the same bars one 1m candle at a time. Only the
+  bar that is still open is updated, and its indicators (streaming_indicators) are computed
+  once, when the bar closes - no re-resampling of the history.
+
+Bars are labelled with their OPEN time (like exchange OHLCV) and aligned to the epoch, so a
+4h bar starts at 00:00, 04:00, ... UTC. A bar is complete once its last minute has been
+seen (or a candle of a later bar arrives, when there is a gap in the 1m data). When the
+1m data starts in the middle of a bar, that first bar is dropped: its open and volume
+would only cover part of the period.
+
+No lookahead: a bar opening at T only exists from T + timeframe on. merge_higher_timeframes()
+gives each 1m candle (closing at t + 1m) the last bar that had closed by then; the
+incremental aggregator can't do anything else by construction.
+
+The incremental bars and indicators are identical to the batch ones (volume is summed with
+the same compensated summation as pandas' groupby sum).
+"""
+
+DEFAULT_TIMEFRAMES = ['5m', '15m', '1h', '4h']
+
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'symbol', 'exchange', 'interval']
+
+# Columns merge_higher_timeframes() copies onto the 1m candles by default
+DEFAULT_HTF_COLUMNS = ['close', 'ema_9', 'ema_20', 'rsi', 'atr']
+
+
+def resample_candles(df, timeframe, complete_only=True, base_timeframe='1m'):
+    """
+    OHLCV bars of `timeframe` from the (sorted) 1m candles in df.
+
+    Parameters:
+    - df: candles DataFrame (ethusdt_1m_month.csv format)
+    - timeframe: '5m', '15m', '1h', '4h', ...
+    - complete_only: drop the last bar if its period isn't over yet, and the first bar if
+      df starts after its open
+    - base_timeframe: timeframe of the candles in df
+    """
+    period = pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+    base = pd.Timedelta(milliseconds=timeframe_to_ms(base_timeframe))
+
+    bucket = df['timestamp'].dt.floor(period)
+    bars = df.groupby(bucket.to_numpy(), sort=True).agg(
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum'),
+    )
+    bars.index.name = 'timestamp'
+    bars = bars.reset_index()
+
+    for name in ['symbol', 'exchange']:
+        if name in df.columns:
+            bars[name] = df[name].iloc[0] if len(df) else None
+    bars['interval'] = timeframe
+
+    if complete_only and len(bars):
+        last_candle = df['timestamp'].iloc[-1]
+        if bars['timestamp'].iloc[-1] + period > last_candle + base:
+            bars = bars.iloc[:-1]
+        if len(bars) and bars['timestamp'].iloc[0] < df['timestamp'].iloc[0]:
+            bars = bars.iloc[1:]
+
+    return bars[[c for c in OHLCV_COLUMNS if c in bars.columns]].reset_index(drop=True)
+
+
+def build_timeframes(df, timeframes=None, indicator_params=None, complete_only=True):
+    """
+    {timeframe: indicator-enriched bars} for every timeframe (default 5m, 15m, 1h, 4h).
+    """
+    params = indicator_params or {}
+    return {
+        timeframe: add_all_indicators(resample_candles(df, timeframe, complete_only), **params)
+        for timeframe in (timeframes or DEFAULT_TIMEFRAMES)
+    }
+
+
+def merge_higher_timeframes(df, bars_by_timeframe, columns=None, base_timeframe='1m'):
+    """
+    Copies higher-timeframe columns onto the 1m candles without lookahead.
+
+    Each 1m candle gets the values of the last bar that had CLOSED when the candle closed,
+    as columns named <column>_<timeframe> (e.g. ema_9_1h). Earlier candles get NaN.
+    """
+    columns = columns or DEFAULT_HTF_COLUMNS
+    base = pd.Timedelta(milliseconds=timeframe_to_ms(base_timeframe))
+
+    merged = df.copy()
+    known_at = merged['timestamp'] + base
+    order = known_at.argsort(kind='mergesort')
+    left = pd.DataFrame({'known_at': known_at.to_numpy()[order], 'row': order})
+
+    for timeframe, bars in bars_by_timeframe.items():
+        period = pd.Timedelta(milliseconds=timeframe_to_ms(timeframe))
+        right = pd.DataFrame({'known_at': bars['timestamp'] + period})
+        for name in columns:
+            right[f"{name}_{timeframe}"] = pd.to_numeric(bars[name], errors='coerce').to_numpy()
+
+        joined = pd.merge_asof(left, right, on='known_at', direction='backward')
+        for name in columns:
+            values = pd.Series(joined[f"{name}_{timeframe}"].to_numpy(), index=joined['row'].to_numpy())
+            merged[f"{name}_{timeframe}"] = values.sort_index().to_numpy()
+
+    return merged
+
+
+def higher_timeframe_trend(merged, timeframe):
+    """
+    Bool array: EMA 9 above EMA 20 on `timeframe` (needs merge_higher_timeframes() output).
+    Can be passed to run_backtest_v2_fast(entry_filter=...) as trend confirmation.
+    """
+    return (merged[f"ema_9_{timeframe}"] > merged[f"ema_20_{timeframe}"]).to_numpy()
+
+
+# -----------------------------------------------
+# Incremental Bar Aggregation
+# -----------------------------------------------
+
+class BarAggregator:
+    """
+    Builds one higher timeframe from 1m candles as they arrive.
+
+    Parameters:
+    - timeframe: '5m', '15m', '1h', '4h', ...
+    - indicator_params: IndicatorEngine settings (None = main.py defaults)
+    - base_timeframe: timeframe of the incoming candles
+    """
+
+    def __init__(self, timeframe, indicator_params=None, base_timeframe='1m'):
+        self.timeframe = timeframe
+        self.period_ns = timeframe_to_ms(timeframe) * 1_000_000
+        self.base_ns = timeframe_to_ms(base_timeframe) * 1_000_000
+        self.engine = IndicatorEngine(**(indicator_params or {}))
+        self.bar = None          # bar still being built
+        self.last_bar = None     # last completed bar, with indicators
+        self.bars_completed = 0
+        self.started = False     # a bar was started (the first candles may be skipped)
+        self.skip_bucket = None  # first bar, joined after its open: its candles are ignored
+        self._volume_compensation = 0.0
+
+    def _start_bar(self, candle, bucket):
+        self.bar = {
+            'timestamp': bucket,
+            'open': candle['open'],
+            'high': candle['high'],
+            'low': candle['low'],
+            'close': candle['close'],
+            'volume': candle['volume'],
+            'symbol': candle.get('symbol'),
+            'exchange': candle.get('exchange'),
+            'interval': self.timeframe,
+        }
+        self._volume_compensation = 0.0
+
+    def _add_to_bar(self, candle):
+        bar = self.bar
+        bar['high'] = max(bar['high'], candle['high'])
+        bar['low'] = min(bar['low'], candle['low'])
+        bar['close'] = candle['close']
+        # Compensated (Kahan) sum, same as pandas' groupby sum
+        y = candle['volume'] - self._volume_compensation
+        t = bar['volume'] + y
+        self._volume_compensation = t - bar['volume'] - y
+        bar['volume'] = t
+
+    def _close_bar(self):
+        bar = self.bar
+        bar.update(self.engine.update(bar))
+        self.bar = None
+        self.last_bar = bar
+        self.bars_completed += 1
+        return bar
+
+    def update(self, candle):
+        """
+        Feeds one closed 1m candle (dict or Series, oldest first).
+        Returns the list of bars completed by it (usually empty or one bar).
+        """
+        timestamp = pd.Timestamp(candle['timestamp'])
+        bucket_ns = timestamp.value // self.period_ns * self.period_ns
+        bucket = pd.Timestamp(bucket_ns, tz=timestamp.tz)
+
+        if not self.started:
+            if bucket_ns != timestamp.value and self.skip_bucket in (None, bucket):
+                # Stream starts in the middle of a bar: it would miss its first minutes
+                self.skip_bucket = bucket
+                return []
+            self.started = True
+            self.skip_bucket = None
+
+        completed = []
+        if self.bar is not None and bucket != self.bar['timestamp']:
+            if bucket < self.bar['timestamp']:
+                raise ValueError(f"Candle {timestamp} is older than the open {self.timeframe} bar")
+            # Gap in the 1m data: the open bar won't get any more candles
+            completed.append(self._close_bar())
+
+        if self.bar is None:
+            self._start_bar(candle, bucket)
+        else:
+            self._add_to_bar(candle)
+
+        if timestamp.value + self.base_ns >= bucket_ns + self.period_ns:
+            completed.append(self._close_bar())
+        return completed
+
+    def seed(self, df):
+        """
+        Warms up from historical 1m candles: complete bars are resampled in one go and fed
+        to the indicator engine, the candles of the still-open bar are replayed.
+        Returns self.
+        """
+        if not len(df):
+            return self
+        bars = resample_candles(df, self.timeframe, complete_only=True)
+        if len(bars):
+            self.engine.seed(bars.iloc[:-1])
+            last = bars.iloc[-1].to_dict()
+            last.update(self.engine.update(last))
+            self.last_bar = last
+            self.bars_completed += len(bars)
+            self.started = True
+            period = pd.Timedelta(milliseconds=self.period_ns // 1_000_000)
+            df = df[df['timestamp'] >= bars['timestamp'].iloc[-1] + period]
+
+        for row in df.itertuples(index=False):
+            self.update(row._asdict())
+        return self
+
+    def to_state(self):
+        """
+        Open bar, last completed bar and indicator state as plain values (checkpoint.py).
+        """
+        return {
+            'timeframe': self.timeframe,
+            'period_ns': self.period_ns,
+            'base_ns': self.base_ns,
+            'engine': self.engine.to_state(),
+            'bar': self.bar,
+            'last_bar': self.last_bar,
+            'bars_completed': self.bars_completed,
+            'started': self.started,
+            'skip_bucket': self.skip_bucket,
+            'volume_compensation': self._volume_compensation,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['timeframe'])
+        obj.period_ns = state['period_ns']
+        obj.base_ns = state['base_ns']
+        obj.engine = IndicatorEngine.from_state(state['engine'])
+        obj.bar = state['bar']
+        obj.last_bar = state['last_bar']
+        obj.bars_completed = state['bars_completed']
+        obj.started = state.get('started', True)
+        obj.skip_bucket = state.get('skip_bucket')
+        obj._volume_compensation = state['volume_compensation']
+        return obj
+
+
+class MultiTimeframeAggregator:
+    """
+    BarAggregator for several timeframes fed from the same 1m stream.
+
+        mtf = MultiTimeframeAggregator(['15m', '1h']).seed(history)
+        new_bars = mtf.update(candle)      # {'15m': [bar], '1h': []}
+        mtf.features()                     # {'ema_9_1h': ..., 'close_15m': ...}
+    """
+
+    def __init__(self, timeframes=None, indicator_params=None, base_timeframe='1m'):
+        self.aggregators = {
+            timeframe: BarAggregator(timeframe, indicator_params, base_timeframe)
+            for timeframe in (timeframes or DEFAULT_TIMEFRAMES)
+        }
+
+    def update(self, candle):
+        return {timeframe: agg.update(candle) for timeframe, agg in self.aggregators.items()}
+
+    def seed(self, df):
+        for agg in self.aggregators.values():
+            agg.seed(df)
+        return self
+
+    def to_state(self):
+        return {'aggregators': [agg.to_state() for agg in self.aggregators.values()]}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls.__new__(cls)
+        obj.aggregators = {}
+        for agg_state in state['aggregators']:
+            agg = BarAggregator.from_state(agg_state)
+            obj.aggregators[agg.timeframe] = agg
+        return obj
+
+    def latest(self, timeframe):
+        """
+        Last completed bar of `timeframe` (None before the first one closes).
+        """
+        return self.aggregators[timeframe].last_bar
+
+    def features(self, columns=None):
+        """
+        Flat {<column>_<timeframe>: value} of the last completed bars, the same names
+        merge_higher_timeframes() uses.
+        """
+        columns = columns or DEFAULT_HTF_COLUMNS
+        values = {}
+        for timeframe, agg in self.aggregators.items():
+            bar = agg.last_bar or {}
+            for name in columns:
+                values[f"{name}_{timeframe}"] = bar.get(name, float('nan'))
+        return values
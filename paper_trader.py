@@ -0,0 +1,579 @@
+# paper_trader.py
+import argparse
+import asyncio
+import time
+from collections import deque
+
+import pandas as pd
+
+from backtester import ALLOWED_COMBOS
+from checkpoint import Checkpointer, read_checkpoint
+from replay_feed import ReplayFeed
+from signal_generator import FILTER_BITS, FILTER_NAMES, combo_names, combo_to_mask
+from streaming_indicators import IndicatorEngine, RollingMean, RollingStd
+
+# -----------------------------------------------
+# Asyncio Paper Trader (live path for run_backtest_v2)
+# -----------------------------------------------
+
+"""
+Consumes closed 1m candles from an async feed and, per candle:
+
+1. updates every indicator incrementally (streaming_indicators.IndicatorEngine)
+2. evaluates the generate_signal_row() filters (SignalEvaluator, O(window) per candle)
+3. moves open positions on (trailing SL, TP / SL hits, timeout) and closes them
+4. opens a position if the run_backtest_v2 entry rules pass
+
+Same rules as run_backtest_v2: allowed combos + score threshold, trend / body / volatility
+skip, TP 2.2 / SL 1.2 ATR for match_score >= 5, trailing SL, timeout after max_duration
+candles, several positions may be open at once.
+
+One unavoidable difference: the backtest knows at entry whether a trade will lose and
+starts the cooldown from that trade's exit right away. Live, the cooldown can only start
+when the loss is realized, so a signal that appears while a (later losing) position is
+still open is traded here but skipped by the backtest.
+
+Every candle is timed from arrival to the end of its decisions; latency_budget_ms is the
+budget per candle. Runs over budget are counted; a warning is printed at most once per
+latency_warn_seconds (with the number of slow candles since the last one), and the
+totals are in latency.summary().
+
+    trader = PaperTrader()
+    trades = asyncio.run(trader.run(ReplayFeed(df)))
+    trader.latency.summary()
+
+Warm restart: to_state() / from_state() hold everything that carries over between candles
+(indicators, signal windows, open positions, cooldown). With a checkpoint.Checkpointer
+the state is saved every N candles; on startup it is restored and the feed only replays
+the candles after the last processed one (resume_timestamp()).
+"""
+
+
+class SignalEvaluator:
+    """
+    generate_signal_row() filters for one new candle at a time, with the rolling windows
+    kept as state. Values are the same as generate_signals() for that candle.
+    """
+
+    def __init__(self, window=20):
+        self.window = window
+        # Previous `window` candles (the current one is appended after evaluating)
+        self.prev_closes = deque(maxlen=window)
+        self.prev_highs = deque(maxlen=window)
+        self.prev_lows = deque(maxlen=window)
+        self.avg_volume = RollingMean(window)
+        self.bb_middle_std = RollingStd(window)
+        self.prev_open = None
+        self.prev_close = None
+
+    def update(self, candle, indicators):
+        """
+        candle: dict with open/high/low/close/volume (+ timestamp, symbol)
+        indicators: IndicatorEngine.update() output for the same candle
+        """
+        open_ = float(candle['open'])
+        high = float(candle['high'])
+        low = float(candle['low'])
+        close = float(candle['close'])
+        volume = float(candle['volume'])
+        atr = indicators['atr']
+        full_window = len(self.prev_closes) == self.window
+
+        # Rolling logic windows (previous 20 candles / last 20 including this one)
+        breakout_up = full_window and close > max(self.prev_closes)
+        range_breakout = False
+        if full_window:
+            highs = list(self.prev_highs)[1:] + [high]
+            lows = list(self.prev_lows)[1:] + [low]
+            range_size = max(highs) - min(lows)
+            range_breakout = close > max(self.prev_highs) and range_size > atr
+
+        body = abs(close - open_)
+        candle_strength = body > atr * 0.7
+
+        avg_vol = self.avg_volume.update(volume)
+        volume_spike = volume > avg_vol * 1.2
+
+        rsi_ok = 45 <= indicators['rsi'] <= 52
+        macd_cross_up = indicators['macd'] > indicators['macd_signal']
+
+        upper_wick = high - max(open_, close)
+        lower_wick = min(open_, close) - low
+        is_hammer = (lower_wick > 2 * body) and (upper_wick < 0.2 * body)
+        is_doji = body < (high - low) * 0.1
+        is_engulfing_bull = (
+            self.prev_close is not None and
+            self.prev_close < self.prev_open and
+            close > open_ and
+            close > self.prev_open and
+            open_ < self.prev_close
+        )
+
+        # Bollinger Band logic
+        bb_upper_break = close > indicators['bb_upper']
+        bb_lower_break = close < indicators['bb_lower']
+        bb_bandwidth = indicators['bb_upper'] - indicators['bb_lower']
+        bb_squeeze = bb_bandwidth < self.bb_middle_std.update(indicators['bb_middle'])
+
+        filters = {
+            'recent_high_break': bool(breakout_up),
+            'range_breakout': bool(range_breakout),
+            'strong_candle': bool(candle_strength),
+            'volume_spike': bool(volume_spike),
+            'rsi_bounce': bool(rsi_ok),
+            'macd_cross_up': bool(macd_cross_up),
+            'bb_upper_break': bool(bb_upper_break),
+            'bb_lower_break': bool(bb_lower_break),
+            'bb_squeeze_breakout': bool(bb_squeeze),
+        }
+
+        self.prev_closes.append(close)
+        self.prev_highs.append(high)
+        self.prev_lows.append(low)
+        self.prev_open = open_
+        self.prev_close = close
+
+        filters_mask = sum(FILTER_BITS[name] for name, value in filters.items() if value)
+        match_score = sum(filters.values())
+
+        signal = {'timestamp': candle.get('timestamp'), 'symbol': candle.get('symbol')}
+        signal.update(filters)
+        signal.update({
+            'match_score': match_score,
+            'final_signal': match_score >= 4,
+            'logic_debug_note': f"{match_score}/{len(FILTER_NAMES)} filters matched",
+            'is_hammer': bool(is_hammer),
+            'is_doji': bool(is_doji),
+            'is_engulfing_bull': bool(is_engulfing_bull),
+            'detected_pattern': 'hammer' if is_hammer else 'doji' if is_doji else 'engulfing_bull' if is_engulfing_bull else 'none',
+            'signal_combo_name': combo_names(filters_mask),
+            'filters_mask': filters_mask,
+        })
+        return signal
+
+    def to_state(self):
+        return {
+            'window': self.window,
+            'prev_closes': list(self.prev_closes),
+            'prev_highs': list(self.prev_highs),
+            'prev_lows': list(self.prev_lows),
+            'avg_volume': self.avg_volume.to_state(),
+            'bb_middle_std': self.bb_middle_std.to_state(),
+            'prev_open': self.prev_open,
+            'prev_close': self.prev_close,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['window'])
+        obj.prev_closes.extend(state['prev_closes'])
+        obj.prev_highs.extend(state['prev_highs'])
+        obj.prev_lows.extend(state['prev_lows'])
+        obj.avg_volume = RollingMean.from_state(state['avg_volume'])
+        obj.bb_middle_std = RollingStd.from_state(state['bb_middle_std'])
+        obj.prev_open = state['prev_open']
+        obj.prev_close = state['prev_close']
+        return obj
+
+
+class LatencyTracker:
+    """
+    Per-candle processing times against a budget (keeps the last `keep` samples).
+    warning() reports over-budget candles at most once per `warn_every_seconds`.
+    """
+
+    def __init__(self, budget_ms=50.0, keep=100_000, warn_every_seconds=10.0):
+        self.budget_ms = budget_ms
+        self.samples = deque(maxlen=keep)
+        self.count = 0
+        self.over_budget = 0
+        self.max_ms = 0.0
+        self.warn_every_seconds = warn_every_seconds
+        self.unreported = 0
+        self.unreported_max_ms = 0.0
+        self.last_warning = None
+
+    def record(self, seconds):
+        ms = seconds * 1000
+        self.samples.append(ms)
+        self.count += 1
+        self.max_ms = max(self.max_ms, ms)
+        if ms > self.budget_ms:
+            self.over_budget += 1
+            self.unreported += 1
+            self.unreported_max_ms = max(self.unreported_max_ms, ms)
+            return False
+        return True
+
+    def warning(self):
+        """
+        Text about the over-budget candles since the last warning, or None if there are
+        none or the last warning was less than warn_every_seconds ago.
+        """
+        if not self.unreported:
+            return None
+        now = time.monotonic()
+        if self.last_warning is not None and now - self.last_warning < self.warn_every_seconds:
+            return None
+        text = (f"{self.unreported} candle(s) over the {self.budget_ms} ms budget "
+                f"(slowest {self.unreported_max_ms:.2f} ms, {self.over_budget} in total)")
+        self.last_warning = now
+        self.unreported = 0
+        self.unreported_max_ms = 0.0
+        return text
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 4) if ordered else 0.0
+
+        return {
+            'candles': self.count,
+            'budget_ms': self.budget_ms,
+            'mean_ms': round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+            'p50_ms': percentile(50),
+            'p99_ms': percentile(99),
+            'max_ms': round(self.max_ms, 4),
+            'over_budget': self.over_budget,
+        }
+
+
+class PaperTrader:
+    """
+    Paper trading with the run_backtest_v2 rules on a live (or replayed) candle stream.
+
+    Parameters:
+    - score_threshold, tp_k_base, sl_k_base, max_duration, cooldown_after_loss,
+      allowed_combos: same as run_backtest_v2
+    - latency_budget_ms: processing budget per candle
+    - latency_warn_seconds: minimum seconds between over-budget warnings
+    - indicator_params: IndicatorEngine settings (None = main.py defaults)
+    - warmup: candles before the first possible entry (run_backtest_v2 uses 21)
+    """
+
+    def __init__(self, score_threshold=2, tp_k_base=1.95, sl_k_base=1.5, max_duration=3,
+                 cooldown_after_loss=3, allowed_combos=None, latency_budget_ms=50.0,
+                 latency_warn_seconds=10.0, indicator_params=None, warmup=21):
+        self.score_threshold = score_threshold
+        self.tp_k_base = tp_k_base
+        self.sl_k_base = sl_k_base
+        self.max_duration = max_duration
+        self.cooldown_after_loss = cooldown_after_loss
+        self.allowed_masks = {combo_to_mask(c) for c in (allowed_combos if allowed_combos is not None else ALLOWED_COMBOS)}
+        self.warmup = warmup
+
+        self.engine = IndicatorEngine(**(indicator_params or {}))
+        self.signals = SignalEvaluator()
+        self.latency = LatencyTracker(latency_budget_ms, warn_every_seconds=latency_warn_seconds)
+
+        self.candle_index = -1
+        self.last_exit_index = -cooldown_after_loss  # Initialize cooldown tracker
+        self.positions = []
+        self.trades = []
+
+    # --- per-candle logic ---
+
+    def _update_positions(self, candle, indicators, i):
+        high = float(candle['high'])
+        low = float(candle['low'])
+        close = float(candle['close'])
+        closed = []
+
+        for position in list(self.positions):
+            j = i - position['index']
+            entry_price = position['entry_price']
+            atr = position['atr']
+
+            # Trailing SL adapts to volatility mid-trade
+            position['trailing_sl'] = max(position['trailing_sl'], close - position['sl_k'] * indicators['atr'])
+
+            # Track max favorable and adverse excursions
+            position['mfe'] = max(position['mfe'], (high - entry_price) / atr)
+            position['mae'] = min(position['mae'], (low - entry_price) / atr)
+
+            if high >= position['tp_price']:
+                exit_price, exit_reason = position['tp_price'], "tp_hit"
+            elif low <= position['trailing_sl']:
+                exit_price, exit_reason = position['trailing_sl'], "sl_hit"
+            elif j >= self.max_duration:
+                exit_price, exit_reason = close, "timeout"
+            else:
+                continue
+
+            self.positions.remove(position)
+            closed.append(self._close_position(position, exit_price, exit_reason, j, indicators['atr'], i))
+
+        return closed
+
+    def _close_position(self, position, exit_price, exit_reason, duration, atr_on_exit, i):
+        entry_price = position['entry_price']
+        pnl = ((exit_price - entry_price) / entry_price) * 100
+        was_profitable = pnl > 0
+
+        # Cooldown starts when the loss is realized
+        if not was_profitable:
+            self.last_exit_index = max(self.last_exit_index, i)
+
+        signal = position['signal']
+        trade = {
+            'timestamp': position['timestamp'],
+            'symbol': position['symbol'],
+            'entry_price': entry_price,
+            'exit_price': exit_price,
+            'exit_reason': exit_reason,
+            'duration_candles': duration,
+            'pnl_pct': round(pnl, 4),
+            'was_profitable': was_profitable,
+            'trade_type': "Scalp" if duration <= 3 else "Swing" if duration <= 15 else "Position",
+            'tp_price': position['tp_price'],
+            'sl_price': position['sl_price'],
+            'atr_on_exit': atr_on_exit,
+            'mfe_atr': round(position['mfe'], 4),
+            'mae_atr': round(position['mae'], 4),
+            'match_score': signal['match_score'],
+            'rsi_bounce': signal['rsi_bounce'],
+            'macd_cross_up': signal['macd_cross_up'],
+            'recent_high_break': signal['recent_high_break'],
+            'range_breakout': signal['range_breakout'],
+            'strong_candle': signal['strong_candle'],
+            'volume_spike': signal['volume_spike'],
+            'signal_combo_name': signal['signal_combo_name'],
+            'logic_debug_note': (
+                f"Score: {signal['match_score']} | TP: {position['tp_price']:.2f} | SL: {position['sl_price']:.2f} "
+                f"| RSI: {position['rsi']:.2f} | Dur: {duration}"
+            ),
+        }
+        self.trades.append(trade)
+        return trade
+
+    def _maybe_enter(self, candle, indicators, signal, i):
+        # Cooldown logic: Skip if we're within cooldown window after a loss
+        if i < self.warmup or i <= self.last_exit_index + self.cooldown_after_loss:
+            return None
+        if signal['match_score'] < self.score_threshold or signal['filters_mask'] not in self.allowed_masks:
+            return None
+
+        close = float(candle['close'])
+        atr = indicators['atr']
+        candle_body = abs(close - float(candle['open']))
+        if indicators['ema_9'] <= indicators['ema_20'] or candle_body < 0.1 * atr or atr < 0.2:
+            return None  # 🚫 Skip if trend is weak, candle is too small, or low volatility
+
+        # Dynamically adjust TP/SL if signal is very strong
+        if signal['match_score'] >= 5:
+            tp_k, sl_k = 2.2, 1.2
+        else:
+            tp_k, sl_k = self.tp_k_base, self.sl_k_base
+
+        sl_price = close - sl_k * atr
+        position = {
+            'index': i,
+            'timestamp': candle.get('timestamp'),
+            'symbol': candle.get('symbol'),
+            'entry_price': close,
+            'atr': atr,
+            'rsi': indicators['rsi'],
+            'sl_k': sl_k,
+            'tp_price': close + tp_k * atr,
+            'sl_price': sl_price,
+            'trailing_sl': sl_price,
+            'mfe': float('-inf'),
+            'mae': float('inf'),
+            'signal': signal,
+        }
+        self.positions.append(position)
+        return position
+
+    def on_candle(self, candle):
+        """
+        Processes one closed candle. Returns the trades closed on it.
+        Candles at or before the last processed timestamp are ignored (a feed re-sending
+        its last candle, or the replay after restoring a checkpoint).
+        """
+        timestamp = candle.get('timestamp')
+        last_timestamp = self.engine.last_timestamp
+        if last_timestamp is not None and timestamp is not None and timestamp <= last_timestamp:
+            return []
+
+        start = time.perf_counter()
+        self.candle_index += 1
+        i = self.candle_index
+
+        indicators = self.engine.update(candle)
+        signal = self.signals.update(candle, indicators)
+        closed = self._update_positions(candle, indicators, i)
+        self._maybe_enter(candle, indicators, signal, i)
+
+        if not self.latency.record(time.perf_counter() - start):
+            warning = self.latency.warning()
+            if warning is not None:
+                print(f"⚠️ {warning}")
+        return closed
+
+    async def run(self, feed, on_trade=None, checkpoint=None):
+        """
+        Consumes an async iterable of closed candles until it ends.
+
+        Parameters:
+        - feed: async iterable of candle dicts (e.g. replay_feed.ReplayFeed)
+        - on_trade: optional callback (plain or async) for every closed trade
+        - checkpoint: optional checkpoint.Checkpointer, saves to_state() periodically
+          and once more when the feed ends
+
+        Returns the closed trades as a backtest_trades_v2 DataFrame.
+        """
+        async for candle in feed:
+            for trade in self.on_candle(candle):
+                if on_trade is not None:
+                    result = on_trade(trade)
+                    if asyncio.iscoroutine(result):
+                        await result
+            if checkpoint is not None:
+                checkpoint.maybe_save(self.to_state)
+        if checkpoint is not None:
+            checkpoint.save(self.to_state())
+        return self.trades_frame()
+
+    def trades_frame(self):
+        return pd.DataFrame(self.trades)
+
+    # --- checkpoints ---
+
+    def to_state(self):
+        """
+        Indicator and signal state, open positions, cooldown and candle counters as plain
+        values (checkpoint.write_checkpoint). Closed trades are not included: they were
+        already reported when they closed.
+        """
+        return {
+            'params': {
+                'score_threshold': self.score_threshold,
+                'tp_k_base': self.tp_k_base,
+                'sl_k_base': self.sl_k_base,
+                'max_duration': self.max_duration,
+                'cooldown_after_loss': self.cooldown_after_loss,
+                'allowed_masks': sorted(self.allowed_masks),
+                'latency_budget_ms': self.latency.budget_ms,
+                'latency_warn_seconds': self.latency.warn_every_seconds,
+                'warmup': self.warmup,
+            },
+            'engine': self.engine.to_state(),
+            'signals': self.signals.to_state(),
+            'candle_index': self.candle_index,
+            'last_exit_index': self.last_exit_index,
+            'positions': self.positions,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        PaperTrader continuing exactly where to_state() was taken.
+        """
+        params = dict(state['params'])
+        allowed_masks = params.pop('allowed_masks')
+        obj = cls(**params)
+        obj.allowed_masks = set(allowed_masks)
+        obj.engine = IndicatorEngine.from_state(state['engine'])
+        obj.signals = SignalEvaluator.from_state(state['signals'])
+        obj.candle_index = state['candle_index']
+        obj.last_exit_index = state['last_exit_index']
+        obj.positions = [dict(position) for position in state['positions']]
+        return obj
+
+    @property
+    def last_timestamp(self):
+        return self.engine.last_timestamp
+
+
+async def run_paper_traders(feed, traders=None, checkpoint=None, **trader_kwargs):
+    """
+    Paper trades a multi-symbol feed: one PaperTrader per symbol (created on its first
+    candle with trader_kwargs). Returns {symbol: PaperTrader}.
+
+    Parameters:
+    - traders: {symbol: PaperTrader} to continue with (e.g. restore_traders())
+    - checkpoint: optional checkpoint.Checkpointer for traders_state(traders)
+    """
+    traders = {} if traders is None else traders
+    async for candle in feed:
+        symbol = candle.get('symbol')
+        if symbol not in traders:
+            traders[symbol] = PaperTrader(**trader_kwargs)
+        traders[symbol].on_candle(candle)
+        if checkpoint is not None:
+            checkpoint.maybe_save(lambda: traders_state(traders))
+    if checkpoint is not None:
+        checkpoint.save(traders_state(traders))
+    return traders
+
+
+def traders_state(traders):
+    """
+    Checkpoint state of {symbol: PaperTrader}.
+    """
+    return {'traders': [{'symbol': symbol, 'trader': trader.to_state()} for symbol, trader in traders.items()]}
+
+
+def restore_traders(state):
+    """
+    {symbol: PaperTrader} from traders_state() output.
+    """
+    return {entry['symbol']: PaperTrader.from_state(entry['trader']) for entry in state['traders']}
+
+
+def resume_timestamp(traders):
+    """
+    Where the feed has to restart after restore_traders(): the oldest last processed
+    candle (each trader skips the candles it has already seen).
+    """
+    timestamps = [trader.last_timestamp for trader in traders.values() if trader.last_timestamp is not None]
+    return min(timestamps) if timestamps else None
+
+
+# -----------------------------------------------
+# Command line: python paper_trader.py --csv ethusdt_1m_month.csv --speed 1000 --checkpoint paper.ckpt.json
+# -----------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paper trade run_backtest_v2 rules on a replayed candle feed")
+    parser.add_argument('--csv', nargs='+', default=['ethusdt_1m_month.csv'], help="one candles CSV per symbol")
+    parser.add_argument('--speed', type=float, default=0, help="1 = real time, N = N x faster, 0 = max speed")
+    parser.add_argument('--budget-ms', type=float, default=50.0, help="latency budget per candle")
+    parser.add_argument('--warn-every', type=float, default=10.0, help="minimum seconds between over-budget warnings")
+    parser.add_argument('--checkpoint', default=None, help="checkpoint file: restored on start if it exists, saved periodically")
+    parser.add_argument('--checkpoint-every', type=int, default=60, help="candles between checkpoints")
+    parser.add_argument('--end', default=None, help="replay up to (not including) this timestamp")
+    args = parser.parse_args(argv)
+
+    traders = None
+    start = None
+    checkpointer = None
+    if args.checkpoint:
+        restore_start = time.perf_counter()
+        state = read_checkpoint(args.checkpoint)
+        if state is not None:
+            traders = restore_traders(state)
+            start = resume_timestamp(traders)
+            print(f"✅ Restored {len(traders)} trader(s) from {args.checkpoint} in "
+                  f"{(time.perf_counter() - restore_start) * 1000:.1f} ms, resuming after {start}")
+        checkpointer = Checkpointer(args.checkpoint, every_candles=args.checkpoint_every)
+
+    feed = ReplayFeed(args.csv, speed=args.speed, start=start, end=args.end)
+    traders = asyncio.run(run_paper_traders(feed, traders=traders, checkpoint=checkpointer,
+                                            latency_budget_ms=args.budget_ms,
+                                            latency_warn_seconds=args.warn_every))
+
+    for symbol, trader in traders.items():
+        trades = trader.trades_frame()
+        print(f"✅ {symbol}: {len(trades)} paper trades")
+        if len(trades):
+            print(f"Total PnL: {trades['pnl_pct'].sum():.4f}% | Win rate: {trades['was_profitable'].mean():.2%}")
+        print(f"Latency: {trader.latency.summary()}")
+    print(f"Feed: {feed.stats()}")
+    if checkpointer is not None:
+        print(f"Checkpoint: {checkpointer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
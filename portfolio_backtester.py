@@ -0,0 +1,211 @@
+# portfolio_backtester.py
+import heapq
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from backtester import get_backtest_arrays, find_entry_candidates, resolve_trade
+
+# -----------------------------------------------
+# Multi-Symbol Portfolio Backtester (one shared capital pool)
+# -----------------------------------------------
+
+"""
+run_backtest_v2 treats every signal of one symbol as an independent trade. The portfolio
+mode runs many symbols against ONE equity balance:
+
+1. Per symbol (spread across processes): indicators (if missing), generate_signals, the
+   run_backtest_v2 entry filters and the exit of EVERY candidate entry (TP / trailing SL /
+   timeout). A candidate's exit doesn't depend on capital, so this is done up front.
+2. In the parent: all candidates of all symbols are merged on the common 1m clock
+   (entry candle timestamp) and walked in time order. At each entry time, positions that
+   have exited by then are closed first (freeing cash), then the entry is accepted only if
+   - the symbol is not in its cooldown after a loss (same rule as run_backtest_v2),
+   - fewer than max_positions positions are open,
+   - the symbol's open exposure stays within max_exposure_per_symbol * equity,
+   - there is enough cash.
+
+Position size is position_size * current equity (at entry). No fees or slippage, and open
+positions are valued at entry price until they exit (same simplification as run_backtest_v2).
+
+With unlimited capital / positions / exposure, every symbol's trades are exactly the ones
+run_backtest_v2_fast returns for that symbol.
+"""
+
+
+def prepare_symbol_candidates(symbol, df, params):
+    """
+    Worker task: every possible trade of one symbol, exits already resolved.
+    Returns a DataFrame sorted by entry time.
+    """
+    from signal_generator import combo_names, generate_signals
+
+    if 'atr' not in df.columns:
+        from transformation import add_all_indicators
+        df = add_all_indicators(df.copy())
+
+    signals = generate_signals(df)
+    arrays = get_backtest_arrays(df, signals)
+    candidates = find_entry_candidates(
+        arrays,
+        score_threshold=params['score_threshold'],
+        max_duration=params['max_duration'],
+        allowed_combos=params['allowed_combos']
+    )
+    trades = [
+        resolve_trade(arrays, i, params['tp_k_base'], params['sl_k_base'], params['max_duration'])
+        for i in candidates
+    ]
+
+    timestamps = df['timestamp'].to_numpy()
+    columns = ['index', 'entry_price', 'exit_price', 'exit_reason', 'duration', 'pnl']
+    result = pd.DataFrame(trades, columns=columns)
+    result.insert(0, 'symbol', symbol)
+    result['entry_time'] = timestamps[result['index'].to_numpy(dtype=np.int64)]
+    result['exit_time'] = timestamps[(result['index'] + result['duration']).to_numpy(dtype=np.int64)]
+    result['exit_index'] = result['index'] + result['duration']
+    result['signal_combo_name'] = combo_names(arrays['filters_mask'][result['index'].to_numpy(dtype=np.int64)])
+    return result
+
+
+def _prepare_task(task):
+    return prepare_symbol_candidates(*task)
+
+
+def prepare_all_candidates(frames, params, processes=None):
+    """
+    prepare_symbol_candidates() for every symbol, one process per symbol (up to `processes`).
+    """
+    tasks = [(symbol, df, params) for symbol, df in frames.items()]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(tasks)))
+
+    if processes == 1:
+        per_symbol = [_prepare_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            per_symbol = list(pool.map(_prepare_task, tasks))
+
+    candidates = pd.concat(per_symbol, ignore_index=True)
+    # Common clock: entry time, then symbol order for a deterministic tie-break
+    return candidates.sort_values(['entry_time', 'symbol'], kind='mergesort').reset_index(drop=True)
+
+
+def run_portfolio_backtest(frames, initial_equity=10_000.0, position_size=0.1, max_positions=5,
+                           max_exposure_per_symbol=0.25, processes=None, score_threshold=2,
+                           tp_k_base=1.95, sl_k_base=1.5, max_duration=3, cooldown_after_loss=3,
+                           allowed_combos=None):
+    """
+    Backtests several symbols against one shared equity balance.
+
+    Parameters:
+    - frames: dict symbol -> candles DataFrame (raw or already indicator-enriched)
+    - initial_equity: starting balance (quote currency)
+    - position_size: fraction of current equity put into each new position
+    - max_positions: max open positions across all symbols
+    - max_exposure_per_symbol: max fraction of equity open in one symbol
+    - processes: worker processes for the per-symbol signal work
+    - the rest: same as run_backtest_v2
+
+    Returns (trades DataFrame, equity curve DataFrame, summary dict).
+    """
+    from backtester import ALLOWED_COMBOS
+
+    params = {
+        'score_threshold': score_threshold,
+        'tp_k_base': tp_k_base,
+        'sl_k_base': sl_k_base,
+        'max_duration': max_duration,
+        'allowed_combos': allowed_combos if allowed_combos is not None else ALLOWED_COMBOS,
+    }
+    candidates = prepare_all_candidates(frames, params, processes)
+
+    cash = float(initial_equity)
+    open_positions = []  # heap of (exit_time, sequence, position dict)
+    exposure = {}  # symbol -> open notional
+    last_loss_exit = {}  # symbol -> exit index of the last losing trade (cooldown)
+    skipped = {'cooldown': 0, 'max_positions': 0, 'exposure_cap': 0, 'cash': 0}
+    taken = []
+    equity_points = [(candidates['entry_time'].min() if len(candidates) else pd.NaT, cash)]
+
+    def open_notional():
+        return sum(exposure.values())
+
+    def close_until(time):
+        nonlocal cash
+        while open_positions and open_positions[0][0] <= time:
+            exit_time, _, position = heapq.heappop(open_positions)
+            proceeds = position['notional'] * (1 + position['pnl'] / 100)
+            cash += proceeds
+            exposure[position['symbol']] -= position['notional']
+            position['pnl_amount'] = proceeds - position['notional']
+            position['equity_after'] = cash + open_notional()
+            equity_points.append((exit_time, position['equity_after']))
+
+    for seq, trade in enumerate(candidates.itertuples(index=False)):
+        close_until(trade.entry_time)
+        symbol = trade.symbol
+
+        # Cooldown logic: same rule as run_backtest_v2, per symbol
+        if trade.index <= last_loss_exit.get(symbol, -cooldown_after_loss) + cooldown_after_loss:
+            skipped['cooldown'] += 1
+            continue
+        if len(open_positions) >= max_positions:
+            skipped['max_positions'] += 1
+            continue
+
+        equity = cash + open_notional()
+        notional = equity * position_size
+        if exposure.get(symbol, 0.0) + notional > max_exposure_per_symbol * equity + 1e-9:
+            skipped['exposure_cap'] += 1
+            continue
+        if notional > cash + 1e-9:
+            skipped['cash'] += 1
+            continue
+
+        cash -= notional
+        exposure[symbol] = exposure.get(symbol, 0.0) + notional
+        if not trade.pnl > 0:
+            last_loss_exit[symbol] = trade.exit_index
+
+        position = {
+            'symbol': symbol,
+            'entry_time': trade.entry_time,
+            'exit_time': trade.exit_time,
+            'entry_price': trade.entry_price,
+            'exit_price': trade.exit_price,
+            'exit_reason': trade.exit_reason,
+            'duration_candles': trade.duration,
+            'pnl': trade.pnl,
+            'notional': notional,
+            'signal_combo_name': trade.signal_combo_name,
+        }
+        heapq.heappush(open_positions, (trade.exit_time, seq, position))
+        taken.append(position)
+
+    close_until(pd.Timestamp.max)
+
+    trades = pd.DataFrame(taken)
+    if len(trades):
+        trades = trades.rename(columns={'pnl': 'pnl_pct'})
+        trades['pnl_pct'] = trades['pnl_pct'].round(4)
+    equity_curve = pd.DataFrame(equity_points, columns=['timestamp', 'equity'])
+
+    equity_values = equity_curve['equity'].to_numpy()
+    peaks = np.maximum.accumulate(equity_values)
+    final_equity = cash
+    summary = {
+        'symbols': len(frames),
+        'candidates': len(candidates),
+        'trades': len(trades),
+        'initial_equity': initial_equity,
+        'final_equity': round(final_equity, 2),
+        'return_pct': round((final_equity / initial_equity - 1) * 100, 4),
+        'max_drawdown_pct': round(float(((peaks - equity_values) / peaks).max() * 100), 4),
+        'win_rate': round(float((trades['pnl_pct'] > 0).mean()), 4) if len(trades) else 0.0,
+        'skipped': skipped,
+    }
+    return trades, equity_curve, summary
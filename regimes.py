@@ -0,0 +1,305 @@
+# regimes.py
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# -----------------------------------------------
+# Market-Regime Labels and Segment Index
+# -----------------------------------------------
+
+"""
+Labels every candle with a market regime, from indicators add_all_indicators() already
+produces, using only data up to that candle (no lookahead):
+
+- atr_ratio:       atr / its rolling mean over `window` candles
+- bandwidth_ratio: Bollinger bandwidth ((upper - lower) / middle) / its rolling mean
+- slope:           change of ema_9 over `slope_period` candles, in ATR units
+
+    volatile       atr_ratio or bandwidth_ratio >= volatile_ratio
+    trending_up    slope >= trend_slope and ema_9 > ema_20
+    trending_down  slope <= -trend_slope and ema_9 < ema_20
+    sideways       everything else
+    unknown        warm-up candles (an input is still NaN)
+
+A new regime only replaces the current one after it has held for `confirm` candles in a
+row, so single-candle flickers don't split segments.
+
+Consecutive candles with the same regime form a segment. RegimeIndex keeps the segments
+(start / end row, regime) sorted, so "which regime was candle i in", "keep only the
+entries in trending_up" or "time spent per regime" are binary searches / sums over the
+segments instead of scans over every row.
+
+    df['regime'] = label_regimes(df)
+    index = RegimeIndex.from_labels(df['regime'], df['timestamp'])
+    trades = run_backtest_v2_fast(df, entry_filter=index.entry_filter(['trending_up']))
+    trade_regime_stats(trades, index)
+"""
+
+REGIMES = ['unknown', 'sideways', 'trending_up', 'trending_down', 'volatile']
+REGIME_CODES = {name: code for code, name in enumerate(REGIMES)}
+
+
+def _numeric(df, name):
+    return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=np.float64)
+
+
+def regime_codes(df, window=240, slope_period=5, trend_slope=0.5, volatile_ratio=1.5):
+    """
+    Raw (unconfirmed) regime code of every candle, as an int8 array.
+
+    Parameters:
+    - window: candles in the rolling means atr / bandwidth are compared with
+    - slope_period: candles over which the ema_9 slope is measured
+    - trend_slope: minimum |slope| (ATR units) for a trend
+    - volatile_ratio: atr_ratio / bandwidth_ratio from which a candle is volatile
+    """
+    atr = pd.Series(_numeric(df, 'atr'))
+    ema_9 = pd.Series(_numeric(df, 'ema_9'))
+    ema_20 = _numeric(df, 'ema_20')
+    bandwidth = pd.Series((_numeric(df, 'bb_upper') - _numeric(df, 'bb_lower')) / _numeric(df, 'bb_middle'))
+
+    atr_ratio = (atr / atr.rolling(window, min_periods=window).mean()).to_numpy()
+    bandwidth_ratio = (bandwidth / bandwidth.rolling(window, min_periods=window).mean()).to_numpy()
+    slope = ((ema_9 - ema_9.shift(slope_period)) / atr).to_numpy()
+    ema_9 = ema_9.to_numpy()
+
+    known = ~(np.isnan(atr_ratio) | np.isnan(bandwidth_ratio) | np.isnan(slope) | np.isnan(ema_20))
+    codes = np.full(len(df), REGIME_CODES['sideways'], dtype=np.int8)
+    codes[(slope <= -trend_slope) & (ema_9 < ema_20)] = REGIME_CODES['trending_down']
+    codes[(slope >= trend_slope) & (ema_9 > ema_20)] = REGIME_CODES['trending_up']
+    codes[(atr_ratio >= volatile_ratio) | (bandwidth_ratio >= volatile_ratio)] = REGIME_CODES['volatile']
+    codes[~known] = REGIME_CODES['unknown']
+    return codes
+
+
+def confirm_codes(codes, confirm=3):
+    """
+    Keeps the previous regime until a new one has lasted `confirm` candles in a row
+    (causal: candle i only depends on candles <= i).
+    """
+    codes = np.asarray(codes)
+    if confirm <= 1 or not len(codes):
+        return codes.copy()
+
+    run_start = np.concatenate(([True], codes[1:] != codes[:-1]))
+    start_index = np.maximum.accumulate(np.where(run_start, np.arange(len(codes)), 0))
+    confirmed = np.arange(len(codes)) - start_index >= confirm - 1
+
+    # Last confirmed position (-1 before the first one), forward filled
+    last_confirmed = np.maximum.accumulate(np.where(confirmed, np.arange(len(codes)), -1))
+    result = np.where(last_confirmed >= 0, codes[np.maximum(last_confirmed, 0)], REGIME_CODES['unknown'])
+    return result.astype(codes.dtype)
+
+
+def label_regimes(df, window=240, slope_period=5, trend_slope=0.5, volatile_ratio=1.5, confirm=3):
+    """
+    Regime of every candle as a categorical Series (categories = REGIMES), ready to be
+    stored as the `regime` column. Parameters: see regime_codes() / confirm_codes().
+    """
+    codes = confirm_codes(regime_codes(df, window, slope_period, trend_slope, volatile_ratio), confirm)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=REGIMES), index=df.index, name='regime')
+
+
+def add_regimes(df, **params):
+    """
+    Adds the `regime` column to df (in place) and returns df.
+    """
+    df['regime'] = label_regimes(df, **params)
+    return df
+
+
+def _to_codes(labels):
+    if isinstance(labels, pd.Series) and isinstance(labels.dtype, pd.CategoricalDtype):
+        if list(labels.cat.categories) == REGIMES:
+            return labels.cat.codes.to_numpy(dtype=np.int8)
+        labels = labels.astype(str)
+    values = np.asarray(labels)
+    if values.dtype.kind in 'iu':
+        return values.astype(np.int8)
+    return np.array([REGIME_CODES[name] for name in values], dtype=np.int8)
+
+
+class RegimeIndex:
+    """
+    Run-length index of regime labels: one (start, end, regime) entry per segment,
+    end exclusive, sorted by start. Lookups outside the labelled rows / times raise
+    ValueError instead of borrowing the first or last segment's regime.
+    """
+
+    def __init__(self, starts, ends, codes, start_times=None, last_time=None):
+        self.starts = np.asarray(starts, dtype=np.int64)
+        self.ends = np.asarray(ends, dtype=np.int64)
+        self.codes = np.asarray(codes, dtype=np.int8)
+        self.start_times = None if start_times is None else np.asarray(start_times)
+        self.last_time = last_time
+        self.n_rows = int(self.ends[-1]) if len(self.ends) else 0
+
+    @classmethod
+    def from_labels(cls, labels, timestamps=None):
+        """
+        Builds the index from per-candle labels (regime column, names or codes).
+        timestamps: optional candle timestamps, for looking trades up by time.
+        """
+        codes = _to_codes(labels)
+        if not len(codes):
+            return cls([], [], [])
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        ends = np.append(starts[1:], len(codes))
+        start_times = last_time = None
+        if timestamps is not None:
+            times = np.asarray(pd.to_datetime(timestamps).to_numpy())
+            start_times, last_time = times[starts], times[-1]
+        return cls(starts, ends, codes[starts], start_times, last_time)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segments(self, regimes=None):
+        """
+        Segments as a DataFrame (start, end, length, regime), optionally only some regimes.
+        """
+        keep = self._select(regimes)
+        frame = pd.DataFrame({
+            'start': self.starts[keep],
+            'end': self.ends[keep],
+            'length': self.ends[keep] - self.starts[keep],
+            'regime': np.array(REGIMES, dtype=object)[self.codes[keep]],
+        })
+        if self.start_times is not None:
+            frame.insert(0, 'start_time', self.start_times[keep])
+        return frame
+
+    def _select(self, regimes):
+        if regimes is None:
+            return np.ones(len(self.codes), dtype=bool)
+        return np.isin(self.codes, self._select_codes(regimes))
+
+    def ranges(self, regimes):
+        """
+        (starts, ends) row ranges of the segments in `regimes` (a name or list of names).
+        """
+        keep = self._select(regimes)
+        return self.starts[keep], self.ends[keep]
+
+    def regime_at(self, rows):
+        """
+        Regime codes of the given row positions (binary search over the segments).
+        Raises ValueError for rows outside [0, n_rows).
+        """
+        rows = np.asarray(rows)
+        outside = (rows < 0) | (rows >= self.n_rows)
+        if np.any(outside):
+            raise ValueError(f"Row(s) {rows[outside][:5].tolist()} outside the {self.n_rows} labelled rows")
+        position = np.searchsorted(self.starts, rows, side='right') - 1
+        return self.codes[position]
+
+    def regime_at_time(self, timestamps):
+        """
+        Regime codes of the candles at the given timestamps (needs start_times). Raises
+        ValueError for times before the first or after the last labelled candle.
+        """
+        if self.start_times is None:
+            raise ValueError("RegimeIndex was built without timestamps")
+        times = np.asarray(pd.to_datetime(timestamps).to_numpy(), dtype=self.start_times.dtype)
+        outside = times < self.start_times[0] if len(self.start_times) else np.ones(len(times), dtype=bool)
+        if self.last_time is not None:
+            outside |= times > self.last_time
+        if np.any(outside):
+            raise ValueError(f"Time(s) {list(map(str, times[outside][:5]))} outside the labelled candles")
+        position = np.searchsorted(self.start_times, times, side='right') - 1
+        return self.codes[position]
+
+    def select(self, rows, regimes):
+        """
+        The sorted row positions in `rows` that fall in `regimes`.
+        """
+        rows = np.asarray(rows)
+        return rows[np.isin(self.regime_at(rows), self._select_codes(regimes))]
+
+    def _select_codes(self, regimes):
+        if isinstance(regimes, str):
+            regimes = [regimes]
+        return [REGIME_CODES[r] if isinstance(r, str) else r for r in regimes]
+
+    def entry_filter(self, regimes):
+        """
+        Bool array (one per candle) for run_backtest_v2_fast(entry_filter=...), filled
+        one segment slice at a time.
+        """
+        allowed = np.zeros(self.n_rows, dtype=bool)
+        for start, end in zip(*self.ranges(regimes)):
+            allowed[start:end] = True
+        return allowed
+
+    def summary(self):
+        """
+        Per regime: segments, candles, share of candles, mean / max segment length.
+        """
+        lengths = self.ends - self.starts
+        segments = np.bincount(self.codes, minlength=len(REGIMES))
+        candles = np.bincount(self.codes, weights=lengths, minlength=len(REGIMES)).astype(np.int64)
+        longest = np.zeros(len(REGIMES), dtype=np.int64)
+        np.maximum.at(longest, self.codes, lengths)
+        total = max(1, self.n_rows)
+        return pd.DataFrame({
+            'regime': REGIMES,
+            'segments': segments,
+            'candles': candles,
+            'share': (candles / total).round(4),
+            'mean_length': np.round(candles / np.maximum(segments, 1), 2),
+            'max_length': longest,
+        })
+
+
+def trade_regime_stats(trades, index):
+    """
+    backtest_trades_v2 trades grouped by the regime of their entry candle: trades,
+    win rate, mean / total PnL per regime.
+    """
+    codes = index.regime_at_time(trades['timestamp']).astype(np.int64)
+    pnl = trades['pnl_pct'].to_numpy(dtype=np.float64)
+
+    counts = np.bincount(codes, minlength=len(REGIMES))
+    wins = np.bincount(codes, weights=pnl > 0, minlength=len(REGIMES))
+    pnl_sum = np.bincount(codes, weights=pnl, minlength=len(REGIMES))
+
+    seen = np.flatnonzero(counts)
+    n = counts[seen]
+    return pd.DataFrame({
+        'regime': np.array(REGIMES, dtype=object)[seen],
+        'trades': n,
+        'win_rate': (wins[seen] / n).round(4),
+        'mean_pnl_pct': (pnl_sum[seen] / n).round(4),
+        'total_pnl_pct': pnl_sum[seen].round(4),
+    })
+
+
+# -----------------------------------------------
+# Command line: python regimes.py --csv ethusdt_1m_month.csv
+# -----------------------------------------------
+
+def main(argv=None):
+    from backtester import run_backtest_v2_fast
+    from data_cache import load_enriched_prices
+
+    parser = argparse.ArgumentParser(description="Market-regime labels, segments and per-regime backtest stats")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    parser.add_argument('--window', type=int, default=240)
+    parser.add_argument('--confirm', type=int, default=3)
+    parser.add_argument('--regimes', nargs='+', default=None, choices=REGIMES, help="only trade in these regimes")
+    args = parser.parse_args(argv)
+
+    df = load_enriched_prices(args.csv)
+    labels = label_regimes(df, window=args.window, confirm=args.confirm)
+    index = RegimeIndex.from_labels(labels, df['timestamp'])
+    print(index.summary().to_string(index=False))
+
+    entry_filter = index.entry_filter(args.regimes) if args.regimes else None
+    trades = run_backtest_v2_fast(df, entry_filter=entry_filter)
+    print(trade_regime_stats(trades, index).to_string(index=False))
+    print(f"✅ {len(index)} regime segments over {len(df)} candles, {len(trades)} trades")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# replay_feed.py
+import argparse
+import asyncio
+import heapq
+import time
+
+import pandas as pd
+
+# -----------------------------------------------
+# Market Replay Feed from Stored Candles
+# -----------------------------------------------
+
+"""
+Turns stored 1m candles back into a live-looking stream, for testing the live path
+(paper_trader.py, streaming_indicators.py) without an exchange:
+
+- one or many symbols (CSV paths or DataFrames), merged into one stream in
+  (timestamp, symbol) order with heapq.merge - no big concatenated frame
+- speed=1 is real time, speed=N is N times faster (a day of 1m candles takes 8.6 s at
+  speed=10_000), speed=None / 0 is as fast as the consumer can take them
+- back-pressure: candles go through a bounded asyncio.Queue, so the producer waits while
+  the consumer is `queue_size` candles behind instead of buffering the whole history
+
+Pacing follows the candle timestamps: a candle is released when the replay clock passes
+its timestamp (t0 + (timestamp - first timestamp) / speed). A slow consumer delays the
+feed; the delay shows up as lag in stats().
+
+    feed = ReplayFeed({'ETH/USDT': 'ethusdt_1m_month.csv'}, speed=1000)
+    async for candle in feed:
+        ...
+    feed.stats()   # {'candles': ..., 'candles_per_second': ..., 'max_lag_ms': ..., ...}
+"""
+
+_END = object()
+
+
+def load_source(source, symbol=None):
+    """
+    Candles DataFrame from a CSV path or DataFrame, sorted by timestamp.
+    symbol: fills the symbol column when the source doesn't have one.
+    """
+    if isinstance(source, pd.DataFrame):
+        df = source
+    else:
+        from data_cache import load_candles
+        df = load_candles(source)
+
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df = df.assign(timestamp=pd.to_datetime(df['timestamp']))
+    if 'symbol' not in df.columns:
+        df = df.assign(symbol=symbol)
+    if not df['timestamp'].is_monotonic_increasing:
+        df = df.sort_values('timestamp', kind='mergesort')
+    return df
+
+
+def _records(df, start=None, end=None):
+    if start is not None:
+        df = df[df['timestamp'] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df['timestamp'] < pd.Timestamp(end)]
+    columns = list(df.columns)
+    for row in df.itertuples(index=False, name=None):
+        yield dict(zip(columns, row))
+
+
+def merge_candle_streams(frames, start=None, end=None):
+    """
+    One iterator over the candles of all frames in (timestamp, symbol) order.
+    start / end: optional [start, end) timestamp range.
+    """
+    streams = [_records(df, start, end) for df in frames]
+    return heapq.merge(*streams, key=lambda candle: (candle['timestamp'], str(candle['symbol'])))
+
+
+class ReplayFeed:
+    """
+    Async iterable of stored candles replayed in timestamp order.
+
+    Parameters:
+    - sources: CSV path or DataFrame, a list of them, or {symbol: path or DataFrame}
+    - speed: 1 = real time, N = N x faster, None / 0 = as fast as possible
+    - queue_size: candles buffered ahead of the consumer (back-pressure limit)
+    - start / end: optional [start, end) timestamp range to replay
+    """
+
+    def __init__(self, sources, speed=None, queue_size=1000, start=None, end=None):
+        if isinstance(sources, dict):
+            self.frames = [load_source(src, symbol) for symbol, src in sources.items()]
+        elif isinstance(sources, (list, tuple)):
+            self.frames = [load_source(src) for src in sources]
+        else:
+            self.frames = [load_source(sources)]
+
+        if speed is not None and speed < 0:
+            raise ValueError(f"speed must be positive (or None / 0 for max speed), got {speed}")
+        self.speed = speed or None
+        self.queue_size = queue_size
+        self.start = start
+        self.end = end
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.candles = 0
+        self.blocked = 0          # puts that had to wait for the consumer
+        self.max_lag = 0.0        # seconds behind the replay clock
+        self.started = None
+        self.finished = None
+
+    async def _produce(self, queue):
+        loop = asyncio.get_running_loop()
+        first_ts = None
+        try:
+            for candle in merge_candle_streams(self.frames, self.start, self.end):
+                if self.speed is not None:
+                    ts = candle['timestamp']
+                    if first_ts is None:
+                        first_ts = ts
+                    due = self.started + (ts - first_ts).total_seconds() / self.speed
+                    wait = due - loop.time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    else:
+                        self.max_lag = max(self.max_lag, -wait)
+
+                if queue.full():
+                    self.blocked += 1
+                await queue.put(candle)
+                self.candles += 1
+        except Exception:
+            # Let the consumer stop waiting; it gets the error from the producer task
+            await queue.put(_END)
+            raise
+        await queue.put(_END)
+
+    async def _iterate(self):
+        self._reset_stats()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.started = asyncio.get_running_loop().time()
+        producer = asyncio.create_task(self._produce(queue))
+        try:
+            while True:
+                candle = await queue.get()
+                if candle is _END:
+                    break
+                yield candle
+            await producer  # re-raises anything the producer failed with
+        finally:
+            if not producer.done():
+                producer.cancel()
+            self.finished = asyncio.get_running_loop().time()
+
+    def __aiter__(self):
+        return self._iterate()
+
+    def stats(self):
+        elapsed = ((self.finished or time.monotonic()) - self.started) if self.started is not None else 0.0
+        return {
+            'candles': self.candles,
+            'seconds': round(elapsed, 3),
+            'candles_per_second': round(self.candles / elapsed, 1) if elapsed > 0 else 0.0,
+            'speed': self.speed or 'max',
+            'blocked_puts': self.blocked,
+            'max_lag_ms': round(self.max_lag * 1000, 3),
+        }
+
+
+# -----------------------------------------------
+# Command line: python replay_feed.py --csv ethusdt_1m_month.csv --speed 10000 --evaluate
+# -----------------------------------------------
+
+async def _consume(feed, evaluate):
+    engines = {}
+    async for candle in feed:
+        if evaluate:
+            if candle['symbol'] not in engines:
+                from paper_trader import SignalEvaluator
+                from streaming_indicators import IndicatorEngine
+                engines[candle['symbol']] = (IndicatorEngine(), SignalEvaluator())
+            engine, evaluator = engines[candle['symbol']]
+            evaluator.update(candle, engine.update(candle))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay stored candles as a live feed (load test)")
+    parser.add_argument('--csv', nargs='+', default=['ethusdt_1m_month.csv'], help="one candles CSV per symbol")
+    parser.add_argument('--speed', type=float, default=0, help="1 = real time, N = N x faster, 0 = max speed")
+    parser.add_argument('--queue-size', type=int, default=1000)
+    parser.add_argument('--start', default=None, help="first timestamp to replay")
+    parser.add_argument('--end', default=None, help="replay up to (not including) this timestamp")
+    parser.add_argument('--evaluate', action='store_true', help="update indicators and signals for every candle")
+    args = parser.parse_args(argv)
+
+    feed = ReplayFeed(args.csv, speed=args.speed, queue_size=args.queue_size, start=args.start, end=args.end)
+    asyncio.run(_consume(feed, args.evaluate))
+    print(f"✅ Replay finished: {feed.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,9 @@
 # signal_generator.py
+import numpy as np
+import pandas as pd
+
+from instrumentation import instrumented
+
 """
 def generate_signal_row(df):
     current = df.iloc[-1]  # Current candle
@@ -179,5 +184,330 @@ def generate_signal_row(df):
         'is_engulfing_bull': is_engulfing_bull,
         'detected_pattern': pattern,
         'filters_triggered_list': filters_triggered,
-        'signal_combo_name': signal_combo_name
+        'signal_combo_name': signal_combo_name,
+        'filters_mask': sum(FILTER_BITS[name] for name in filters_triggered)
     }
+
+
+# -----------------------------------------------
+# Vectorized Signal Engine (whole DataFrame at once)
+# -----------------------------------------------
+
+"""
+generate_signal_row() looks at a 21-candle window and only reads the LAST value of
+every rolling calculation. Running it in a loop means one DataFrame copy and ~5 rolling
+passes per candle.
+
+generate_signals() computes the exact same filters for every candle at once using
+column operations, so row i of its output equals generate_signal_row(df.iloc[i-20:i+1]).
+The first 20 rows have incomplete rolling windows (those filters come out False), which is
+why main.py drops them, same as the old loop starting at i=20.
+"""
+
+# Same order as the `filters` dict inside generate_signal_row()
+FILTER_NAMES = [
+    'recent_high_break',
+    'range_breakout',
+    'strong_candle',
+    'volume_spike',
+    'rsi_bounce',
+    'macd_cross_up',
+    'bb_upper_break',
+    'bb_lower_break',
+    'bb_squeeze_breakout'
+]
+
+# Lookup tables for every possible filter combination (2^9 = 512), so the per-row
+# list / combo name does not have to be rebuilt with sort + join on every candle
+_COMBO_LISTS = [
+    [name for bit, name in enumerate(FILTER_NAMES) if combo & (1 << bit)]
+    for combo in range(1 << len(FILTER_NAMES))
+]
+_COMBO_NAMES = np.array(
+    ['+'.join(sorted(names)) if names else 'none' for names in _COMBO_LISTS],
+    dtype=object
+)
+_DEBUG_NOTES = np.array(
+    [f"{score}/{len(FILTER_NAMES)} filters matched" for score in range(len(FILTER_NAMES) + 1)],
+    dtype=object
+)
+
+
+# -----------------------------------------------
+# Filter Combination Bitmask
+# -----------------------------------------------
+
+"""
+Every combination of triggered filters is stored as one int, `filters_mask`
+(bit i set = FILTER_NAMES[i] triggered), e.g. rsi_bounce + strong_candle = 16 + 4 = 20.
+Grouping, filtering and comparing ints is far cheaper than doing the same with lists or
+'+'-joined strings, so the backtester and combo_analytics.py work on the mask and only
+turn it back into a signal_combo_name for display.
+"""
+
+FILTER_BITS = {name: 1 << bit for bit, name in enumerate(FILTER_NAMES)}
+N_COMBOS = 1 << len(FILTER_NAMES)
+
+_MASK_BY_COMBO_NAME = {name: mask for mask, name in enumerate(_COMBO_NAMES)}
+
+# detected_pattern values, in the priority order of generate_signal_row()
+PATTERNS = ['hammer', 'doji', 'engulfing_bull', 'none']
+
+
+def combo_to_mask(combo):
+    """
+    Mask of one combination, given as a signal_combo_name ("rsi_bounce+strong_candle",
+    "none") or a list of filter names.
+    """
+    if isinstance(combo, str):
+        combo = [] if combo == 'none' else combo.split('+')
+    mask = 0
+    for name in combo:
+        if name not in FILTER_BITS:
+            raise ValueError(f"Unknown filter '{name}', expected one of {FILTER_NAMES}")
+        mask |= FILTER_BITS[name]
+    return mask
+
+
+def canonical_combo_name(combo):
+    """
+    The signal_combo_name of a combination given in any order or as a list of names,
+    e.g. "strong_candle+rsi_bounce" -> "rsi_bounce+strong_candle". Raises ValueError on
+    an unknown filter name.
+    """
+    return str(_COMBO_NAMES[combo_to_mask(combo)])
+
+
+def combo_names(masks):
+    """
+    signal_combo_name of a mask (int) or of every mask in an array.
+    """
+    return _COMBO_NAMES[masks]
+
+
+def combo_names_to_masks(names):
+    """
+    Masks of an array/Series of signal_combo_name strings (-1 for names that aren't a
+    combo and for missing values).
+    Each distinct name is only looked up once.
+    """
+    codes, uniques = pd.factorize(np.asarray(names, dtype=object))
+    if not len(uniques):
+        # Empty or all missing
+        return np.full(len(codes), -1, dtype=np.int64)
+    unique_masks = np.array([_MASK_BY_COMBO_NAME.get(name, -1) for name in uniques], dtype=np.int64)
+    # factorize gives missing values (None / NaN) code -1, which must not index unique_masks
+    return np.where(codes >= 0, unique_masks[codes], -1).astype(np.int64)
+
+
+@instrumented('signals', rows=len)
+def generate_signals(df, compact=False, features=None):
+    """
+    Vectorized equivalent of generate_signal_row() for a whole DataFrame.
+
+    Parameters:
+    - df: pandas DataFrame with OHLCV columns plus the indicator columns from
+      transformation.py (rsi, macd, macd_signal, bb_upper/middle/lower, atr)
+    - compact: return the compact layout (see compact_signals) without ever building the
+      per-row lists and strings
+    - features: rolling features from indicator_graph.compute_indicators(..., signal_features=True)
+      (computed here if not given)
+
+    Returns a DataFrame with one row per candle and the same columns as generate_signal_row()
+    plus the filters_mask column.
+    """
+    close = df['close']
+    open_ = df['open']
+    high = df['high']
+    low = df['low']
+    volume = df['volume']
+
+    # Indicator columns can be pd.NA (object dtype) when the frame was too short
+    atr = pd.to_numeric(df['atr'], errors='coerce')
+    rsi = pd.to_numeric(df['rsi'], errors='coerce')
+    macd = pd.to_numeric(df['macd'], errors='coerce')
+    macd_signal = pd.to_numeric(df['macd_signal'], errors='coerce')
+    bb_upper = pd.to_numeric(df['bb_upper'], errors='coerce')
+    bb_middle = pd.to_numeric(df['bb_middle'], errors='coerce')
+    bb_lower = pd.to_numeric(df['bb_lower'], errors='coerce')
+
+    # Rolling calculations (one pass each over the full column, shared via the indicator graph)
+    if features is None:
+        from indicator_graph import compute_signal_features
+        features = compute_signal_features(df)
+
+    breakout_up = close > features['close_max_20'].shift(1)
+
+    rolling_high = features['high_max_20']
+    range_size = rolling_high - features['low_min_20']
+    range_breakout = (close > rolling_high.shift(1)) & (range_size > atr)
+
+    body = (close - open_).abs()
+    candle_strength = body > atr * 0.7
+
+    avg_vol = features['volume_mean_20']
+    volume_spike = volume > avg_vol * 1.2
+
+    rsi_ok = rsi.between(45, 52)
+    macd_cross_up = macd > macd_signal
+
+    upper_wick = high - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - low
+    is_hammer = (lower_wick > 2 * body) & (upper_wick < 0.2 * body)
+    is_doji = body < (high - low) * 0.1
+    prev_close = features['prev_close']
+    prev_open = features['prev_open']
+    is_engulfing_bull = (
+        (prev_close < prev_open) &
+        (close > open_) &
+        (close > prev_open) &
+        (open_ < prev_close)
+    )
+
+    # Bollinger Band logic
+    bb_upper_break = close > bb_upper
+    bb_lower_break = close < bb_lower
+    bb_bandwidth = bb_upper - bb_lower
+    bb_squeeze = bb_bandwidth < features['bb_middle_std_20']
+
+    filters = {
+        'recent_high_break': breakout_up,
+        'range_breakout': range_breakout,
+        'strong_candle': candle_strength,
+        'volume_spike': volume_spike,
+        'rsi_bounce': rsi_ok,
+        'macd_cross_up': macd_cross_up,
+        'bb_upper_break': bb_upper_break,
+        'bb_lower_break': bb_lower_break,
+        'bb_squeeze_breakout': bb_squeeze
+    }
+
+    # Encode the triggered filters of each row as its filters_mask
+    combo = np.zeros(len(df), dtype=np.int64)
+    for name in FILTER_NAMES:
+        combo |= np.where(filters[name].to_numpy(dtype=bool), FILTER_BITS[name], 0)
+
+    match_score = np.zeros(len(df), dtype=np.int64)
+    for name in FILTER_NAMES:
+        match_score += filters[name].to_numpy(dtype=bool)
+
+    pattern_flags = [is_hammer.to_numpy(dtype=bool), is_doji.to_numpy(dtype=bool), is_engulfing_bull.to_numpy(dtype=bool)]
+    if compact:
+        return pd.DataFrame({
+            'timestamp': df['timestamp'].to_numpy(),
+            'symbol': pd.Categorical(df['symbol']),
+            'filters_mask': combo.astype(np.int16),
+            'match_score': match_score.astype(np.int8),
+            'final_signal': match_score >= 4,
+            'is_hammer': pattern_flags[0],
+            'is_doji': pattern_flags[1],
+            'is_engulfing_bull': pattern_flags[2],
+            'detected_pattern': pd.Categorical.from_codes(
+                np.select(pattern_flags, [0, 1, 2], default=3), categories=PATTERNS
+            ),
+        })
+
+    pattern = np.select(pattern_flags, PATTERNS[:3], default='none').astype(object)
+
+    signals = pd.DataFrame({
+        'timestamp': df['timestamp'].to_numpy(),
+        'symbol': df['symbol'].to_numpy(),
+        'recent_high_break': breakout_up.to_numpy(dtype=bool),
+        'range_breakout': range_breakout.to_numpy(dtype=bool),
+        'strong_candle': candle_strength.to_numpy(dtype=bool),
+        'volume_spike': volume_spike.to_numpy(dtype=bool),
+        'rsi_bounce': rsi_ok.to_numpy(dtype=bool),
+        'macd_cross_up': macd_cross_up.to_numpy(dtype=bool),
+        'bb_upper_break': bb_upper_break.to_numpy(dtype=bool),
+        'bb_lower_break': bb_lower_break.to_numpy(dtype=bool),
+        'bb_squeeze_breakout': bb_squeeze.to_numpy(dtype=bool),
+        'match_score': match_score,
+        'final_signal': match_score >= 4,
+        'logic_debug_note': _DEBUG_NOTES[match_score],
+        'is_hammer': is_hammer.to_numpy(dtype=bool),
+        'is_doji': is_doji.to_numpy(dtype=bool),
+        'is_engulfing_bull': is_engulfing_bull.to_numpy(dtype=bool),
+        'detected_pattern': pattern,
+        'filters_triggered_list': [list(_COMBO_LISTS[c]) for c in combo],
+        'signal_combo_name': _COMBO_NAMES[combo],
+        'filters_mask': combo
+    })
+
+    return signals
+
+
+# -----------------------------------------------
+# Compact Signal Layout (no per-row Python objects)
+# -----------------------------------------------
+
+"""
+The full fact_signals layout holds a Python list, two strings and nine bools per candle,
+which is several hundred bytes per row. The compact layout keeps only:
+
+- timestamp, symbol (categorical)
+- filters_mask (int16) - the nine filter flags packed into one int
+- match_score (int8), final_signal, is_hammer, is_doji, is_engulfing_bull (bool)
+- detected_pattern (categorical)
+
+about 16 bytes per row. Everything else is derived from the mask on demand:
+filter_flags() for single filters, expand_signals() for the full layout (e.g. before an upload).
+"""
+
+
+def compact_signals(signals):
+    """
+    Converts a full generate_signals() frame to the compact layout.
+    """
+    if 'filters_mask' in signals.columns:
+        masks = signals['filters_mask'].to_numpy(dtype=np.int64)
+    else:
+        masks = combo_names_to_masks(signals['signal_combo_name'])
+
+    return pd.DataFrame({
+        'timestamp': signals['timestamp'].to_numpy(),
+        'symbol': pd.Categorical(signals['symbol']),
+        'filters_mask': masks.astype(np.int16),
+        'match_score': signals['match_score'].to_numpy().astype(np.int8),
+        'final_signal': signals['final_signal'].to_numpy(dtype=bool),
+        'is_hammer': signals['is_hammer'].to_numpy(dtype=bool),
+        'is_doji': signals['is_doji'].to_numpy(dtype=bool),
+        'is_engulfing_bull': signals['is_engulfing_bull'].to_numpy(dtype=bool),
+        'detected_pattern': pd.Categorical(signals['detected_pattern'], categories=PATTERNS),
+    })
+
+
+def filter_flags(signals, name):
+    """
+    Bool array of one filter (e.g. 'rsi_bounce') from a full or compact signals frame.
+    """
+    if name in signals.columns:
+        return signals[name].to_numpy(dtype=bool)
+    return (signals['filters_mask'].to_numpy() & FILTER_BITS[name]) != 0
+
+
+def expand_signals(signals):
+    """
+    Compact signals back to the full generate_signals() layout (same columns and dtypes).
+    """
+    masks = signals['filters_mask'].to_numpy(dtype=np.int64)
+    match_score = signals['match_score'].to_numpy(dtype=np.int64)
+
+    full = {
+        'timestamp': signals['timestamp'].to_numpy(),
+        'symbol': signals['symbol'].to_numpy(dtype=object),
+    }
+    for name in FILTER_NAMES:
+        full[name] = (masks & FILTER_BITS[name]) != 0
+    full.update({
+        'match_score': match_score,
+        'final_signal': signals['final_signal'].to_numpy(dtype=bool),
+        'logic_debug_note': _DEBUG_NOTES[match_score],
+        'is_hammer': signals['is_hammer'].to_numpy(dtype=bool),
+        'is_doji': signals['is_doji'].to_numpy(dtype=bool),
+        'is_engulfing_bull': signals['is_engulfing_bull'].to_numpy(dtype=bool),
+        'detected_pattern': signals['detected_pattern'].to_numpy(dtype=object),
+        'filters_triggered_list': [list(_COMBO_LISTS[c]) for c in masks],
+        'signal_combo_name': _COMBO_NAMES[masks],
+        'filters_mask': masks,
+    })
+    return pd.DataFrame(full)
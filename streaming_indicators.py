@@ -0,0 +1,467 @@
+# streaming_indicators.py
+import math
+from collections import deque
+
+# -----------------------------------------------
+# Streaming (Incremental) Indicators for Live Candles
+# -----------------------------------------------
+
+"""
+Every add_* function in transformation.py recomputes the whole column, so one new 1m
+candle costs O(history). The objects below keep the running state instead:
+
+- EMA: last EMA value                      (add_ema / add_ema9_ema20)
+- MACD: EMA 12, EMA 26 and the signal EMA  (add_macd)
+- RSI: rolling gain / loss averages        (add_rsi)
+- BollingerBands: rolling mean + std       (add_bollinger_bands)
+- ATR: previous close + rolling TR average (add_atr)
+
+update() is O(1) per candle (O(period) memory for the rolling windows).
+
+The math follows pandas' own algorithms (ewm(adjust=False) weights, the add/remove
+rolling mean and Welford variance with Kahan compensation), so the values are the same as
+the batch functions, not just close to them. One difference: for a frame shorter than
+the period, the batch functions set the WHOLE column to NA, while the streaming objects
+return NaN only until they have enough candles.
+
+Usage:
+    engine = IndicatorEngine().seed(df)         # warm up from history
+    values = engine.update(new_candle)          # {'ema_9': ..., 'macd': ..., 'atr': ...}
+
+Every object also has to_state() / from_state(state): its running state as plain values,
+so a live process can checkpoint it and restart without recomputing the history
+(checkpoint.py). A restored object continues with exactly the same values.
+"""
+
+NaN = float('nan')
+
+
+def _divide(a, b):
+    # Float division with NumPy/pandas semantics (x/0 -> inf, 0/0 -> NaN)
+    if b == 0:
+        if a == 0 or a != a:
+            return NaN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+class RollingMean:
+    """
+    Same result as Series.rolling(window, min_periods=window).mean(), one value at a time.
+    """
+
+    # Running state saved by to_state() (besides the window and its values)
+    _STATE = ('nobs', 'sum_x', 'neg_ct', 'compensation_add', 'compensation_remove',
+              'num_consecutive_same_value', 'prev_value')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.compensation_add
+        t = self.sum_x + y
+        self.compensation_add = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct += 1
+        # Repeated identical values: pandas returns the value itself (no float artifacts)
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.compensation_remove
+        t = self.sum_x + y
+        self.compensation_remove = t - self.sum_x - y
+        self.sum_x = t
+        if math.copysign(1.0, val) < 0:
+            self.neg_ct -= 1
+
+    def update(self, val):
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+
+        if self.nobs < self.window or self.nobs == 0:
+            return NaN
+        result = self.sum_x / self.nobs
+        if self.num_consecutive_same_value >= self.nobs:
+            result = self.prev_value
+        elif self.neg_ct == 0 and result < 0:
+            result = 0.0
+        elif self.neg_ct == self.nobs and result > 0:
+            result = 0.0
+        return result
+
+    def to_state(self):
+        state = {name: getattr(self, name) for name in self._STATE}
+        state.update(window=self.window, values=list(self.values))
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['window'])
+        for name in cls._STATE:
+            setattr(obj, name, state[name])
+        obj.values = deque(state['values'])
+        return obj
+
+
+class RollingStd:
+    """
+    Same result as Series.rolling(window, min_periods=window).std() (ddof=1), one value at a time.
+    """
+
+    # Running state saved by to_state() (besides window, ddof and the window's values)
+    _STATE = ('nobs', 'mean_x', 'ssqdm_x', 'compensation_add', 'compensation_remove',
+              'num_consecutive_same_value', 'prev_value')
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.num_consecutive_same_value = 0
+        self.prev_value = None
+
+    def _add(self, val):
+        if val != val:
+            return
+        self.nobs += 1
+        if val == self.prev_value:
+            self.num_consecutive_same_value += 1
+        else:
+            self.num_consecutive_same_value = 1
+        self.prev_value = val
+
+        # Welford's online variance with Kahan summation (same as pandas)
+        prev_mean = self.mean_x - self.compensation_add
+        y = val - self.compensation_add
+        t = y - self.mean_x
+        self.compensation_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.compensation_remove
+            y = val - self.compensation_remove
+            t = y - self.mean_x
+            self.compensation_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, val):
+        val = float(val)
+        if self.prev_value is None:
+            self.prev_value = val
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+
+        if self.nobs < self.window or self.nobs <= self.ddof:
+            return NaN
+        if self.nobs == 1 or self.num_consecutive_same_value >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - self.ddof)
+        return math.sqrt(var) if var > 0 else 0.0
+
+    def to_state(self):
+        state = {name: getattr(self, name) for name in self._STATE}
+        state.update(window=self.window, ddof=self.ddof, values=list(self.values))
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['window'], state['ddof'])
+        for name in cls._STATE:
+            setattr(obj, name, state[name])
+        obj.values = deque(state['values'])
+        return obj
+
+
+class EMA:
+    """
+    Same result as Series.ewm(span=span, adjust=False).mean(), one value at a time.
+    """
+
+    def __init__(self, span):
+        self.span = span
+        com = (span - 1) / 2.0
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.value = NaN
+        self.old_wt = 1.0
+
+    def update(self, val):
+        val = float(val)
+        if self.value != self.value:
+            # First observation starts the EMA
+            if val == val:
+                self.value = val
+                self.old_wt = 1.0
+            return self.value
+
+        self.old_wt *= self.old_wt_factor
+        if val == val:
+            if self.value != val:
+                self.value = (self.old_wt * self.value + self.alpha * val) / (self.old_wt + self.alpha)
+            self.old_wt = 1.0
+        return self.value
+
+    def to_state(self):
+        return {'span': self.span, 'value': self.value, 'old_wt': self.old_wt}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['span'])
+        obj.value = state['value']
+        obj.old_wt = state['old_wt']
+        return obj
+
+
+class MACD:
+    """
+    MACD line, signal line and histogram like add_macd().
+    """
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.ema_fast = EMA(fast)
+        self.ema_slow = EMA(slow)
+        self.ema_signal = EMA(signal)
+
+    def update(self, close):
+        macd = self.ema_fast.update(close) - self.ema_slow.update(close)
+        macd_signal = self.ema_signal.update(macd)
+        return {
+            'macd': macd,
+            'macd_signal': macd_signal,
+            'macd_histogram': macd - macd_signal,
+        }
+
+    def to_state(self):
+        return {
+            'ema_fast': self.ema_fast.to_state(),
+            'ema_slow': self.ema_slow.to_state(),
+            'ema_signal': self.ema_signal.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls()
+        obj.ema_fast = EMA.from_state(state['ema_fast'])
+        obj.ema_slow = EMA.from_state(state['ema_slow'])
+        obj.ema_signal = EMA.from_state(state['ema_signal'])
+        return obj
+
+
+class RSI:
+    """
+    RSI like add_rsi(): rolling averages of gains and losses over 'period' candles.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_gain = RollingMean(period)
+        self.avg_loss = RollingMean(period)
+        self.prev_close = None
+
+    def update(self, close):
+        close = float(close)
+        delta = NaN if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+
+        # Same as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0)
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+
+        rs = _divide(self.avg_gain.update(gain), self.avg_loss.update(loss))
+        return 100 - _divide(100, 1 + rs)
+
+    def to_state(self):
+        return {
+            'period': self.period,
+            'avg_gain': self.avg_gain.to_state(),
+            'avg_loss': self.avg_loss.to_state(),
+            'prev_close': self.prev_close,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['period'])
+        obj.avg_gain = RollingMean.from_state(state['avg_gain'])
+        obj.avg_loss = RollingMean.from_state(state['avg_loss'])
+        obj.prev_close = state['prev_close']
+        return obj
+
+
+class BollingerBands:
+    """
+    Middle / upper / lower bands like add_bollinger_bands().
+    """
+
+    def __init__(self, period=20, multiplier=2):
+        self.multiplier = multiplier
+        self.mean = RollingMean(period)
+        self.std = RollingStd(period)
+
+    def update(self, close):
+        middle = self.mean.update(close)
+        std = self.std.update(close)
+        return {
+            'bb_middle': middle,
+            'bb_upper': middle + (self.multiplier * std),
+            'bb_lower': middle - (self.multiplier * std),
+        }
+
+    def to_state(self):
+        return {'multiplier': self.multiplier, 'mean': self.mean.to_state(), 'std': self.std.to_state()}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['mean']['window'], state['multiplier'])
+        obj.mean = RollingMean.from_state(state['mean'])
+        obj.std = RollingStd.from_state(state['std'])
+        return obj
+
+
+class ATR:
+    """
+    ATR like add_atr(): rolling average of the True Range over 'period' candles.
+    """
+
+    def __init__(self, period=14):
+        self.period = period
+        self.avg_tr = RollingMean(period)
+        self.prev_close = None
+
+    def update(self, high, low, close):
+        high = float(high)
+        low = float(low)
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = float(close)
+        return self.avg_tr.update(tr)
+
+    def to_state(self):
+        return {'period': self.period, 'avg_tr': self.avg_tr.to_state(), 'prev_close': self.prev_close}
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls(state['period'])
+        obj.avg_tr = RollingMean.from_state(state['avg_tr'])
+        obj.prev_close = state['prev_close']
+        return obj
+
+
+class IndicatorEngine:
+    """
+    All indicators of transformation.add_all_indicators(), updated one candle at a time.
+
+    Parameters:
+    - rsi_period, bb_period, bb_multiplier, atr_period: same defaults as main.py
+    """
+
+    def __init__(self, rsi_period=14, bb_period=20, bb_multiplier=2, atr_period=14):
+        self.ema_9 = EMA(9)
+        self.ema_20 = EMA(20)
+        self.macd = MACD()
+        self.rsi = RSI(rsi_period)
+        self.bollinger = BollingerBands(bb_period, bb_multiplier)
+        self.atr = ATR(atr_period)
+        self.last_timestamp = None
+        self.candles_seen = 0
+
+    def update(self, candle):
+        """
+        Feeds one closed candle (dict or Series with high/low/close, optionally timestamp)
+        and returns the indicator values for it, keyed by the fact_prices column names.
+        """
+        close = candle['close']
+        values = {
+            'ema_9': self.ema_9.update(close),
+            'ema_20': self.ema_20.update(close),
+        }
+        values.update(self.macd.update(close))
+        values['rsi'] = self.rsi.update(close)
+        values.update(self.bollinger.update(close))
+        values['atr'] = self.atr.update(candle['high'], candle['low'], close)
+
+        self.last_timestamp = candle.get('timestamp') if hasattr(candle, 'get') else None
+        self.candles_seen += 1
+        return values
+
+    def seed(self, df):
+        """
+        Warms the engine up from a historical candles DataFrame (oldest first).
+        Returns self so it can be chained: IndicatorEngine().seed(df)
+        """
+        columns = ['high', 'low', 'close']
+        has_timestamp = 'timestamp' in df.columns
+        if has_timestamp:
+            columns.append('timestamp')
+        for row in df[columns].itertuples(index=False):
+            candle = row._asdict()
+            self.update(candle)
+        return self
+
+    def to_state(self):
+        """
+        Everything needed to continue exactly where this engine is (plain dicts / lists /
+        floats, see checkpoint.py). IndicatorEngine.from_state(state) restores it.
+        """
+        return {
+            'ema_9': self.ema_9.to_state(),
+            'ema_20': self.ema_20.to_state(),
+            'macd': self.macd.to_state(),
+            'rsi': self.rsi.to_state(),
+            'bollinger': self.bollinger.to_state(),
+            'atr': self.atr.to_state(),
+            'last_timestamp': self.last_timestamp,
+            'candles_seen': self.candles_seen,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        obj = cls()
+        obj.ema_9 = EMA.from_state(state['ema_9'])
+        obj.ema_20 = EMA.from_state(state['ema_20'])
+        obj.macd = MACD.from_state(state['macd'])
+        obj.rsi = RSI.from_state(state['rsi'])
+        obj.bollinger = BollingerBands.from_state(state['bollinger'])
+        obj.atr = ATR.from_state(state['atr'])
+        obj.last_timestamp = state['last_timestamp']
+        obj.candles_seen = state['candles_seen']
+        return obj
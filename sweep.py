@@ -0,0 +1,315 @@
+# sweep.py
+import argparse
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+from multiprocessing import get_all_start_methods, get_context
+
+import numpy as np
+import pandas as pd
+
+from backtester import ALLOWED_COMBOS, get_backtest_arrays, find_entry_candidates, simulate_trades_v2
+from monte_carlo import monte_carlo_summary_row
+from signal_generator import canonical_combo_name
+
+# -----------------------------------------------
+# Parallel Parameter Sweep for run_backtest_v2
+# -----------------------------------------------
+
+"""
+Runs the array engine of run_backtest_v2 for every combination of a parameter grid and
+ranks the configurations by PnL.
+
+How the work is shared across CPU cores:
+- Signals and indicator arrays are computed ONCE in the parent process.
+- Each array is written to a temporary .npy file and every worker opens it with
+  np.load(mmap_mode='r'), so all processes read the same pages from the OS page cache.
+  Nothing big is pickled per task - a task is just a small dict of parameters.
+- Object (string) arrays, if any, are stored as integer codes + the short list of
+  unique names, because object arrays can't be memory-mapped.
+
+Grid keys (same names as run_backtest_v2 arguments):
+- tp_k_base, sl_k_base, max_duration, cooldown_after_loss, score_threshold
+- allowed_combos: list of combo sets, e.g. [{"rsi_bounce+strong_candle"}, {...}]
+"""
+
+DEFAULT_GRID = {
+    'tp_k_base': [1.95],
+    'sl_k_base': [1.5],
+    'max_duration': [3],
+    'cooldown_after_loss': [3],
+    'score_threshold': [2],
+    'allowed_combos': [ALLOWED_COMBOS],
+}
+
+# Arrays of the worker process (filled in by _init_worker)
+_WORKER_ARRAYS = None
+
+
+def expand_grid(param_grid):
+    """
+    Turns {'tp_k_base': [1.5, 2.0], 'max_duration': [3, 5]} into a list of parameter dicts.
+    Keys missing from param_grid use the run_backtest_v2 defaults.
+    """
+    grid = dict(DEFAULT_GRID)
+    grid.update(param_grid)
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def summarize_pnl(pnl_pct):
+    """
+    Trade count, total/average PnL, win rate and max drawdown of a sequence of trade PnLs (%).
+
+    Drawdown is measured on the cumulative PnL curve (sum of pnl_pct), in percentage points.
+    """
+    pnl = np.asarray(pnl_pct, dtype=np.float64)
+    if len(pnl) == 0:
+        return {
+            'trades': 0,
+            'total_pnl_pct': 0.0,
+            'avg_pnl_pct': 0.0,
+            'win_rate': 0.0,
+            'max_drawdown_pct': 0.0,
+        }
+
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+
+    return {
+        'trades': len(pnl),
+        'total_pnl_pct': round(float(equity[-1]), 4),
+        'avg_pnl_pct': round(float(pnl.mean()), 4),
+        'win_rate': round(float((pnl > 0).mean()), 4),
+        'max_drawdown_pct': round(float((peak - equity).max()), 4),
+    }
+
+
+def simulate_config(arrays, params, start=0, end=None):
+    """
+    Trades of one configuration (list of simulate_trades_v2 dicts).
+
+    start / end restrict entries to candles [start, end - max_duration), so every trade
+    also exits before `end` (used by walk_forward.py for train / test windows).
+    """
+    candidates = find_entry_candidates(
+        arrays,
+        score_threshold=params['score_threshold'],
+        max_duration=params['max_duration'],
+        allowed_combos=params['allowed_combos']
+    )
+    if start or end is not None:
+        stop = len(arrays['close']) if end is None else end
+        candidates = candidates[(candidates >= start) & (candidates < stop - params['max_duration'])]
+
+    return simulate_trades_v2(
+        arrays,
+        candidates,
+        tp_k_base=params['tp_k_base'],
+        sl_k_base=params['sl_k_base'],
+        max_duration=params['max_duration'],
+        cooldown_after_loss=params['cooldown_after_loss']
+    )
+
+
+def combos_label(allowed_combos):
+    """
+    allowed_combos as one sortable string for result rows, e.g.
+    "rsi_bounce+strong_candle,strong_candle" (entries may be names in any order or lists).
+    """
+    return ','.join(sorted(canonical_combo_name(combo) for combo in allowed_combos))
+
+
+def run_single_config(arrays, params, start=0, end=None, monte_carlo_sims=0):
+    """
+    Runs one configuration on the arrays (optionally only candles [start, end)) and
+    returns its summary row. With monte_carlo_sims > 0 the row also gets bootstrap
+    robustness columns (monte_carlo.monte_carlo_summary_row).
+    """
+    results = simulate_config(arrays, params, start, end)
+    pnl = [r['pnl'] for r in results]
+
+    row = dict(params)
+    row['allowed_combos'] = combos_label(params['allowed_combos'])
+    row.update(summarize_pnl(pnl))
+    if monte_carlo_sims:
+        row.update(monte_carlo_summary_row(pnl, n_sims=monte_carlo_sims))
+    return row
+
+
+# -----------------------------------------------
+# Memory-mapped arrays shared with worker processes
+# -----------------------------------------------
+
+def write_shared_arrays(arrays, folder):
+    """
+    Saves every array to folder/<name>.npy so workers can memory-map them.
+    Object (string) arrays are stored as int codes plus their unique values.
+
+    Returns a small, picklable description: (numeric array names, {name: uniques}).
+    """
+    numeric = []
+    categorical = {}
+    for name, values in arrays.items():
+        if values.dtype == object:
+            codes, uniques = pd.factorize(values)
+            np.save(os.path.join(folder, f"{name}.npy"), codes)
+            categorical[name] = np.asarray(uniques, dtype=object)
+        else:
+            np.save(os.path.join(folder, f"{name}.npy"), values)
+            numeric.append(name)
+    return numeric, categorical
+
+
+def load_shared_arrays(folder, numeric, categorical):
+    """
+    Opens the arrays written by write_shared_arrays() read-only (memory-mapped).
+    """
+    arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode='r') for name in numeric}
+    for name, uniques in categorical.items():
+        codes = np.load(os.path.join(folder, f"{name}.npy"), mmap_mode='r')
+        arrays[name] = uniques[codes]
+    return arrays
+
+
+def _init_worker(folder, numeric, categorical):
+    global _WORKER_ARRAYS
+    _WORKER_ARRAYS = load_shared_arrays(folder, numeric, categorical)
+
+
+def get_worker_arrays():
+    """
+    The memory-mapped arrays of the current worker (inside a shared_array_pool task).
+    """
+    return _WORKER_ARRAYS
+
+
+@contextmanager
+def shared_array_pool(arrays, processes):
+    """
+    Process pool whose workers all see `arrays` through get_worker_arrays().
+
+    The arrays are written once to a temporary folder and memory-mapped read-only by every
+    worker; the folder is removed when the pool closes.
+    """
+    with tempfile.TemporaryDirectory(prefix="sweep_") as folder:
+        numeric, categorical = write_shared_arrays(arrays, folder)
+        # fork on Linux: workers start instantly and inherit the imported modules
+        method = 'fork' if 'fork' in get_all_start_methods() else None
+        with get_context(method).Pool(
+            processes,
+            initializer=_init_worker,
+            initargs=(folder, numeric, categorical)
+        ) as pool:
+            yield pool
+
+
+def _run_worker_task(task):
+    params, monte_carlo_sims = task
+    return run_single_config(get_worker_arrays(), params, monte_carlo_sims=monte_carlo_sims)
+
+
+def run_parameter_sweep(df, param_grid, signals=None, processes=None, rank_by='total_pnl_pct', monte_carlo_sims=0):
+    """
+    Runs run_backtest_v2 (array engine) for every configuration in param_grid across a
+    process pool and returns a ranked summary table.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - param_grid: dict of parameter name -> list of values (see module docstring)
+    - signals: precomputed generate_signals(df) output (computed here if not given)
+    - processes: number of worker processes (default = number of CPU cores, 1 = no pool)
+    - rank_by: summary column to sort by (highest first)
+    - monte_carlo_sims: bootstrap simulations per configuration (0 = none)
+    """
+    if signals is None:
+        from signal_generator import generate_signals
+        signals = generate_signals(df)
+
+    configs = expand_grid(param_grid)
+    arrays = get_backtest_arrays(df, signals)
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(configs)))
+
+    if processes == 1:
+        rows = [run_single_config(arrays, params, monte_carlo_sims=monte_carlo_sims) for params in configs]
+    else:
+        with shared_array_pool(arrays, processes) as pool:
+            chunksize = max(1, len(configs) // (processes * 4))
+            tasks = [(params, monte_carlo_sims) for params in configs]
+            rows = list(pool.imap(_run_worker_task, tasks, chunksize=chunksize))
+
+    summary = pd.DataFrame(rows)
+    summary = summary.sort_values([rank_by, 'win_rate'], ascending=False, kind='mergesort').reset_index(drop=True)
+    summary.insert(0, 'rank', summary.index + 1)
+    return summary
+
+
+# -----------------------------------------------
+# Command line: python sweep.py --tp 1.5 1.95 2.5 --sl 1.0 1.5 ...
+# -----------------------------------------------
+
+def add_grid_arguments(parser):
+    """
+    --tp / --sl / --max-duration / --cooldown / --score / --combos (shared with walk_forward.py).
+    """
+    parser.add_argument('--tp', type=float, nargs='+', default=DEFAULT_GRID['tp_k_base'], help="tp_k_base values")
+    parser.add_argument('--sl', type=float, nargs='+', default=DEFAULT_GRID['sl_k_base'], help="sl_k_base values")
+    parser.add_argument('--max-duration', type=int, nargs='+', default=DEFAULT_GRID['max_duration'])
+    parser.add_argument('--cooldown', type=int, nargs='+', default=DEFAULT_GRID['cooldown_after_loss'])
+    parser.add_argument('--score', type=int, nargs='+', default=DEFAULT_GRID['score_threshold'])
+    parser.add_argument('--combos', nargs='+', default=None,
+                        help="one allowed-combo set per value, combos separated by commas, "
+                             "e.g. 'rsi_bounce+strong_candle' 'rsi_bounce+strong_candle,macd_cross_up+strong_candle'")
+
+
+def grid_from_args(args):
+    """
+    Parameter grid from the add_grid_arguments() options.
+    """
+    param_grid = {
+        'tp_k_base': args.tp,
+        'sl_k_base': args.sl,
+        'max_duration': args.max_duration,
+        'cooldown_after_loss': args.cooldown,
+        'score_threshold': args.score,
+    }
+    if args.combos:
+        param_grid['allowed_combos'] = [set(c.split(',')) for c in args.combos]
+    return param_grid
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep for run_backtest_v2")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    add_grid_arguments(parser)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--top', type=int, default=20, help="rows to print")
+    parser.add_argument('--monte-carlo', type=int, default=0, help="bootstrap simulations per configuration")
+    parser.add_argument('--out', default=None, help="optional path to save the full summary as CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from transformation import add_all_indicators
+
+    args = _parse_args(argv)
+
+    df = pd.read_csv(args.csv)
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    df = add_all_indicators(df)
+
+    summary = run_parameter_sweep(df, grid_from_args(args), processes=args.processes, monte_carlo_sims=args.monte_carlo)
+    print(summary.head(args.top).to_string(index=False))
+    print(f"✅ Swept {len(summary)} configurations")
+
+    if args.out:
+        summary.to_csv(args.out, index=False)
+        print(f"✅ Saved sweep summary to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
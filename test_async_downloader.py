@@ -0,0 +1,84 @@
+# test_async_downloader.py
+import asyncio
+
+import pandas as pd
+import pytest
+
+from async_downloader import download_history, split_range
+from fake_exchange import FakeExchange
+
+# -----------------------------------------------
+# Sharded Downloader against the Local Fake Exchange
+# -----------------------------------------------
+
+START_MS = 1_700_000_000_000 // 60_000 * 60_000  # aligned to a minute
+MINUTES = 5_000
+SYMBOLS = ['ETH/USDT', 'BTC/USDT']
+
+
+def _download(exchange, **kwargs):
+    return asyncio.run(download_history(
+        SYMBOLS, since=START_MS, until=START_MS + MINUTES * 60_000, exchange=exchange,
+        requests_per_second=1_000, exchange_name='Fake', **kwargs
+    ))
+
+
+def _assert_contiguous(df):
+    expected = pd.date_range(pd.Timestamp(START_MS, unit='ms'), periods=MINUTES, freq='1min')
+    assert list(df['timestamp']) == list(expected)
+
+
+@pytest.mark.parametrize('shards', [1, 3, 8])
+def test_shards_stitch_into_contiguous_history(shards):
+    exchange = FakeExchange(start_ms=START_MS, max_limit=700)
+    frames = _download(exchange, shards_per_symbol=shards, batch_size=700)
+
+    assert sorted(frames) == sorted(SYMBOLS)
+    for symbol, df in frames.items():
+        _assert_contiguous(df)
+        assert (df['symbol'] == symbol).all()
+    assert not frames['ETH/USDT']['close'].equals(frames['BTC/USDT']['close'])
+
+
+class OverlappingExchange(FakeExchange):
+    """
+    Starts every page two candles before `since`, like venues that round `since` down.
+    """
+
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        return await super().fetch_ohlcv(symbol, timeframe, since - 2 * 60_000, limit)
+
+
+def test_overlapping_pages_are_deduplicated():
+    exchange = OverlappingExchange(start_ms=START_MS - 10 * 60_000, max_limit=600)
+    frames = _download(exchange, shards_per_symbol=4, batch_size=600)
+    for df in frames.values():
+        _assert_contiguous(df)
+        assert df['timestamp'].is_unique
+
+
+def test_rate_limited_pages_are_retried():
+    exchange = FakeExchange(start_ms=START_MS, max_limit=500, rate_limit_every=5)
+    frames = _download(exchange, shards_per_symbol=4, batch_size=500, retry_wait=0.0)
+    assert exchange.rate_limited > 0
+    for df in frames.values():
+        _assert_contiguous(df)
+
+
+def test_split_range_covers_the_range_once():
+    ranges = split_range(START_MS, START_MS + MINUTES * 60_000, '1m', 7)
+    assert ranges[0][0] == START_MS and ranges[-1][1] == START_MS + MINUTES * 60_000
+    assert all(end == next_start for (_, end), (next_start, _) in zip(ranges, ranges[1:]))
+
+
+class BrokenExchange(FakeExchange):
+    async def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.calls += 1
+        raise KeyError('bug in the exchange wrapper')
+
+
+def test_permanent_errors_are_not_retried():
+    exchange = BrokenExchange(start_ms=START_MS)
+    with pytest.raises(KeyError):
+        _download(exchange, shards_per_symbol=1, retry_wait=0.0)
+    assert exchange.calls == len(SYMBOLS)
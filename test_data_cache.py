@@ -0,0 +1,64 @@
+# test_data_cache.py
+import os
+
+import pandas as pd
+import pytest
+
+import data_cache
+from data_cache import file_hash, load_enriched_prices
+
+# -----------------------------------------------
+# Columnar Cache: Keys and Crash-Safe Writes
+# -----------------------------------------------
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ethusdt_1m_month.csv')
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'candles.csv'
+    pd.read_csv(CSV_PATH, nrows=300).to_csv(path, index=False)
+    return str(path)
+
+
+def _cache_files(cache_dir, kind):
+    return sorted(name for name in os.listdir(cache_dir) if name.startswith(kind))
+
+
+def test_second_load_is_served_from_the_cache(tmp_path, csv_path):
+    cache_dir = str(tmp_path / 'cache')
+    first = load_enriched_prices(csv_path, cache_dir=cache_dir)
+    pd.testing.assert_frame_equal(load_enriched_prices(csv_path, cache_dir=cache_dir), first)
+    assert len(_cache_files(cache_dir, 'prices')) == 1
+    assert not [name for name in os.listdir(cache_dir) if name.endswith('.tmp')]
+
+
+def test_indicator_code_change_misses_the_cache(tmp_path, csv_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+    load_enriched_prices(csv_path, cache_dir=cache_dir)
+    monkeypatch.setattr(data_cache, '_indicator_code_hash', 'edited transformation.py')
+    load_enriched_prices(csv_path, cache_dir=cache_dir)
+    assert len(_cache_files(cache_dir, 'prices')) == 2
+
+
+def test_corrupt_hash_index_is_rebuilt(tmp_path, csv_path):
+    cache_dir = tmp_path / 'cache'
+    digest = file_hash(csv_path, str(cache_dir))
+    (cache_dir / 'file_hashes.json').write_text('{"truncated": ')
+    assert file_hash(csv_path, str(cache_dir)) == digest
+    assert os.path.abspath(csv_path) in (cache_dir / 'file_hashes.json').read_text()
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = str(tmp_path / 'file_hashes.json')
+    with open(path, 'w') as f:
+        f.write('{}')
+
+    def crash(target):
+        with open(target, 'w') as f:
+            f.write('{"half')
+        raise OSError('disk full')
+
+    with pytest.raises(OSError):
+        data_cache._replace_atomically(path, crash)
+    assert open(path).read() == '{}' and os.listdir(tmp_path) == ['file_hashes.json']
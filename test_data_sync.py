@@ -0,0 +1,102 @@
+# test_data_sync.py
+import pandas as pd
+import pytest
+
+import data_sync
+from data_sync import read_last_timestamp, sync_candles
+from exchanges import Connector
+from fake_exchange import SyncFakeExchange
+
+# -----------------------------------------------
+# Incremental Sync against the Local Fake Exchange
+# -----------------------------------------------
+
+NOW_MS = 1_700_000_000_000 // 60_000 * 60_000 + 30_000  # half-way through a minute
+DAY_MS = 86_400_000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {'ms': NOW_MS}
+    monkeypatch.setattr(data_sync.time, 'time', lambda: now['ms'] / 1000)
+    return now
+
+
+@pytest.fixture
+def fetch():
+    connector = Connector('fake', exchange=SyncFakeExchange(start_ms=NOW_MS - 10 * DAY_MS), retry_wait=0.0)
+    return connector.fetch_candles
+
+
+def _read(csv_path):
+    return pd.read_csv(csv_path, parse_dates=['timestamp'])
+
+
+def _assert_contiguous(df, first_ms, last_ms):
+    expected = pd.date_range(pd.Timestamp(first_ms, unit='ms'), pd.Timestamp(last_ms, unit='ms'), freq='1min')
+    assert list(df['timestamp']) == list(expected)
+
+
+def test_initial_sync_stores_closed_candles(tmp_path, clock, fetch):
+    csv_path = str(tmp_path / 'ETH-USDT_1m.csv')
+    summary = sync_candles('ETH/USDT', csv_path=csv_path, fetch_fn=fetch, initial_days=1)
+
+    last_closed = NOW_MS // 60_000 * 60_000 - 60_000
+    assert summary['new_rows'] == 1440 and summary['gaps_remaining'] == 0
+    _assert_contiguous(_read(csv_path), last_closed - DAY_MS + 60_000, last_closed)
+
+
+def test_refresh_only_appends_new_candles(tmp_path, clock, fetch):
+    csv_path = tmp_path / 'ETH-USDT_1m.csv'
+    sync_candles('ETH/USDT', csv_path=str(csv_path), fetch_fn=fetch, initial_days=1)
+    before = csv_path.read_bytes()
+
+    clock['ms'] += 30 * 60_000
+    summary = sync_candles('ETH/USDT', csv_path=str(csv_path), fetch_fn=fetch, initial_days=1)
+
+    assert summary['new_rows'] == 30 and summary['api_requests'] == 1
+    assert csv_path.read_bytes().startswith(before)
+    df = _read(csv_path)
+    assert df['timestamp'].is_unique
+    _assert_contiguous(df, df['timestamp'].iloc[0].value // 1_000_000, clock['ms'] // 60_000 * 60_000 - 60_000)
+
+    assert sync_candles('ETH/USDT', csv_path=str(csv_path), fetch_fn=fetch)['new_rows'] == 0
+
+
+def test_gap_is_back_filled(tmp_path, clock, fetch):
+    gap = (pd.Timestamp(NOW_MS - 3 * 3_600_000, unit='ms').floor('min'),
+           pd.Timestamp(NOW_MS - 2 * 3_600_000, unit='ms').floor('min'))
+    calls = []
+
+    def gappy_fetch(**kwargs):
+        df = fetch(**kwargs)
+        calls.append(kwargs['since'])
+        if len(calls) == 1:
+            # The first request misses an hour; the exchange has it when asked again
+            df = df[(df['timestamp'] < gap[0]) | (df['timestamp'] >= gap[1])]
+        return df
+
+    csv_path = str(tmp_path / 'ETH-USDT_1m.csv')
+    summary = sync_candles('ETH/USDT', csv_path=csv_path, fetch_fn=gappy_fetch, initial_days=1)
+
+    assert summary['gaps_filled'] == 1 and summary['gaps_remaining'] == 0
+    assert calls[1] == gap[0].value // 1_000_000
+    df = _read(csv_path)
+    last_closed = NOW_MS // 60_000 * 60_000 - 60_000
+    _assert_contiguous(df, last_closed - DAY_MS + 60_000, last_closed)
+
+
+def test_interrupted_append_is_ignored_and_repaired(tmp_path, clock, fetch):
+    csv_path = tmp_path / 'ETH-USDT_1m.csv'
+    sync_candles('ETH/USDT', csv_path=str(csv_path), fetch_fn=fetch, initial_days=1)
+    last = read_last_timestamp(str(csv_path))
+
+    with open(csv_path, 'a') as f:
+        f.write(f"{last + pd.Timedelta('1min')},1801.2,18")  # crash mid-row
+    assert read_last_timestamp(str(csv_path)) == last
+
+    clock['ms'] += 10 * 60_000
+    sync_candles('ETH/USDT', csv_path=str(csv_path), fetch_fn=fetch)
+    df = _read(csv_path)
+    assert df['timestamp'].is_unique and df.notna().all().all()
+    _assert_contiguous(df, df['timestamp'].iloc[0].value // 1_000_000, clock['ms'] // 60_000 * 60_000 - 60_000)
@@ -0,0 +1,95 @@
+# test_equivalence.py
+import os
+
+import pandas as pd
+import pytest
+
+from backtester import run_backtest_v2, run_backtest_v2_fast
+from signal_generator import generate_signal_row, generate_signals
+from streaming_indicators import IndicatorEngine
+from transformation import add_all_indicators
+
+# -----------------------------------------------
+# Fast Engines vs the Row-by-Row Originals
+# -----------------------------------------------
+
+"""
+The vectorized / array / streaming engines promise the same output as the code they
+replace. These checks run both on a slice of ethusdt_1m_month.csv and require identical
+results (not approximately equal ones).
+"""
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ethusdt_1m_month.csv')
+SLICE_ROWS = 1500
+WINDOW = 21  # run_backtest_v2 hands the signal function rows i - 21 .. i
+
+
+@pytest.fixture(scope='module')
+def candles():
+    return pd.read_csv(CSV_PATH, nrows=SLICE_ROWS, parse_dates=['timestamp'])
+
+
+@pytest.fixture(scope='module')
+def prices(candles):
+    return add_all_indicators(candles.copy())
+
+
+def test_generate_signals_matches_generate_signal_row(prices):
+    rows = pd.DataFrame([
+        generate_signal_row(prices.iloc[i - WINDOW:i + 1])
+        for i in range(WINDOW, len(prices))
+    ])
+    signals = generate_signals(prices).iloc[WINDOW:].reset_index(drop=True)
+    pd.testing.assert_frame_equal(signals[rows.columns], rows)
+
+
+BACKTEST_PARAMS = [
+    {},
+    {
+        'score_threshold': 1,
+        'tp_k_base': 1.2,
+        'sl_k_base': 0.8,
+        'max_duration': 6,
+        'cooldown_after_loss': 0,
+        'allowed_combos': ['macd_cross_up', 'macd_cross_up+strong_candle', 'rsi_bounce+strong_candle', 'strong_candle'],
+    },
+]
+
+
+@pytest.mark.parametrize('params', BACKTEST_PARAMS, ids=['defaults', 'custom'])
+def test_run_backtest_v2_fast_matches_run_backtest_v2(prices, params):
+    expected = run_backtest_v2(prices, generate_signal_row, **params)
+    trades = run_backtest_v2_fast(prices, **params)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(trades, expected)
+
+
+def test_allowed_combos_are_normalized_the_same_way(prices):
+    combos = ['strong_candle+rsi_bounce', ['strong_candle', 'macd_cross_up'], 'strong_candle']
+    params = {'score_threshold': 1, 'cooldown_after_loss': 0, 'allowed_combos': combos}
+    expected = run_backtest_v2(prices, generate_signal_row, **params)
+    trades = run_backtest_v2_fast(prices, **params)
+    assert expected['signal_combo_name'].isin(['rsi_bounce+strong_candle', 'macd_cross_up+strong_candle']).any()
+    pd.testing.assert_frame_equal(trades, expected)
+
+
+def test_unknown_combo_filter_raises_in_both_engines(prices):
+    for run in (lambda: run_backtest_v2(prices, generate_signal_row, allowed_combos=['rsi_bounce+typo']),
+                lambda: run_backtest_v2_fast(prices, allowed_combos=['rsi_bounce+typo'])):
+        with pytest.raises(ValueError):
+            run()
+
+
+INDICATOR_COLUMNS = ['ema_9', 'ema_20', 'macd', 'macd_signal', 'macd_histogram', 'rsi',
+                     'bb_middle', 'bb_upper', 'bb_lower', 'atr']
+
+
+def test_indicator_engine_matches_add_all_indicators(candles, prices):
+    seed_rows = 500
+    engine = IndicatorEngine().seed(candles.iloc[:seed_rows])
+    streamed = pd.DataFrame([
+        engine.update(candle)
+        for candle in candles.iloc[seed_rows:].to_dict('records')
+    ])
+    batch = prices[INDICATOR_COLUMNS].iloc[seed_rows:].reset_index(drop=True).astype('float64')
+    pd.testing.assert_frame_equal(streamed[INDICATOR_COLUMNS], batch, check_exact=True)
@@ -0,0 +1,70 @@
+# test_exchanges.py
+import pandas as pd
+import pytest
+
+from exchanges import Connector, close_connectors, get_connector
+from fake_exchange import FakeRateLimitExceeded, SyncFakeExchange
+
+# -----------------------------------------------
+# Connector Layer against the Local Fake Exchange
+# -----------------------------------------------
+
+START_MS = 1_700_000_000_000 // 60_000 * 60_000  # aligned to a minute
+
+
+@pytest.fixture(autouse=True)
+def fresh_connectors():
+    close_connectors()
+    yield
+    close_connectors()
+
+
+def test_connector_is_reused_and_markets_load_once():
+    connector = get_connector('fake', start_ms=START_MS, retry_wait=0.0)
+    assert get_connector('fake', start_ms=START_MS, retry_wait=0.0) is connector
+
+    connector.fetch_candles('ETH/USDT', total_limit=3000, since=START_MS)
+    connector.fetch_candles('BTC/USDT', total_limit=3000, since=START_MS)
+    assert connector.exchange.markets_loaded == 1
+
+
+def test_rate_limits_are_retried_without_gaps_or_duplicates():
+    every = 4
+    connector = get_connector('fake', start_ms=START_MS, rate_limit_every=every, retry_wait=0.0)
+    total = 10_000
+    df = connector.fetch_candles('ETH/USDT', total_limit=total, batch_size=700, since=START_MS)
+
+    exchange = connector.exchange
+    assert exchange.rate_limited > 0
+    assert exchange.calls == -(-total // 700) + exchange.rate_limited
+
+    expected = pd.date_range(pd.Timestamp(START_MS, unit='ms'), periods=total, freq='1min')
+    assert list(df['timestamp']) == list(expected)
+    assert df['timestamp'].is_unique
+
+
+def test_rate_limit_error_surfaces_after_the_last_retry():
+    connector = get_connector('fake', start_ms=START_MS, rate_limit_every=1, retries=2, retry_wait=0.0)
+    with pytest.raises(FakeRateLimitExceeded):
+        connector.fetch_ohlcv('ETH/USDT', since=START_MS, limit=10)
+    assert connector.exchange.calls == 3
+
+
+def test_unknown_symbol_raises_value_error():
+    connector = get_connector('fake', start_ms=START_MS)
+    with pytest.raises(ValueError):
+        connector.fetch_ohlcv('DOGE/XYZ', since=START_MS, limit=10)
+    assert connector.exchange.calls == 0
+
+
+class BrokenExchange(SyncFakeExchange):
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        self.calls += 1
+        raise KeyError('bug in the exchange wrapper')
+
+
+def test_permanent_errors_are_not_retried():
+    connector = Connector('fake', exchange=BrokenExchange(start_ms=START_MS), retries=3, retry_wait=0.0)
+    with pytest.raises(KeyError):
+        connector.fetch_ohlcv('ETH/USDT', since=START_MS, limit=10)
+    assert connector.exchange.calls == 1
@@ -0,0 +1,51 @@
+# test_multi_timeframe.py
+import os
+
+import pandas as pd
+import pytest
+
+from multi_timeframe import BarAggregator, resample_candles
+
+# -----------------------------------------------
+# Higher-Timeframe Bars: Partial First Bar, Batch vs Incremental
+# -----------------------------------------------
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ethusdt_1m_month.csv')
+BAR_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+@pytest.fixture(scope='module')
+def candles():
+    df = pd.read_csv(CSV_PATH, nrows=2000, parse_dates=['timestamp'])
+    # Start half-way through an hour
+    first_half_hour = df.index[(df['timestamp'].dt.minute == 30)][0]
+    return df.iloc[first_half_hour:].reset_index(drop=True)
+
+
+def test_leading_partial_bar_is_dropped(candles):
+    bars = resample_candles(candles, '1h')
+    assert bars['timestamp'].iloc[0] == candles['timestamp'].iloc[0].ceil('1h')
+
+    first = candles[candles['timestamp'] >= bars['timestamp'].iloc[0]].iloc[:60]
+    assert bars['open'].iloc[0] == first['open'].iloc[0]
+    assert bars['volume'].iloc[0] == pytest.approx(first['volume'].sum())
+
+
+def test_aligned_start_keeps_the_first_bar(candles):
+    aligned = candles[candles['timestamp'] >= candles['timestamp'].iloc[0].ceil('1h')]
+    bars = resample_candles(aligned, '1h')
+    assert bars['timestamp'].iloc[0] == aligned['timestamp'].iloc[0]
+
+
+@pytest.mark.parametrize('seed_rows', [0, 10, 700])
+def test_incremental_bars_match_batch(candles, seed_rows):
+    aggregator = BarAggregator('1h').seed(candles.iloc[:seed_rows])
+    streamed = []
+    for candle in candles.iloc[seed_rows:].to_dict('records'):
+        streamed += aggregator.update(candle)
+
+    batch = resample_candles(candles, '1h')
+    if seed_rows:
+        batch = batch.iloc[aggregator.bars_completed - len(streamed):]
+    streamed = pd.DataFrame(streamed)[BAR_COLUMNS]
+    pd.testing.assert_frame_equal(streamed, batch[BAR_COLUMNS].reset_index(drop=True))
@@ -0,0 +1,36 @@
+# test_regimes.py
+import pandas as pd
+import pytest
+
+from regimes import REGIME_CODES, RegimeIndex
+
+# -----------------------------------------------
+# RegimeIndex Lookups
+# -----------------------------------------------
+
+LABELS = ['sideways', 'sideways', 'volatile', 'volatile', 'volatile', 'trending_up']
+TIMES = pd.date_range('2024-01-01', periods=len(LABELS), freq='1min')
+
+
+@pytest.fixture
+def index():
+    return RegimeIndex.from_labels(LABELS, TIMES)
+
+
+def test_lookups_inside_the_labelled_range(index):
+    expected = [REGIME_CODES[label] for label in LABELS]
+    assert index.regime_at(range(len(LABELS))).tolist() == expected
+    assert index.regime_at_time(TIMES).tolist() == expected
+    assert index.select([1, 2, 5], 'volatile').tolist() == [2]
+
+
+@pytest.mark.parametrize('row', [-1, len(LABELS)])
+def test_rows_outside_the_index_raise(index, row):
+    with pytest.raises(ValueError):
+        index.regime_at([row])
+
+
+@pytest.mark.parametrize('time', [TIMES[0] - pd.Timedelta('1min'), TIMES[-1] + pd.Timedelta('1min')])
+def test_times_outside_the_index_raise(index, time):
+    with pytest.raises(ValueError):
+        index.regime_at_time([time])
@@ -0,0 +1,29 @@
+# test_signal_generator.py
+import numpy as np
+import pytest
+
+from signal_generator import FILTER_BITS, canonical_combo_name, combo_names_to_masks
+
+# -----------------------------------------------
+# Combo Name <-> Mask Helpers
+# -----------------------------------------------
+
+
+def test_combo_names_to_masks():
+    names = ['rsi_bounce+strong_candle', 'none', 'rsi_bounce', 'rsi_bounce+strong_candle']
+    expected = [FILTER_BITS['rsi_bounce'] | FILTER_BITS['strong_candle'], 0, FILTER_BITS['rsi_bounce'],
+                FILTER_BITS['rsi_bounce'] | FILTER_BITS['strong_candle']]
+    assert combo_names_to_masks(names).tolist() == expected
+
+
+def test_missing_and_unknown_names_map_to_minus_one():
+    assert combo_names_to_masks(['rsi_bounce', None, 'unknown', np.nan]).tolist() == [FILTER_BITS['rsi_bounce'], -1, -1, -1]
+    assert combo_names_to_masks([None, np.nan]).tolist() == [-1, -1]
+    assert combo_names_to_masks([]).tolist() == []
+
+
+def test_canonical_combo_name():
+    assert canonical_combo_name('strong_candle+rsi_bounce') == 'rsi_bounce+strong_candle'
+    assert canonical_combo_name(['strong_candle', 'rsi_bounce']) == 'rsi_bounce+strong_candle'
+    with pytest.raises(ValueError):
+        canonical_combo_name('rsi_bounce+typo')
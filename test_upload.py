@@ -0,0 +1,119 @@
+# test_upload.py
+import pandas as pd
+import pytest
+
+from local_bigquery import LocalBigQueryClient
+from upload_to_bigquery import DATASET_ID, PROJECT_ID, ChunkedUploadError, upload_dataframe_chunked
+
+# -----------------------------------------------
+# Chunked BigQuery Upload against the Local Stand-In
+# -----------------------------------------------
+
+TABLE = "test_trades"
+TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.{TABLE}"
+
+
+def _frame(n=1000, offset=0):
+    return pd.DataFrame({
+        'trade_id': range(offset, offset + n),
+        'pnl_pct': [i * 0.01 for i in range(n)],
+        'symbol': 'ETH/USDT',
+    })
+
+
+def _read(client):
+    return client.read_table(TABLE_ID).sort_values('trade_id').reset_index(drop=True)
+
+
+class FailingChunkClient(LocalBigQueryClient):
+    """
+    Permanent (non-transient) error on the load of one chunk index.
+    """
+
+    def __init__(self, root, failing_chunk):
+        super().__init__(root)
+        self.failing_chunk = failing_chunk
+
+    def load_table_from_dataframe(self, dataframe, destination, job_config=None, job_id=None):
+        if job_id is not None and job_id.endswith(f"_{self.failing_chunk}"):
+            raise ValueError(f"simulated schema error in chunk {self.failing_chunk}")
+        return super().load_table_from_dataframe(dataframe, destination, job_config, job_id)
+
+
+def test_round_trip(tmp_path):
+    client = LocalBigQueryClient(str(tmp_path))
+    df = _frame()
+    stats = upload_dataframe_chunked(df, TABLE, chunk_rows=128, max_workers=3, client=client)
+    assert stats['rows'] == len(df) and stats['chunks'] == 8
+    pd.testing.assert_frame_equal(_read(client), df)
+
+
+def test_local_only_columns_are_not_uploaded(tmp_path):
+    client = LocalBigQueryClient(str(tmp_path))
+    signals = pd.DataFrame({'match_score': [1, 2], 'signal_combo_name': ['none', 'rsi_bounce'], 'filters_mask': [0, 16]})
+    upload_dataframe_chunked(signals, "fact_signals", client=client)
+    stored = client.read_table(f"{PROJECT_ID}.{DATASET_ID}.fact_signals")
+    assert list(stored.columns) == ['match_score', 'signal_combo_name']
+    assert 'filters_mask' in signals.columns
+
+
+def test_transient_errors_are_retried(tmp_path):
+    client = LocalBigQueryClient(str(tmp_path), fail_first=2)
+    df = _frame()
+    upload_dataframe_chunked(df, TABLE, chunk_rows=250, max_workers=1, backoff=0.0, client=client)
+    pd.testing.assert_frame_equal(_read(client), df)
+
+
+def test_retry_after_committed_load_does_not_duplicate(tmp_path):
+    # result() times out although the rows were written: the retry must find the job, not reload
+    client = LocalBigQueryClient(str(tmp_path), fail_result_first=2)
+    df = _frame()
+    upload_dataframe_chunked(df, TABLE, chunk_rows=250, max_workers=1, backoff=0.0, client=client)
+    pd.testing.assert_frame_equal(_read(client), df)
+
+
+def test_job_that_failed_on_the_server_is_reloaded(tmp_path):
+    # result() raises because the job itself failed: the retry must start a new job, not
+    # keep waiting on the failed one
+    client = LocalBigQueryClient(str(tmp_path), fail_jobs_first=2)
+    df = _frame()
+    upload_dataframe_chunked(df, TABLE, chunk_rows=250, max_workers=1, backoff=0.0, client=client)
+    pd.testing.assert_frame_equal(_read(client), df)
+    assert sum(job_id.endswith('_0_r1') or job_id.endswith('_0_r2') for job_id in client.jobs) == 2
+
+
+def test_permanent_error_is_not_retried(tmp_path):
+    client = LocalBigQueryClient(str(tmp_path), fail_tables=[TABLE])
+    with pytest.raises(ChunkedUploadError) as error:
+        upload_dataframe_chunked(_frame(), TABLE, chunk_rows=1000, retries=3, backoff=0.0, client=client)
+    assert client.load_calls == 1
+    assert error.value.landed == [] and error.value.failed == 0
+
+
+def test_failed_truncate_keeps_the_old_table(tmp_path):
+    old = _frame(300, offset=10_000)
+    upload_dataframe_chunked(old, TABLE, client=LocalBigQueryClient(str(tmp_path)))
+
+    client = FailingChunkClient(str(tmp_path), failing_chunk=3)
+    with pytest.raises(ChunkedUploadError):
+        upload_dataframe_chunked(_frame(), TABLE, write_mode="WRITE_TRUNCATE", chunk_rows=100,
+                                 max_workers=1, backoff=0.0, client=client)
+    pd.testing.assert_frame_equal(_read(client), old)
+    assert sorted(p.name for p in (tmp_path / f"{PROJECT_ID}.{DATASET_ID}").iterdir()) == [TABLE]
+
+
+def test_truncate_replaces_the_table(tmp_path):
+    client = LocalBigQueryClient(str(tmp_path))
+    upload_dataframe_chunked(_frame(300, offset=10_000), TABLE, client=client)
+    df = _frame()
+    upload_dataframe_chunked(df, TABLE, write_mode="WRITE_TRUNCATE", chunk_rows=128, client=client)
+    pd.testing.assert_frame_equal(_read(client), df)
+
+
+def test_append_failure_reports_landed_chunks(tmp_path):
+    client = FailingChunkClient(str(tmp_path), failing_chunk=2)
+    with pytest.raises(ChunkedUploadError) as error:
+        upload_dataframe_chunked(_frame(), TABLE, chunk_rows=100, max_workers=1, backoff=0.0, client=client)
+    # One worker: chunks 0 and 1 landed, 2 failed, 3..9 were cancelled before starting
+    assert error.value.landed == [0, 1] and error.value.failed == 2
+    assert len(_read(client)) == 200
@@ -2,6 +2,8 @@
 
 import pandas as pd
 
+from instrumentation import instrumented
+
 # -----------------------------------------------
 # Manual Mathematical Calculation of EMA (Commented for Reference)
 # -----------------------------------------------
@@ -64,6 +66,7 @@ def add_ema(df, span, column_name):
     
     return df
 
+@instrumented('add_ema9_ema20', rows=len)
 def add_ema9_ema20(df):
     """
     Adds both EMA 9 and EMA 20 columns to the DataFrame.
@@ -110,6 +113,7 @@ Histogram = MACD Line - Signal Line
 # Actual Function to Add MACD Columns
 # -----------------------------------------------
 
+@instrumented('add_macd', rows=len)
 def add_macd(df):
     """
     Adds MACD Line, Signal Line, and MACD Histogram to the DataFrame.
@@ -170,6 +174,7 @@ Notes:
 # Actual Function to Add RSI Column
 # -----------------------------------------------
 
+@instrumented('add_rsi', rows=len)
 def add_rsi(df, period=14):
     
     """
@@ -234,6 +239,7 @@ Default Settings:
 # Function to Add Bollinger Bands Columns
 # -----------------------------------------------
 
+@instrumented('add_bollinger_bands', rows=len)
 def add_bollinger_bands(df, period=20, multiplier=2):
     """
     Adds Middle Band, Upper Band, and Lower Band columns to the DataFrame.
@@ -323,6 +329,7 @@ Default Settings:
 # Function to Add ATR Column
 # -----------------------------------------------
 
+@instrumented('add_atr', rows=len)
 def add_atr(df, period=14):
     """
     Adds an ATR column to the DataFrame.
@@ -378,3 +385,27 @@ def add_atr(df, period=14):
     df['atr'] = tr.rolling(window=period, min_periods=period).mean()
 
     return df
+
+
+# -----------------------------------------------
+# All Indicators Used by the Pipeline
+# -----------------------------------------------
+
+@instrumented('add_all_indicators', rows=len)
+def add_all_indicators(df, rsi_period=14, bb_period=20, bb_multiplier=2, atr_period=14):
+    """
+    Adds every indicator main.py uses (EMA 9/20, MACD, RSI, Bollinger Bands, ATR),
+    in the same order and with the same default settings.
+
+    Same result as calling add_ema9_ema20, add_macd, add_rsi, add_bollinger_bands and
+    add_atr one after another, but computed through indicator_graph.py so shared
+    intermediates (previous close, rolling windows, EMAs) are only computed once.
+    """
+    from indicator_graph import compute_indicators
+    return compute_indicators(
+        df,
+        rsi_period=rsi_period,
+        bb_period=bb_period,
+        bb_multiplier=bb_multiplier,
+        atr_period=atr_period
+    )
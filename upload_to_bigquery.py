@@ -1,82 +1,337 @@
 # upload_to_bigquery.py
 
+import math
 import os
-from dotenv import load_dotenv
-from google.cloud import bigquery
-import pandas as pd
-
-# Load environment variables
-load_dotenv()
-
-# Set Google credentials for authentication
-os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
-
-# Create a BigQuery Client
-client = bigquery.Client()
-
-
-def upload_dataframe_to_bigquery(df, table_name, write_mode="WRITE_APPEND"):
-    project_id = "scalp-457602"
-    dataset_id = "crypto_data"
-    full_table_id = f"{project_id}.{dataset_id}.{table_name}"
-
-    # Manual schema needed for array field
-    if table_name == "backtest_trades":
-        schema = [
-            bigquery.SchemaField("timestamp", "DATETIME"),
-            bigquery.SchemaField("symbol", "STRING"),
-            bigquery.SchemaField("entry_price", "FLOAT"),
-            bigquery.SchemaField("exit_price", "FLOAT"),
-            bigquery.SchemaField("pnl_pct", "FLOAT"),
-            bigquery.SchemaField("match_score", "INTEGER"),
-            bigquery.SchemaField("exit_reason", "STRING"),
-            bigquery.SchemaField("duration_candles", "INTEGER"),
-            bigquery.SchemaField("atr_on_entry", "FLOAT"),
-            bigquery.SchemaField("filters_triggered", "STRING"),
-            bigquery.SchemaField("filters_triggered_list", "STRING", mode="REPEATED"),  #ARRAY<STRING>
-            bigquery.SchemaField("final_signal", "BOOLEAN"),
-        ]
-    elif table_name == "backtest_trades_v2":
-        schema = [
-            bigquery.SchemaField("timestamp", "TIMESTAMP"),
-            bigquery.SchemaField("symbol", "STRING"),
-            bigquery.SchemaField("entry_price", "FLOAT"),
-            bigquery.SchemaField("exit_price", "FLOAT"),
-            bigquery.SchemaField("exit_reason", "STRING"),
-            bigquery.SchemaField("duration_candles", "INTEGER"),
-            bigquery.SchemaField("pnl_pct", "FLOAT"),
-            bigquery.SchemaField("was_profitable", "BOOLEAN"),
-            bigquery.SchemaField("trade_type", "STRING"),
-            bigquery.SchemaField("mfe_atr", "FLOAT"),
-            bigquery.SchemaField("mae_atr", "FLOAT"),
-            bigquery.SchemaField("tp_price", "FLOAT"),
-            bigquery.SchemaField("sl_price", "FLOAT"),
-            bigquery.SchemaField("atr_on_exit", "FLOAT"),
-            bigquery.SchemaField("match_score", "INTEGER"),
-            bigquery.SchemaField("rsi_bounce", "BOOLEAN"),
-            bigquery.SchemaField("macd_cross_up", "BOOLEAN"),
-            bigquery.SchemaField("recent_high_break", "BOOLEAN"),
-            bigquery.SchemaField("range_breakout", "BOOLEAN"),
-            bigquery.SchemaField("strong_candle", "BOOLEAN"),
-            bigquery.SchemaField("volume_spike", "BOOLEAN"),
-            bigquery.SchemaField("signal_combo_name", "STRING"),
-            bigquery.SchemaField("logic_debug_note", "STRING"),
-        ]
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from types import SimpleNamespace
 
-    else:
-        schema = None
+from instrumentation import count, instrumented, is_enabled
+
+PROJECT_ID = "scalp-457602"
+DATASET_ID = "crypto_data"
+
+# One client for the whole process (created on first use by get_client)
+client = None
+
+# Retried without google-cloud-bigquery installed (with it: google.api_core's if_transient_error too)
+TRANSIENT_ERRORS = (ConnectionError, TimeoutError)
+
+
+class ChunkedUploadError(RuntimeError):
+    """
+    A chunk failed for good. landed: indices of the chunks that were loaded, failed: the
+    index of the chunk that failed.
+    """
+
+    def __init__(self, message, landed, failed):
+        super().__init__(message)
+        self.landed = landed
+        self.failed = failed
+
+# Columns the pipeline keeps in memory but the BigQuery table doesn't have (the existing
+# fact_signals table was created by schema autodetect before filters_mask existed, so
+# appending it would fail): dropped before upload
+LOCAL_ONLY_COLUMNS = {
+    "fact_signals": ["filters_mask"],
+}
+
+# Manual schemas (name, type[, mode]) - needed for the array field and exact types
+TABLE_SCHEMAS = {
+    "backtest_trades": [
+        ("timestamp", "DATETIME"),
+        ("symbol", "STRING"),
+        ("entry_price", "FLOAT"),
+        ("exit_price", "FLOAT"),
+        ("pnl_pct", "FLOAT"),
+        ("match_score", "INTEGER"),
+        ("exit_reason", "STRING"),
+        ("duration_candles", "INTEGER"),
+        ("atr_on_entry", "FLOAT"),
+        ("filters_triggered", "STRING"),
+        ("filters_triggered_list", "STRING", "REPEATED"),  #ARRAY<STRING>
+        ("final_signal", "BOOLEAN"),
+    ],
+    "backtest_trades_v2": [
+        ("timestamp", "TIMESTAMP"),
+        ("symbol", "STRING"),
+        ("entry_price", "FLOAT"),
+        ("exit_price", "FLOAT"),
+        ("exit_reason", "STRING"),
+        ("duration_candles", "INTEGER"),
+        ("pnl_pct", "FLOAT"),
+        ("was_profitable", "BOOLEAN"),
+        ("trade_type", "STRING"),
+        ("mfe_atr", "FLOAT"),
+        ("mae_atr", "FLOAT"),
+        ("tp_price", "FLOAT"),
+        ("sl_price", "FLOAT"),
+        ("atr_on_exit", "FLOAT"),
+        ("match_score", "INTEGER"),
+        ("rsi_bounce", "BOOLEAN"),
+        ("macd_cross_up", "BOOLEAN"),
+        ("recent_high_break", "BOOLEAN"),
+        ("range_breakout", "BOOLEAN"),
+        ("strong_candle", "BOOLEAN"),
+        ("volume_spike", "BOOLEAN"),
+        ("signal_combo_name", "STRING"),
+        ("logic_debug_note", "STRING"),
+    ],
+}
+
+
+def get_client():
+    """
+    Returns the shared BigQuery client, creating it on first use.
+
+    Set TRADINGBOT_BIGQUERY_LOCAL_DIR to a folder to use the file-backed stand-in
+    (local_bigquery.LocalBigQueryClient) instead of Google BigQuery.
+    """
+    global client
+    if client is None:
+        local_dir = os.getenv("TRADINGBOT_BIGQUERY_LOCAL_DIR")
+        if local_dir:
+            from local_bigquery import LocalBigQueryClient
+            client = LocalBigQueryClient(local_dir)
+        else:
+            from dotenv import load_dotenv
+            from google.cloud import bigquery
 
-    job_config = bigquery.LoadJobConfig(
+            # Load environment variables and set Google credentials for authentication
+            load_dotenv()
+            credentials = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
+            if credentials:
+                os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = credentials
+            client = bigquery.Client()
+    return client
+
+
+def set_client(new_client):
+    """
+    Replaces the shared client (e.g. with a LocalBigQueryClient for offline runs).
+    """
+    global client
+    client = new_client
+
+
+def build_job_config(table_name, write_mode="WRITE_APPEND"):
+    """
+    LoadJobConfig with the manual schema of table_name (autodetect for other tables).
+    """
+    try:
+        from google.cloud import bigquery
+    except ImportError:
+        # Only the local stand-in can be used without google-cloud-bigquery
+        return SimpleNamespace(write_disposition=write_mode, schema=TABLE_SCHEMAS.get(table_name))
+
+    schema = None
+    if table_name in TABLE_SCHEMAS:
+        schema = [bigquery.SchemaField(*field) for field in TABLE_SCHEMAS[table_name]]
+
+    return bigquery.LoadJobConfig(
         write_disposition=write_mode,
         autodetect=(schema is None),
         schema=schema
     )
 
-    job = bigquery.Client().load_table_from_dataframe(
-        df,
-        full_table_id,
-        job_config=job_config
-    )
 
-    job.result()
-    print(f"✅ Uploaded {len(df)} rows to {full_table_id} successfully.")
+def build_copy_config(write_mode="WRITE_TRUNCATE"):
+    try:
+        from google.cloud import bigquery
+    except ImportError:
+        return SimpleNamespace(write_disposition=write_mode)
+    return bigquery.CopyJobConfig(write_disposition=write_mode)
+
+
+def split_into_chunks(df, chunk_rows=None, chunk_mb=64):
+    """
+    Splits df into consecutive row slices of about chunk_mb MB each (or chunk_rows rows).
+    """
+    if len(df) == 0:
+        return [df]
+    if chunk_rows is None:
+        bytes_per_row = max(1, df.memory_usage(index=False, deep=True).sum() / len(df))
+        chunk_rows = max(1, int(chunk_mb * 1024 * 1024 / bytes_per_row))
+    n_chunks = math.ceil(len(df) / chunk_rows)
+    return [df.iloc[i * chunk_rows:(i + 1) * chunk_rows] for i in range(n_chunks)]
+
+
+def is_transient_error(error):
+    """
+    True for errors worth retrying (network, timeouts, 429 / 5xx), False for ones that
+    can't succeed on a retry (bad schema, permissions, not found).
+    """
+    try:
+        from google.api_core.retry import if_transient_error
+    except ImportError:
+        if_transient_error = None
+    if if_transient_error is not None and if_transient_error(error):
+        return True
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+def _job_exists(error):
+    # google.api_core.exceptions.Conflict / LocalJobConflict: the job_id was already used
+    return getattr(error, 'code', None) == 409
+
+
+def _job_failed(job):
+    # The job ran and BigQuery reports it failed (e.g. backendError): nothing was loaded
+    return getattr(job, 'state', None) == 'DONE' and getattr(job, 'error_result', None) is not None
+
+
+def _start_load(bq_client, chunk, full_table_id, job_config, job_id):
+    count('api_calls', api='bigquery.load_table_from_dataframe')
+    return bq_client.load_table_from_dataframe(chunk, full_table_id, job_config=job_config, job_id=job_id)
+
+
+def _load_with_retry(bq_client, chunk, full_table_id, job_config, retries, backoff, job_id):
+    table = full_table_id.rsplit('.', 1)[-1]
+    current_id = job_id
+    for attempt in range(retries + 1):
+        try:
+            # Same job_id as the previous attempt: if its load went through (e.g.
+            # job.result() timed out after the commit), BigQuery answers 409 and we wait on
+            # that job instead of appending the chunk a second time. Only a job that is
+            # DONE with an error is replaced by a new one (job_id + "_r<attempt>").
+            try:
+                job = _start_load(bq_client, chunk, full_table_id, job_config, current_id)
+            except Exception as e:
+                if not _job_exists(e):
+                    raise
+                job = bq_client.get_job(current_id)
+                if _job_failed(job):
+                    current_id = f"{job_id}_r{attempt}"
+                    job = _start_load(bq_client, chunk, full_table_id, job_config, current_id)
+            job.result()
+            count('upload_rows', len(chunk), table=table)
+            count('upload_chunks', table=table)
+            if is_enabled():
+                # In-memory size of the chunk (what was handed to the client)
+                count('upload_bytes', int(chunk.memory_usage(index=True, deep=True).sum()), table=table)
+            return len(chunk)
+        except Exception as e:
+            if attempt == retries or not is_transient_error(e):
+                raise
+            count('upload_retries', table=table)
+            delay = backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+            print(f"⚠️ Chunk of {len(chunk)} rows to {full_table_id} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _load_chunk_task(stop, *args):
+    # Chunks queued behind a chunk that failed for good are not started
+    if stop.is_set():
+        return None
+    try:
+        return _load_with_retry(*args)
+    except Exception:
+        stop.set()
+        raise
+
+
+def _load_chunks(bq_client, chunks, destination, job_config, retries, backoff, max_workers, job_prefix):
+    """
+    Loads all chunks into destination, several at a time. On the first chunk that fails
+    for good, chunks not started yet are cancelled and ChunkedUploadError tells which
+    chunks landed. Returns the number of rows loaded.
+    """
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = {
+            pool.submit(_load_chunk_task, stop, bq_client, chunk, destination, job_config, retries, backoff, f"{job_prefix}_{i}"): i
+            for i, chunk in enumerate(chunks)
+        }
+        _, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in pending:
+            future.cancel()
+    # Leaving the pool waits for the chunks that were already running
+
+    landed = []
+    failed = None
+    rows = 0
+    for future, i in sorted(futures.items(), key=lambda item: item[1]):
+        if future.cancelled():
+            continue
+        if future.exception() is not None:
+            failed = (i, future.exception()) if failed is None else failed
+            continue
+        if future.result() is None:
+            continue
+        landed.append(i)
+        rows += future.result()
+
+    if failed is not None:
+        i, error = failed
+        raise ChunkedUploadError(
+            f"Chunk {i} of {len(chunks)} to {destination} failed ({error}); "
+            f"landed chunks: {landed}, not loaded: {len(chunks) - len(landed)}",
+            landed, i
+        ) from error
+    return rows
+
+
+@instrumented('upload', rows=lambda stats: stats['rows'])
+def upload_dataframe_chunked(df, table_name, write_mode="WRITE_APPEND", chunk_rows=None, chunk_mb=64,
+                             max_workers=4, retries=3, backoff=1.0, client=None):
+    """
+    Uploads df in chunks, several load jobs at a time, retrying transient failures with backoff.
+
+    Parameters:
+    - table_name: table inside PROJECT_ID.DATASET_ID
+    - write_mode: WRITE_APPEND or WRITE_TRUNCATE. WRITE_TRUNCATE loads the chunks into a
+      staging table first and copies it over the table in one copy job, so the table is
+      either fully replaced or left as it was (like a single load job)
+    - chunk_rows / chunk_mb: chunk size in rows, or estimated in-memory MB when chunk_rows is None
+    - max_workers: load jobs running at the same time
+    - retries / backoff: attempts per chunk and base wait in seconds (doubles every retry)
+    - client: BigQuery client (default: the shared get_client())
+
+    Columns listed in LOCAL_ONLY_COLUMNS for the table are not uploaded.
+
+    With WRITE_APPEND a chunk that fails for good raises ChunkedUploadError listing the
+    chunks that were already appended; the chunks not started yet are not loaded.
+
+    Returns a dict with rows, chunks, seconds and rows_per_sec.
+    """
+    bq_client = client or get_client()
+    full_table_id = f"{PROJECT_ID}.{DATASET_ID}.{table_name}"
+    local_only = [c for c in LOCAL_ONLY_COLUMNS.get(table_name, []) if c in df.columns]
+    if local_only:
+        df = df.drop(columns=local_only)
+    chunks = split_into_chunks(df, chunk_rows, chunk_mb)
+    job_prefix = f"tradingbot_{table_name}_{uuid.uuid4().hex[:12]}"
+
+    start = time.perf_counter()
+    job_config = build_job_config(table_name, "WRITE_APPEND")
+    if write_mode == "WRITE_TRUNCATE":
+        staging_table_id = f"{full_table_id}_staging_{uuid.uuid4().hex[:8]}"
+        try:
+            uploaded = _load_chunks(bq_client, chunks, staging_table_id, job_config, retries, backoff, max_workers, job_prefix)
+            count('api_calls', api='bigquery.copy_table')
+            bq_client.copy_table(staging_table_id, full_table_id, job_config=build_copy_config("WRITE_TRUNCATE")).result()
+        finally:
+            bq_client.delete_table(staging_table_id, not_found_ok=True)
+    else:
+        uploaded = _load_chunks(bq_client, chunks, full_table_id, job_config, retries, backoff, max_workers, job_prefix)
+
+    seconds = time.perf_counter() - start
+    stats = {
+        'rows': uploaded,
+        'chunks': len(chunks),
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(uploaded / seconds, 1) if seconds > 0 else float('inf'),
+    }
+    print(f"✅ Uploaded {uploaded} rows to {full_table_id} in {stats['seconds']}s ({stats['rows_per_sec']} rows/sec).")
+    return stats
+
+
+def upload_dataframe_to_bigquery(df, table_name, write_mode="WRITE_APPEND", client=None):
+    """
+    Uploads df to PROJECT_ID.DATASET_ID.table_name with the shared client
+    (chunked and parallel for large frames, see upload_dataframe_chunked).
+    """
+    return upload_dataframe_chunked(df, table_name, write_mode=write_mode, client=client)
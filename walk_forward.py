@@ -0,0 +1,228 @@
+# walk_forward.py
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from backtester import get_backtest_arrays
+from sweep import (
+    add_grid_arguments,
+    combos_label,
+    expand_grid,
+    get_worker_arrays,
+    grid_from_args,
+    run_single_config,
+    shared_array_pool,
+    simulate_config,
+    summarize_pnl,
+)
+
+# -----------------------------------------------
+# Walk-Forward Optimization (parallel folds)
+# -----------------------------------------------
+
+"""
+ALLOWED_COMBOS and the TP/SL defaults were chosen on the same month they are tested on.
+Walk-forward keeps optimization and evaluation apart:
+
+    |---- train 0 ----|-- test 0 --|
+                 |---- train 1 ----|-- test 1 --|
+                              |---- train 2 ----|-- test 2 --|
+
+For every fold the whole parameter grid is run on the train window, the best
+configuration (by rank_by, among configs with at least min_trades trades) is picked and
+then run on the following, unseen test window. The test windows don't overlap, so their
+trades stitch into one out-of-sample equity curve.
+
+- Indicators and signals are causal, so they are computed ONCE on the full history and
+  shared with the workers as memory-mapped arrays (sweep.shared_array_pool).
+- Each fold is one task; all folds run at the same time across the pool.
+- Trades must enter and exit inside their window; the cooldown starts fresh per window.
+- anchored=True grows the train window from the start of the data instead of rolling it.
+
+Equity is the cumulative sum of trade pnl_pct, like sweep.summarize_pnl.
+"""
+
+CANDLES_PER_DAY = 24 * 60
+
+
+def make_folds(n_candles, train_size, test_size, anchored=False, warmup=21):
+    """
+    Train / test index windows (in candles). Only full test windows are used.
+
+    Parameters:
+    - n_candles: length of the history
+    - train_size / test_size: window lengths in candles (the test window is also the step)
+    - anchored: train windows all start at `warmup` instead of rolling
+    - warmup: first usable candle (the backtester skips the first 21)
+    """
+    folds = []
+    test_start = warmup + train_size
+    while test_start + test_size <= n_candles:
+        folds.append({
+            'fold': len(folds),
+            'train_start': warmup if anchored else test_start - train_size,
+            'train_end': test_start,
+            'test_start': test_start,
+            'test_end': test_start + test_size,
+        })
+        test_start += test_size
+    return folds
+
+
+def _best_config(rows, rank_by, min_trades):
+    # Highest rank_by (then win rate); ties keep grid order. Configs with too few
+    # trades only win if no config has enough.
+    eligible = [i for i, row in enumerate(rows) if row['trades'] >= min_trades] or list(range(len(rows)))
+    return max(eligible, key=lambda i: (rows[i][rank_by], rows[i]['win_rate'], -i))
+
+
+def evaluate_fold(arrays, fold, configs, rank_by='total_pnl_pct', min_trades=5):
+    """
+    Optimizes on the fold's train window and runs the winner on its test window.
+    Returns a dict with the chosen params, train / test summaries and the test trades.
+    """
+    train_rows = [run_single_config(arrays, params, fold['train_start'], fold['train_end']) for params in configs]
+    best = _best_config(train_rows, rank_by, min_trades)
+    params = configs[best]
+
+    test_trades = simulate_config(arrays, params, fold['test_start'], fold['test_end'])
+    pnl = [t['pnl'] for t in test_trades]
+
+    return {
+        'fold': fold,
+        'params': params,
+        'train': {k: v for k, v in train_rows[best].items() if k not in params},
+        'test': summarize_pnl(pnl),
+        'trades': [(t['index'], t['duration'], t['exit_reason'], t['pnl']) for t in test_trades],
+    }
+
+
+def _run_fold_task(task):
+    return evaluate_fold(get_worker_arrays(), *task)
+
+
+def run_walk_forward(df, param_grid, train_size, test_size, anchored=False, signals=None,
+                     processes=None, rank_by='total_pnl_pct', min_trades=5):
+    """
+    Walk-forward optimization of the run_backtest_v2 parameters.
+
+    Parameters:
+    - df: indicator-enriched price DataFrame
+    - param_grid: grid to optimize over (same format as sweep.run_parameter_sweep)
+    - train_size / test_size: window lengths in candles (CANDLES_PER_DAY per day of 1m data)
+    - anchored: expanding instead of rolling train windows
+    - signals: precomputed generate_signals(df) output (computed here if not given)
+    - processes: worker processes (default = CPU cores, 1 = no pool)
+    - rank_by / min_trades: how the best train configuration is chosen
+
+    Returns (folds DataFrame, out-of-sample equity curve DataFrame, OOS summary dict).
+    """
+    if signals is None:
+        from signal_generator import generate_signals
+        signals = generate_signals(df)
+
+    configs = expand_grid(param_grid)
+    arrays = get_backtest_arrays(df, signals)
+    folds = make_folds(len(df), train_size, test_size, anchored)
+    if not folds:
+        raise ValueError(f"{len(df)} candles are not enough for one {train_size} + {test_size} candle fold")
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(folds)))
+
+    tasks = [(fold, configs, rank_by, min_trades) for fold in folds]
+    if processes == 1:
+        results = [evaluate_fold(arrays, *task) for task in tasks]
+    else:
+        with shared_array_pool(arrays, processes) as pool:
+            results = list(pool.imap(_run_fold_task, tasks))
+
+    timestamps = df['timestamp'].to_numpy()
+    last = len(df) - 1
+
+    fold_rows = []
+    trade_rows = []
+    for result in results:
+        fold = result['fold']
+        row = {
+            'fold': fold['fold'],
+            'train_from': timestamps[fold['train_start']],
+            'train_to': timestamps[fold['train_end'] - 1],
+            'test_from': timestamps[fold['test_start']],
+            'test_to': timestamps[min(fold['test_end'], last + 1) - 1],
+        }
+        row.update(result['params'])
+        row['allowed_combos'] = combos_label(result['params']['allowed_combos'])
+        row.update({f"train_{k}": v for k, v in result['train'].items()})
+        row.update({f"test_{k}": v for k, v in result['test'].items()})
+        fold_rows.append(row)
+
+        for i, duration, exit_reason, pnl in result['trades']:
+            trade_rows.append({
+                'fold': fold['fold'],
+                'entry_time': timestamps[i],
+                'exit_time': timestamps[i + duration],
+                'exit_reason': exit_reason,
+                'pnl_pct': pnl,
+            })
+
+    equity = pd.DataFrame(trade_rows, columns=['fold', 'entry_time', 'exit_time', 'exit_reason', 'pnl_pct'])
+    summary = summarize_pnl(equity['pnl_pct'].to_numpy(dtype=np.float64))
+    equity['equity_pct'] = equity['pnl_pct'].cumsum().round(4)
+    equity['pnl_pct'] = equity['pnl_pct'].round(4)
+    summary['folds'] = len(folds)
+
+    return pd.DataFrame(fold_rows), equity, summary
+
+
+# -----------------------------------------------
+# Command line: python walk_forward.py --train-days 10 --test-days 3 --tp 1.5 1.95 2.5
+# -----------------------------------------------
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward optimization of run_backtest_v2")
+    parser.add_argument('--csv', default='ethusdt_1m_month.csv', help="candles CSV (same format as ethusdt_1m_month.csv)")
+    parser.add_argument('--train-days', type=float, default=10)
+    parser.add_argument('--test-days', type=float, default=3)
+    parser.add_argument('--anchored', action='store_true', help="expanding train window")
+    add_grid_arguments(parser)
+    parser.add_argument('--rank-by', default='total_pnl_pct')
+    parser.add_argument('--min-trades', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--out', default=None, help="optional path to save the per-fold table as CSV")
+    parser.add_argument('--equity-out', default=None, help="optional path to save the OOS equity curve as CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from data_cache import load_enriched_prices
+
+    args = _parse_args(argv)
+    df = load_enriched_prices(args.csv)
+
+    folds, equity, summary = run_walk_forward(
+        df,
+        grid_from_args(args),
+        train_size=int(args.train_days * CANDLES_PER_DAY),
+        test_size=int(args.test_days * CANDLES_PER_DAY),
+        anchored=args.anchored,
+        processes=args.processes,
+        rank_by=args.rank_by,
+        min_trades=args.min_trades
+    )
+    print(folds.to_string(index=False))
+    print(f"✅ Out-of-sample over {summary['folds']} folds: {summary}")
+
+    if args.out:
+        folds.to_csv(args.out, index=False)
+        print(f"✅ Saved fold table to {args.out}")
+    if args.equity_out:
+        equity.to_csv(args.equity_out, index=False)
+        print(f"✅ Saved OOS equity curve to {args.equity_out}")
+
+
+if __name__ == "__main__":
+    main()